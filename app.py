@@ -1,17 +1,12 @@
+import os
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
- 
-
-# Importar módulos locais
-from data import load_data, read_uploaded_file, merge_datasets, save_dataset, calculate_volume, calculate_1rm, calculate_trend
-from forecasting import forecast_1rm_series
-from mappings import (
-    map_exercise_to_group, alias_name
-)
-from charts import create_comparison_chart
-from metrics import generate_alerts, calculate_basic_metrics, calculate_exercise_stats
+
+# Importar módulos locais. Só os leves ficam aqui: pandas, Plotly e as análises
+# são importados em main() depois do primeiro desenho da página
+from background import PREFETCH_AHEAD, get_tasks
+from perf import recording, stage
+import warmup
 
 # Configuração da página
 st.set_page_config(
@@ -21,6 +16,129 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+def show_chart(fig, name, zoom=None):
+    """st.plotly_chart medido como etapa (serialização do Plotly + envio ao navegador).
+
+    Com `zoom` (escopo do gráfico: filtros, exercício...), arrastar uma caixa
+    no gráfico seleciona um trecho: no rerun o gráfico é refeito só com ele,
+    reduzido de novo (ver chart_zoom). Outro escopo começa sem seleção.
+    """
+    from charts import figure_points
+
+    with stage(f'app.chart.{name}') as measured:
+        if zoom is not None:
+            fig.update_layout(dragmode='select')
+            st.plotly_chart(fig, use_container_width=True, key=_chart_key(name, zoom),
+                            on_select='rerun', selection_mode='box')
+            selected = chart_zoom(name, zoom)
+            if selected is not None:
+                st.caption(f"🔍 Trecho de {selected[0]:%d/%m/%Y} a {selected[1]:%d/%m/%Y} com resolução total. "
+                           "Clique duas vezes no gráfico para voltar ao período inteiro.")
+        else:
+            st.plotly_chart(fig, use_container_width=True)
+        measured.rows_out = figure_points(fig)
+
+def _chart_key(name, scope):
+    return f"chart_{name}:{scope!r}"
+
+def chart_zoom(name, scope):
+    """Trecho (início, fim) selecionado no gráfico `name` com o mesmo escopo, ou None."""
+    from charts import zoom_range
+
+    return zoom_range(st.session_state.get(_chart_key(name, scope)))
+
+def exercise_forecast(cube, exercise, start, end, routine, athlete=None):
+    """Tarefa em segundo plano: (histórico semanal de 1RM, previsão) de um exercício; (None, None) sem dados.
+
+    A tag do cache de previsões leva atleta e filtros, para que outra base ou
+    outro filtro do mesmo exercício não apague esta entrada do disco.
+    """
+    import pandas as pd
+    from forecasting import forecast_1rm_series, forecast_tag
+
+    m1 = cube.exercise_daily(exercise, start, end, routine)['Max1RM'].rename('Estimated_1RM').sort_index()
+    if m1.empty:
+        return None, None
+    m1.index = pd.to_datetime(m1.index)
+    tag = forecast_tag(athlete, start, end, routine, exercise)
+    return m1.resample('W').max().dropna().reset_index(), forecast_1rm_series(m1, tag=tag)
+
+def exercise_alerts(cube, exercise, start, end, routine):
+    """Tarefa em segundo plano: alertas de platô/volume de um exercício."""
+    from metrics import generate_alerts
+
+    return generate_alerts(cube.exercise_weekly(exercise, start, end, routine))
+
+def show_when_ready(future, render, message):
+    """Desenha o resultado de uma tarefa em segundo plano.
+
+    Pronta: `render(resultado)` direto. Senão, um fragmento consulta a tarefa
+    a cada meio segundo (só ele reroda) e, quando termina, refaz a página.
+    """
+    if future.done():
+        try:
+            result = future.result()
+        except Exception as e:
+            st.error(f"Falha no cálculo: {e}")
+            return
+        render(result)
+        return
+
+    @st.fragment(run_every=0.5)
+    def poll():
+        if future.done():
+            st.rerun()
+        st.caption(f"⏳ {message}")
+
+    poll()
+
+def perf_debug_enabled():
+    """Painel de desempenho só com ?debug=1 na URL ou GYMRUN_DEBUG=1."""
+    return st.query_params.get('debug') == '1' or os.environ.get('GYMRUN_DEBUG') == '1'
+
+def show_perf_panel(run):
+    """Tabela com as etapas medidas neste rerun (painel escondido na sidebar)."""
+    frame = run.to_frame()
+    if frame.empty:
+        return
+    total = frame.loc[frame['depth'] == 0, 'seconds'].sum()
+    frame['stage'] = ['\u2003' * d + name for name, d in zip(frame['stage'], frame['depth'])]
+    frame = frame.drop(columns='depth').rename(columns={
+        'stage': 'Etapa', 'seconds': 'Tempo (s)', 'rows_in': 'Linhas (entrada)',
+        'rows_out': 'Linhas (saída)', 'mem_delta_mb': 'Δ Memória (MB)'})
+    with st.sidebar.expander("⏱️ Desempenho (debug)", expanded=True):
+        st.caption(f"Rerun {run.id}: {total:.3f} s em {len(frame)} etapas")
+        st.dataframe(frame, use_container_width=True, hide_index=True)
+
+def import_upload(store, uploaded_file, mappings=None, aliases=None):
+    """Importa o arquivo no armazenamento em blocos, com progresso na sidebar, e recarrega a página.
+
+    `aliases` são os mapeamentos novos confirmados pelo usuário: só são
+    lembrados se a importação der certo.
+    """
+    from data import import_export, refresh_snapshot
+    from name_match import save_aliases
+    from records import update_records
+    from rollups import update_rollups
+
+    bar = st.sidebar.progress(0.0, text="Importando...")
+
+    def show(p):
+        bar.progress(p.fraction, text=f"Importando... {p.rows:,} séries lidas, {p.inserted:,} novas")
+
+    # Importação, rollups, recordes e snapshot sob a mesma trava: outra sessão do mesmo atleta espera
+    with store.lock:
+        base_version = store.version()
+        result = import_export(store, uploaded_file, mappings or None, progress=show)
+        save_aliases(store, aliases or {})
+        update_rollups(store, result.rows, base_version)
+        update_records(store, result.rows, base_version)
+        refresh_snapshot(store)
+
+    st.session_state['last_uploaded_file'] = (store.path, uploaded_file.name)
+    st.session_state['last_merge'] = result[:3]
+    st.rerun()
+
 def main():
     st.title("💪 GymRun Dashboard - Análise de Progresso na Academia")
     st.markdown("### 📊 Visualização simples e direta do seu treino")
@@ -37,8 +155,41 @@ def main():
             - Rosca: 15kg × 10 repetições = 150kg de volume
             """
         )
-    # Carrega dados locais (base consolidada)
-    df_local = load_data()
+
+    # Cabeçalho já enviado ao navegador; agora sim as dependências pesadas
+    with stage('app.imports'):
+        import pandas as pd
+        from data import load_sets, load_rollup_cube, load_record_index, load_sessions, load_training_load, export_exercises, export_csv_bytes, calculate_trend
+        from storage import athlete_slug, get_store, list_athletes
+        from forecasting import forecast_all, forecast_ranking
+        from charts import create_comparison_chart, create_training_load_chart, chart_points, in_zoom, line_trace, bar_trace
+        from mappings import load_muscle_groups
+        from metrics import alerts_report, calculate_basic_metrics, calculate_exercise_stats, load_alerts
+        from name_match import confident, load_aliases, resolve_aliases, suggest
+        from training_load import TOTAL, latest
+
+    # Atleta: cada um tem sua partição; em branco usa a base padrão
+    athletes = list_athletes()
+    athlete_name = st.sidebar.text_input(
+        "👤 Atleta",
+        key='athlete',
+        help="Cada atleta tem sua própria base de dados. Deixe em branco para usar a base padrão."
+             + (f" Atletas existentes: {', '.join(athletes)}." if athletes else ""),
+    ).strip() or None
+    # Chave de cache pelo nome da pasta: "Ana" e "ana" compartilham as entradas (e o aquecimento)
+    try:
+        athlete = athlete_slug(athlete_name) if athlete_name else None
+    except ValueError as e:
+        st.error(f"{e}. Use letras ou números no nome do atleta.")
+        st.stop()
+
+    # Carrega dados locais (base consolidada) já enriquecidos e indexados; atleta + versão do
+    # armazenamento + correções de grupo muscular (muscle_groups.json) são a chave do cache,
+    # e o enriquecimento é reaproveitado se o conteúdo não mudou
+    store = get_store(athlete=athlete)
+    muscle_groups = load_muscle_groups(store)
+    sets = load_sets(store.version(), athlete, muscle_groups)
+    df_local = sets.frame
 
     # Upload de dados pela Sidebar logo no início
     st.sidebar.header("📂 Importação de Dados")
@@ -48,70 +199,87 @@ def main():
         help="Faça o upload do backup exportado do GymRun para atualizar os dados permanentemente."
     )
     
-    if uploaded_file is not None and uploaded_file.name != st.session_state.get('last_uploaded_file'):
+    if uploaded_file is not None and (store.path, uploaded_file.name) != st.session_state.get('last_uploaded_file'):
         try:
-            new_df = read_uploaded_file(uploaded_file)
-            if not new_df.empty:
+            # Primeira passada só pela coluna Exercise; as séries são importadas em blocos depois
+            new_exercises = export_exercises(uploaded_file)
+            if new_exercises:
                 old_exercises = set(df_local['Exercise'].dropna().unique()) if not df_local.empty else set()
-                new_exercises = set(new_df['Exercise'].dropna().unique())
                 
                 # Apenas exercícios que surgiram no novo dataset que não existiam no local
                 diff_exercises = sorted(list(new_exercises - old_exercises)) if old_exercises else []
+                # Renomeações confirmadas em uploads anteriores são aplicadas sem perguntar
+                remembered = resolve_aliases(diff_exercises, old_exercises, load_aliases(store))
+                diff_exercises = [e for e in diff_exercises if e not in remembered]
                 
                 if diff_exercises:
                     st.sidebar.warning("Novos exercícios detectados. Veja a área principal.")
                     st.warning("⚠️ **Novos exercícios encontrados!** A sua base importada tem exercícios que não existem no histórico atual.")
                     with st.expander("📝 Mapear Novos Nomes (Resolver para Continuar)", expanded=True):
                         st.markdown("Se você renomeou algum exercício no GymRun, escolha o nome antigo abaixo para não dividir seu histórico em dois gráficos separados. Se for um exercício totalmente novo, basta deixar na opção padrão.")
+                        if remembered:
+                            st.caption(f"{len(remembered)} nome(s) já mapeado(s) em uploads anteriores serão aplicados automaticamente.")
                         
-                        user_mappings = {}
-                        opts = ['(Manter como Novo)'] + sorted(list(old_exercises))
+                        user_mappings = dict(remembered)
+                        keep, other = '(Manter como Novo)', '(Outro exercício...)'
+                        # Só os nomes antigos mais parecidos; a lista inteira apenas se pedida
+                        suggestions = suggest(diff_exercises, old_exercises)
                         
                         for new_ex in diff_exercises:
-                            ans = st.selectbox(f"Mesclar '{new_ex}' com:", options=opts, key=f"map_{new_ex}")
-                            if ans != '(Manter como Novo)':
+                            candidates = suggestions[new_ex]
+                            scores = dict(candidates)
+                            ans = st.selectbox(
+                                f"Mesclar '{new_ex}' com:",
+                                options=[keep] + list(scores) + [other],
+                                index=1 if confident(candidates) else 0,
+                                format_func=lambda o, scores=scores: f"{o} ({scores[o]:.0%} parecido)" if o in scores else o,
+                                key=f"map_{new_ex}",
+                            )
+                            if ans == other:
+                                ans = st.selectbox(f"Exercício para '{new_ex}':", options=[keep] + sorted(old_exercises), key=f"map_all_{new_ex}")
+                            if ans != keep:
                                 user_mappings[new_ex] = ans
                                 
                         if st.button("Confirmar e Mesclar 🚀"):
-                            if user_mappings:
-                                new_df['Exercise'] = new_df['Exercise'].replace(user_mappings)
-                                
-                            combined_df = merge_datasets(df_local, new_df)
-                            save_dataset(combined_df, "gymrun_database.csv")
-                            
-                            st.session_state['last_uploaded_file'] = uploaded_file.name
-                            st.cache_data.clear()
-                            st.rerun()
+                            import_upload(store, uploaded_file, user_mappings,
+                                          aliases={k: v for k, v in user_mappings.items() if k not in remembered})
                             
                     # Interrompe o fluxo normal enquanto o usuário não resolver o mapeamento
                     return
                 else:
-                    # Fluxo normal, mescla direto se não há exercícios desconhecidos
-                    combined_df = merge_datasets(df_local, new_df)
-                    save_dataset(combined_df, "gymrun_database.csv")
-                    
-                    st.session_state['last_uploaded_file'] = uploaded_file.name
-                    st.cache_data.clear()
-                    st.sidebar.success("✅ Histórico mesclado com sucesso!")
-                    st.rerun()
+                    # Fluxo normal, mescla direto se não há exercícios desconhecidos (ou já mapeados)
+                    import_upload(store, uploaded_file, remembered)
         except Exception as e:
             st.sidebar.error(f"Erro ao processar arquivo: {e}")
+
+    # Resumo da última mesclagem (sobrevive ao st.rerun)
+    last_merge = st.session_state.pop('last_merge', None)
+    if last_merge:
+        inserted, updated, skipped = last_merge
+        st.sidebar.success(f"✅ Histórico mesclado: {inserted} séries novas, {updated} atualizadas, {skipped} já existentes.")
+
+    if not df_local.empty:
+        st.sidebar.download_button(
+            "⬇️ Exportar CSV",
+            data=export_csv_bytes(store.version(), athlete),
+            file_name="gymrun_database.csv",
+            mime="text/csv",
+            use_container_width=True,
+        )
             
     st.sidebar.divider()
     
     # Reset de Dados
     st.sidebar.header("⚠️ Reset de Dados")
     with st.sidebar.expander("Apagar Histórico"):
-        st.warning("Esta ação apagará todos os treinos registrados no sistema atualmente.")
+        st.warning(f"Esta ação apagará todos os treinos registrados {'de ' + athlete_name if athlete_name else 'na base padrão'}. As bases de outros atletas não são afetadas.")
         reset_password = st.text_input("Digite a senha para confirmar:", type="password")
         if st.button("🗑️ Zerar Base de Dados", use_container_width=True, type="primary"):
             if reset_password == "admin321":
                 empty_df = pd.DataFrame(columns=['Date', 'Time', 'Exercise', 'Set', 'Weight', 'Reps', 'Duration', 'Distance'])
-                # Usar o save_dataset para garantir o mesmo padrão UTF-8 e separador de sempre
-                save_dataset(empty_df, "gymrun_database.csv")
+                store.write(empty_df)
                 
                 st.session_state['last_uploaded_file'] = None
-                st.cache_data.clear()
                 st.rerun()
             elif reset_password == "":
                 st.error("Por favor, insira a senha.")
@@ -127,31 +295,49 @@ def main():
         st.warning("Nenhum dado encontrado. Faça o upload do arquivo de exportação (CSV ou EML) do GymRun no menu lateral ou certifique-se de que há um arquivo padrão na pasta.")
         return
 
-    # Métricas básicas
-    df = calculate_volume(df)
-    df['Estimated_1RM'] = df.apply(lambda row: calculate_1rm(row['Weight'], row['Reps']), axis=1)
-    df['MuscleGroup'] = df['Exercise'].astype(str).apply(map_exercise_to_group)
-
     # Sidebar – filtros e navegação simplificada
     st.sidebar.header("Navegação")
     page = st.sidebar.radio("Ir para:", ["Visão Geral", "Exercícios"], index=0)
 
     st.sidebar.header("Filtros")
-    min_date = df['Date'].min().date()
-    max_date = df['Date'].max().date()
+    # Séries em ordem de data: primeira e última linha
+    min_date = df['Date'].iloc[0].date()
+    max_date = df['Date'].iloc[-1].date()
     start_date = st.sidebar.date_input("📅 Data Inicial", value=min_date, min_value=min_date, max_value=max_date)
     end_date = st.sidebar.date_input("📅 Data Final", value=max_date, min_value=min_date, max_value=max_date)
 
-    routines = ['Todas'] + sorted(df['Routine'].dropna().unique().tolist())
+    routines = ['Todas'] + sets.values('Routine')
     selected_routine = st.sidebar.selectbox("🏋️ Rotina", routines)
-
-    # Aplica filtros globais
-    filtered_df = df[(df['Date'] >= pd.to_datetime(start_date)) & (df['Date'] <= pd.to_datetime(end_date))].copy()
-    if selected_routine != 'Todas':
-        filtered_df = filtered_df[filtered_df['Routine'] == selected_routine]
+    # Gráficos longos são reduzidos no servidor; um trecho selecionado no gráfico é reduzido de novo
+    full_resolution = st.sidebar.checkbox(
+        "🔍 Resolução total nos gráficos",
+        help="Por padrão, históricos longos são reduzidos a ~1 ponto por pixel (picos e vales preservados). "
+             "Arraste uma caixa sobre um gráfico para redesenhar só aquele trecho com todos os pontos, "
+             "ou marque para enviar tudo.",
+    )
+    wide_points = chart_points(1.0, full_resolution)
+    col_points = chart_points(2 / 3, full_resolution)
+
+    # Aplica filtros globais (fatia por data + posições da rotina, sem cópia)
+    routine_filter = None if selected_routine == 'Todas' else selected_routine
+    # Escopo dos trechos selecionados nos gráficos: mudou o filtro, a seleção recomeça
+    period = (start_date, end_date, routine_filter)
+    with stage('app.filter', df) as measured:
+        filtered_df = sets.select(start_date, end_date, Routine=routine_filter)
+        measured.rows_out = filtered_df
+
+    # Rollups pré-calculados (exercício, rotina, dia/semana) com os mesmos filtros
+    cube = load_rollup_cube(store.version(), athlete)
+    with stage('app.rollup_slice', cube.daily) as measured:
+        daily = cube.daily_slice(start_date, end_date, routine_filter)
+        measured.rows_out = daily
 
     # Página 1: Visão Geral
     if page == "Visão Geral":
+        import plotly.express as px
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+
         # Calcular métricas básicas
         basic_metrics = calculate_basic_metrics(filtered_df)
         
@@ -166,62 +352,125 @@ def main():
             st.metric("⚖️ Volume Médio/Série", f"{basic_metrics['volume_medio']:.0f} kg")
 
         st.subheader("📈 Evolução do Volume")
-        daily_volume = filtered_df.groupby('Date')['Volume'].sum().reset_index()
+        daily_volume = daily.groupby('Date')['Volume'].sum().reset_index()
         daily_volume['Trend'] = calculate_trend(daily_volume, 'Volume')
+        daily_volume = in_zoom(daily_volume, chart_zoom('volume', period))
         fig_v = go.Figure()
-        fig_v.add_trace(go.Scatter(x=daily_volume['Date'], y=daily_volume['Volume'], mode='lines+markers', name='Volume'))
-        fig_v.add_trace(go.Scatter(x=daily_volume['Date'], y=daily_volume['Trend'], mode='lines', name='Tendência', line=dict(color='red')))
+        fig_v.add_trace(line_trace(daily_volume['Date'], daily_volume['Volume'], wide_points, mode='lines+markers', name='Volume'))
+        fig_v.add_trace(line_trace(daily_volume['Date'], daily_volume['Trend'], wide_points, mode='lines', name='Tendência', line=dict(color='red')))
         fig_v.update_layout(xaxis_title='Data', yaxis_title='Volume (kg)')
-        st.plotly_chart(fig_v, use_container_width=True)
+        show_chart(fig_v, 'volume', zoom=period)
+
+        st.subheader("⚡ Carga de Treino (ACWR e Fitness-Fadiga)")
+        # Médias de 7/28 dias e o modelo de Banister usam todo o histórico; o período só recorta o gráfico
+        load = load_training_load(store.version(), athlete, routine_filter, muscle_groups)
+        if load.empty:
+            st.info("Sem dados para calcular a carga de treino.")
+        else:
+            groups = load['Group'].unique().tolist()
+            groups = [TOTAL] + sorted(g for g in groups if g != TOTAL)
+            group = st.selectbox("Grupo", groups, key='load_group',
+                                 help="ACWR entre 0,8 e 1,3 é a faixa usual; acima de 1,5 indica pico de carga.")
+            load_scope = period + (group,)
+            load_start, load_end = chart_zoom('training_load', load_scope) or (start_date, end_date)
+            show_chart(create_training_load_chart(load, group, load_start, load_end, wide_points), 'training_load',
+                       zoom=load_scope)
+            for alert in load_alerts(latest(load)):
+                st.warning(alert)
+
+        st.subheader("⏱️ Sessões: Duração, Descanso e Densidade")
+        # Sessões pelos horários das séries (dois treinos no dia contam separados)
+        sessions = load_sessions(store.version(), athlete, muscle_groups)
+        in_period = sessions['Date'].between(pd.Timestamp(start_date), pd.Timestamp(end_date))
+        if routine_filter is not None:
+            in_period &= sessions['Routine'] == routine_filter
+        period_sessions = sessions[in_period]
+        if period_sessions.empty:
+            st.info("Sem sessões no período selecionado.")
+        else:
+            s1, s2, s3, s4 = st.columns(4)
+            with s1:
+                st.metric("🏋️ Sessões", len(period_sessions))
+            with s2:
+                st.metric("⏳ Duração Mediana", f"{period_sessions['DurationMin'].median():.0f} min")
+            with s3:
+                st.metric("😮‍💨 Descanso Mediano", f"{period_sessions['RestMedian'].median():.0f} s",
+                          help="Intervalo entre séries seguidas do mesmo exercício (inclui a execução da série).")
+            with s4:
+                st.metric("⚡ Densidade Mediana", f"{period_sessions['Density'].median():.0f} kg/min",
+                          help="Volume da sessão dividido pela duração.")
+            shown = in_zoom(period_sessions, chart_zoom('sessions', period), 'Start')
+            fig_s = make_subplots(specs=[[{'secondary_y': True}]])
+            fig_s.add_trace(line_trace(shown['Start'], shown['Density'], wide_points,
+                                       mode='lines+markers', name='Densidade (kg/min)'), secondary_y=False)
+            fig_s.add_trace(line_trace(shown['Start'], shown['RestMedian'], wide_points,
+                                       mode='lines', name='Descanso mediano (s)', line=dict(color='orange')), secondary_y=True)
+            fig_s.update_yaxes(title_text='kg/min', secondary_y=False)
+            fig_s.update_yaxes(title_text='Descanso (s)', secondary_y=True)
+            fig_s.update_layout(xaxis_title='Data')
+            show_chart(fig_s, 'sessions', zoom=period)
 
         colA, colB = st.columns(2)
         with colA:
             st.subheader("🏆 Top Exercícios por Volume")
-            topx = filtered_df.groupby('Exercise')['Volume'].sum().sort_values(ascending=False).head(10)
-            st.plotly_chart(px.bar(x=topx.values, y=topx.index, orientation='h', labels={'x':'Volume (kg)', 'y':'Exercício'}), use_container_width=True)
+            topx = daily.groupby('Exercise', observed=True)['Volume'].sum().sort_values(ascending=False).head(10)
+            show_chart(px.bar(x=topx.values, y=topx.index, orientation='h', labels={'x':'Volume (kg)', 'y':'Exercício'}), 'top_exercises')
         with colB:
             st.subheader("🎯 Rotinas")
             rc = filtered_df['Routine'].value_counts()
+            rc = rc[rc > 0]
             if not rc.empty:
-                st.plotly_chart(px.pie(values=rc.values, names=rc.index), use_container_width=True)
+                show_chart(px.pie(values=rc.values, names=rc.index), 'routines')
             else:
                 st.info("Sem dados de rotina para o período.")
 
         st.subheader("🔥 Consistência (Mapa de Calor)")
-        cal = filtered_df.groupby('Date')['Volume'].sum().reset_index()
+        cal = daily.groupby('Date')['Volume'].sum().reset_index()
         if not cal.empty:
             # Converter Period para string para evitar erro de serialização no Plotly/Streamlit
             cal['Month'] = cal['Date'].dt.to_period('M').astype(str)
             cal['Day'] = cal['Date'].dt.day
             pivot = cal.pivot_table(values='Volume', index='Month', columns='Day', aggfunc='sum', fill_value=0)
-            st.plotly_chart(px.imshow(pivot, aspect='auto', labels=dict(x='Dia', y='Mês', color='Volume')), use_container_width=True)
+            show_chart(px.imshow(pivot, aspect='auto', labels=dict(x='Dia', y='Mês', color='Volume')), 'heatmap')
         else:
             st.info("Sem treinos no período selecionado.")
 
     # Página 2: Explorar Exercícios
     else:
+        import plotly.graph_objects as go
+
         st.subheader("🔎 Explorar e Analisar Exercícios")
         left, right = st.columns([1, 2])
 
+        # Recordes pessoais (todo o histórico, todas as rotinas): com o filtro cobrindo a base
+        # inteira, os máximos do topo são consultas diretas ao índice em vez de agregações
+        records = load_record_index(store.version(), athlete)
+        full_period = routine_filter is None and start_date <= min_date and end_date >= max_date
+
+        def period_bests(ex, ex_daily):
+            if full_period:
+                return records.best(ex, 'weight'), records.best(ex, '1rm')
+            return ex_daily['MaxWeight'].max(), ex_daily['Max1RM'].max()
+
         with left:
             st.markdown("#### Selecione o Exercício")
             
             # Filtro opcional de grupo muscular para facilitar a busca
-            group_options = ['Todos'] + sorted(filtered_df['MuscleGroup'].dropna().unique().tolist())
+            group_options = ['Todos'] + sets.values('MuscleGroup', start_date, end_date, Routine=routine_filter)
             sel_grp = st.selectbox("Filtrar por Grupo (opcional)", options=group_options, index=0)
 
             # Filtro opcional por rotina
-            routine_options = ['Todas'] + sorted(filtered_df['Routine'].dropna().unique().tolist())
+            routine_options = ['Todas'] + sets.values('Routine', start_date, end_date, Routine=routine_filter)
             sel_rtn = st.selectbox("Filtrar por Rotina (opcional)", options=routine_options, index=0)
 
-            base = filtered_df
-            if sel_grp != 'Todos':
-                base = base[base['MuscleGroup'] == sel_grp]
-            if sel_rtn != 'Todas':
-                base = base[base['Routine'] == sel_rtn]
+            # As opções de rotina já respeitam o filtro global: sel_rtn só pode restringi-lo
+            ex_filters = dict(
+                Routine=routine_filter if sel_rtn == 'Todas' else sel_rtn,
+                MuscleGroup=None if sel_grp == 'Todos' else sel_grp,
+            )
             
             # Ordena os exercícios do mais recentemente treinado para o menos
-            latest_dates = base.groupby('Exercise')['Date'].max()
+            latest_dates = sets.last_dates('Exercise', start_date, end_date, **ex_filters)
             ex_opts = latest_dates.sort_values(ascending=False).index.tolist()
 
             if not ex_opts:
@@ -240,120 +489,208 @@ def main():
                 else:
                     st.info("Não há outro exercício aplicável para comparar.")
         with right:
+            # Previsão e alertas em segundo plano; os próximos exercícios da lista (ordem de
+            # recência, a ordem em que costumam ser visitados) já ficam encaminhados
+            tasks = get_tasks()
+            scope = (athlete, store.version(), start_date, end_date, routine_filter)
+            task_args = (cube, selected_ex, start_date, end_date, routine_filter)
+            fc_future = tasks.submit(scope + ('forecast', selected_ex), exercise_forecast, *task_args, athlete)
+            alerts_future = tasks.submit(scope + ('alerts', selected_ex), exercise_alerts, *task_args)
+            pos = ex_opts.index(selected_ex)
+            tasks.prefetch([
+                (scope + (kind, ex), fn, (cube, ex, start_date, end_date, routine_filter) + extra)
+                for ex in ex_opts[pos + 1:pos + 1 + PREFETCH_AHEAD]
+                for kind, fn, extra in (('forecast', exercise_forecast, (athlete,)), ('alerts', exercise_alerts, ()))
+            ])
+
             # Análise do exercício principal
-            ex_df = filtered_df[filtered_df['Exercise'] == selected_ex]
-            if ex_df.empty:
+            ex_daily = cube.exercise_daily(selected_ex, start_date, end_date, routine_filter)
+            ex_scope = period + (selected_ex,)
+            if ex_daily.empty:
                 st.info("Sem dados para o exercício selecionado no período.")
             else:
                 # Resumo no topo
                 c1, c2, c3 = st.columns(3)
+                max_weight, max_1rm = period_bests(selected_ex, ex_daily)
                 with c1:
-                    max_weight = ex_df['Weight'].max()
                     max_w_str = f"{max_weight:.1f} kg" if not pd.isna(max_weight) else "0.0 kg"
                     st.metric("Peso Máx.", max_w_str)
                 with c2:
-                    max_1rm = ex_df['Estimated_1RM'].max()
                     max_1rm_str = f"{max_1rm:.1f} kg" if not pd.isna(max_1rm) else "0.0 kg"
                     st.metric("1RM Est. Máx.", max_1rm_str)
                 with c3:
-                    st.metric("Volume Total", f"{ex_df['Volume'].sum():.0f} kg")
+                    st.metric("Volume Total", f"{ex_daily['Volume'].sum():.0f} kg")
 
                 # Abas de análise
-                tabs = st.tabs(["Peso", "1RM", "Volume", "Previsão 1RM", "Tabela", "Alertas"]) 
+                tabs = st.tabs(["Peso", "1RM", "Volume", "Previsão 1RM", "Tabela", "Alertas", "Recordes"])
 
                 # Peso
                 with tabs[0]:
-                    mx = ex_df.groupby('Date')['Weight'].max().reset_index()
+                    mx = ex_daily['MaxWeight'].rename('Weight').reset_index()
                     mx['Trend'] = calculate_trend(mx, 'Weight')
+                    mx = in_zoom(mx, chart_zoom('weight', ex_scope))
                     fig_w = go.Figure()
-                    fig_w.add_trace(go.Scatter(x=mx['Date'], y=mx['Weight'], mode='lines+markers', name='Peso Máx.'))
-                    fig_w.add_trace(go.Scatter(x=mx['Date'], y=mx['Trend'], mode='lines', name='Tendência', line=dict(color='red', dash='dash')))
+                    fig_w.add_trace(line_trace(mx['Date'], mx['Weight'], col_points, mode='lines+markers', name='Peso Máx.'))
+                    fig_w.add_trace(line_trace(mx['Date'], mx['Trend'], col_points, mode='lines', name='Tendência', line=dict(color='red', dash='dash')))
                     fig_w.update_layout(title=f"Peso Máximo — {selected_ex}")
-                    st.plotly_chart(fig_w, use_container_width=True)
+                    show_chart(fig_w, 'weight', zoom=ex_scope)
 
                 # 1RM
                 with tabs[1]:
-                    if not ex_df['Estimated_1RM'].isna().all():
-                        m1 = ex_df.groupby('Date')['Estimated_1RM'].max().reset_index()
+                    if not ex_daily['Max1RM'].isna().all():
+                        m1 = ex_daily['Max1RM'].rename('Estimated_1RM').reset_index()
                         m1['Trend'] = calculate_trend(m1, 'Estimated_1RM')
+                        m1 = in_zoom(m1, chart_zoom('1rm', ex_scope))
                         fig_1 = go.Figure()
-                        fig_1.add_trace(go.Scatter(x=m1['Date'], y=m1['Estimated_1RM'], mode='lines+markers', name='1RM Est.'))
-                        fig_1.add_trace(go.Scatter(x=m1['Date'], y=m1['Trend'], mode='lines', name='Tendência', line=dict(color='red', dash='dash')))
+                        fig_1.add_trace(line_trace(m1['Date'], m1['Estimated_1RM'], col_points, mode='lines+markers', name='1RM Est.'))
+                        fig_1.add_trace(line_trace(m1['Date'], m1['Trend'], col_points, mode='lines', name='Tendência', line=dict(color='red', dash='dash')))
                         fig_1.update_layout(title=f"1RM Estimado — {selected_ex}")
-                        st.plotly_chart(fig_1, use_container_width=True)
+                        show_chart(fig_1, '1rm', zoom=ex_scope)
                     else:
                         st.info("Sem dados suficientes para 1RM.")
 
                 # Volume
                 with tabs[2]:
-                    vol = ex_df.groupby('Date')['Volume'].sum().reset_index()
+                    vol = ex_daily['Volume'].reset_index()
                     vol['Trend'] = calculate_trend(vol, 'Volume')
+                    vol = in_zoom(vol, chart_zoom('exercise_volume', ex_scope))
                     fig_v2 = go.Figure()
-                    fig_v2.add_trace(go.Bar(x=vol['Date'], y=vol['Volume'], name='Volume'))
-                    fig_v2.add_trace(go.Scatter(x=vol['Date'], y=vol['Trend'], name='Tendência', mode='lines', line=dict(color='red')))
+                    fig_v2.add_trace(bar_trace(vol['Date'], vol['Volume'], col_points, name='Volume'))
+                    fig_v2.add_trace(line_trace(vol['Date'], vol['Trend'], col_points, name='Tendência', mode='lines', line=dict(color='red')))
                     fig_v2.update_layout(title=f"Volume — {selected_ex}")
-                    st.plotly_chart(fig_v2, use_container_width=True)
+                    show_chart(fig_v2, 'exercise_volume', zoom=ex_scope)
 
                 # Previsão 1RM
-                with tabs[3]:
-                    m1 = ex_df.groupby('Date')['Estimated_1RM'].max().sort_index()
-                    if not m1.empty:
-                        m1.index = pd.to_datetime(m1.index)
-                        fc = forecast_1rm_series(m1)
-                        if fc is not None:
-                            hist_weekly = m1.resample('W').max().dropna().reset_index()
-                            fig_fc = go.Figure()
-                            fig_fc.add_trace(go.Scatter(x=hist_weekly['Date'], y=hist_weekly['Estimated_1RM'], mode='lines+markers', name='Hist Semanal'))
-                            fig_fc.add_trace(go.Scatter(x=fc['Date'], y=fc['Forecast'], mode='lines+markers', name='Previsão', line=dict(color='green')))
-                            if 'Lower' in fc.columns and 'Upper' in fc.columns:
-                                fig_fc.add_trace(go.Scatter(x=pd.concat([fc['Date'], fc['Date'][::-1]]),
-                                                            y=pd.concat([fc['Upper'], fc['Lower'][::-1]]),
-                                                            fill='toself',
-                                                            fillcolor='rgba(0,128,0,0.15)',
-                                                            line=dict(color='rgba(0,0,0,0)'),
-                                                            name='IC'))
-                            fig_fc.update_layout(title=f"Previsão Semanal de 1RM — {selected_ex}")
-                            st.plotly_chart(fig_fc, use_container_width=True)
-                        else:
-                            st.info("Dados insuficientes para prever 1RM (necessário histórico semanal).")
-                    else:
+                def show_forecast(result):
+                    hist_weekly, fc = result
+                    if hist_weekly is None:
                         st.info("Sem dados de 1RM para prever.")
+                    elif fc is not None:
+                        fig_fc = go.Figure()
+                        fig_fc.add_trace(go.Scatter(x=hist_weekly['Date'], y=hist_weekly['Estimated_1RM'], mode='lines+markers', name='Hist Semanal'))
+                        fig_fc.add_trace(go.Scatter(x=fc['Date'], y=fc['Forecast'], mode='lines+markers', name='Previsão', line=dict(color='green')))
+                        if 'Lower' in fc.columns and 'Upper' in fc.columns:
+                            fig_fc.add_trace(go.Scatter(x=pd.concat([fc['Date'], fc['Date'][::-1]]),
+                                                        y=pd.concat([fc['Upper'], fc['Lower'][::-1]]),
+                                                        fill='toself',
+                                                        fillcolor='rgba(0,128,0,0.15)',
+                                                        line=dict(color='rgba(0,0,0,0)'),
+                                                        name='IC'))
+                        fig_fc.update_layout(title=f"Previsão Semanal de 1RM — {selected_ex}")
+                        show_chart(fig_fc, 'forecast')
+                    else:
+                        st.info("Dados insuficientes para prever 1RM (necessário histórico semanal).")
+
+                with tabs[3]:
+                    show_when_ready(fc_future, show_forecast, "Calculando a previsão de 1RM...")
 
                 # Tabela
                 with tabs[4]:
-                    sd = ex_df[['Date', 'Set', 'Weight', 'Reps', 'Volume']].copy()
+                    ex_df = sets.select(start_date, end_date, Routine=routine_filter, Exercise=selected_ex)
+                    rest = ex_df['RestSeconds'].median()
+                    if not pd.isna(rest):
+                        st.caption(f"Descanso mediano entre séries: {rest:.0f} s")
+                    sd = ex_df[['Date', 'Set', 'Weight', 'Reps', 'Volume', 'RestSeconds']].copy()
                     sd['Date'] = sd['Date'].dt.strftime('%d/%m/%Y')
                     sd = sd.sort_values(['Date', 'Set'], ascending=[False, True])
-                    sd.columns = ['Data', 'Série', 'Peso (kg)', 'Repetições', 'Volume (kg)']
+                    sd.columns = ['Data', 'Série', 'Peso (kg)', 'Repetições', 'Volume (kg)', 'Descanso (s)']
                     st.dataframe(sd, use_container_width=True, height=350)
 
                 # Alertas
-                with tabs[5]:
-                    alerts = generate_alerts(ex_df, filtered_df, selected_ex)
+                def show_alerts(alerts):
                     if alerts:
                         for a in alerts:
                             st.warning(a)
                     else:
                         st.success("Sem alertas no momento.")
 
+                with tabs[5]:
+                    show_when_ready(alerts_future, show_alerts, "Verificando alertas...")
+
+                # Recordes: linha do tempo dos PRs no período e melhor peso por nº de repetições
+                with tabs[6]:
+                    st.caption("Recordes consideram todas as rotinas.")
+                    prs = records.history(selected_ex, start_date, end_date)
+                    if prs.empty:
+                        st.info("Nenhum recorde batido no período.")
+                    else:
+                        kinds = {'weight': 'Peso', '1rm': '1RM Est.', 'session_volume': 'Volume da sessão'}
+                        fig_pr = go.Figure()
+                        for kind, label in kinds.items():
+                            part = prs[prs['Kind'] == kind]
+                            if not part.empty:
+                                fig_pr.add_trace(go.Scatter(x=part['Date'], y=part['Value'], mode='markers', name=label,
+                                                            yaxis='y2' if kind == 'session_volume' else 'y'))
+                        fig_pr.update_layout(title=f"Recordes — {selected_ex}", yaxis=dict(title='kg'),
+                                             yaxis2=dict(title='Volume (kg)', overlaying='y', side='right'))
+                        show_chart(fig_pr, 'records')
+                        pr_table = prs.assign(
+                            Date=prs['Date'].dt.strftime('%d/%m/%Y'),
+                            Kind=prs['Kind'].map(kinds),
+                            Reps=prs['Reps'].where(prs['Kind'] == 'weight').astype('Int64'),
+                            Gain=prs['Value'] - prs['Previous'],
+                        )[['Date', 'Kind', 'Reps', 'Value', 'Previous', 'Gain']]
+                        pr_table.columns = ['Data', 'Recorde', 'Repetições', 'Marca (kg)', 'Anterior (kg)', 'Ganho (kg)']
+                        st.dataframe(pr_table.round(1), use_container_width=True, hide_index=True, height=300)
+                    rep_max = records.rep_maxes(selected_ex)
+                    if not rep_max.empty:
+                        st.markdown("**Melhor peso por nº de repetições**")
+                        rep_max['Date'] = rep_max['Date'].dt.strftime('%d/%m/%Y')
+                        rep_max.columns = ['Repetições', 'Peso (kg)', 'Data']
+                        st.dataframe(rep_max, use_container_width=True, hide_index=True)
+
                 # Comparação lado a lado
                 if selected_ex2:
                     st.markdown("---")
                     st.subheader("Comparação")
-                    comp_fig = create_comparison_chart(filtered_df, selected_ex, selected_ex2)
-                    st.plotly_chart(comp_fig, use_container_width=True)
+                    comp_scope = period + (selected_ex, selected_ex2)
+                    comp_daily = in_zoom(daily, chart_zoom('comparison', comp_scope))
+                    comp_fig = create_comparison_chart(comp_daily, selected_ex, selected_ex2, col_points)
+                    show_chart(comp_fig, 'comparison', zoom=comp_scope)
 
                     colm1, colm2 = st.columns(2)
-                    with colm1:
-                        d1 = filtered_df[filtered_df['Exercise'] == selected_ex]
-                        st.metric("Peso Máx.", f"{d1['Weight'].max():.1f} kg")
-                        st.metric("1RM Est. Máx.", f"{d1['Estimated_1RM'].max():.1f} kg")
-                        st.metric("Volume Total", f"{d1['Volume'].sum():.0f} kg")
-                    with colm2:
-                        d2 = filtered_df[filtered_df['Exercise'] == selected_ex2]
-                        st.metric("Peso Máx.", f"{d2['Weight'].max():.1f} kg")
-                        st.metric("1RM Est. Máx.", f"{d2['Estimated_1RM'].max():.1f} kg")
-                        st.metric("Volume Total", f"{d2['Volume'].sum():.0f} kg")
+                    for col, ex_name in [(colm1, selected_ex), (colm2, selected_ex2)]:
+                        with col:
+                            dd = cube.exercise_daily(ex_name, start_date, end_date, routine_filter)
+                            dd_weight, dd_1rm = period_bests(ex_name, dd)
+                            st.metric("Peso Máx.", f"{dd_weight:.1f} kg")
+                            st.metric("1RM Est. Máx.", f"{dd_1rm:.1f} kg")
+                            st.metric("Volume Total", f"{dd['Volume'].sum():.0f} kg")
+
+        # Ranking de progressão prevista (todos os exercícios do filtro)
+        st.markdown("---")
+        if st.checkbox("Mostrar ranking de progressão prevista"):
+            ranked_daily = daily[daily['Exercise'].isin(ex_opts)]
+            with st.spinner("Calculando previsões de todos os exercícios..."):
+                ranking = forecast_ranking(forecast_all(ranked_daily, horizon=6, value_col='Max1RM',
+                                                            scope=(athlete, start_date, end_date, routine_filter)))
+            if ranking.empty:
+                st.info("Dados insuficientes para prever 1RM (necessário histórico semanal).")
+            else:
+                ranking = ranking.rename(columns={'Exercise': 'Exercício', 'Last': '1RM Atual (kg)',
+                                                  'Forecast': '1RM em 6 sem. (kg)', 'Gain': 'Ganho (kg)',
+                                                  'GainPct': 'Ganho (%)', 'Model': 'Modelo'})
+                st.dataframe(ranking.round(1), use_container_width=True, hide_index=True)
+
+        # Relatório de platô e queda de volume (todos os exercícios do filtro)
+        if st.checkbox("Mostrar relatório de platô e queda de volume"):
+            weekly = cube.weekly_slice(start_date, end_date, routine_filter)
+            report = alerts_report(weekly[weekly['Exercise'].isin(ex_opts)])
+            report = report[report['Plateau'] | report['VolumeDrop']]
+            if report.empty:
+                st.success("Nenhum platô ou queda de volume detectado.")
+            else:
+                report = report[['Exercise', 'Weeks', 'RelSlope', 'Plateau', 'VolumeChange', 'VolumeDrop']].assign(
+                    RelSlope=lambda r: (r['RelSlope'] * 100).round(2),
+                    VolumeChange=lambda r: (r['VolumeChange'] * 100).round(1))
+                report.columns = ['Exercício', 'Semanas', 'Inclinação 1RM (%/sem.)', 'Platô', 'Variação Volume (%)', 'Queda Volume']
+                st.dataframe(report, use_container_width=True, hide_index=True)
 
 if __name__ == "__main__":
-    main()
+    with recording('app') as run:
+        with stage('app.main'):
+            main()
+    if perf_debug_enabled():
+        show_perf_panel(run)
+    # Página já desenhada: pré-carrega Plotly, pmdarima e as bases em segundo plano (uma vez por processo)
+    warmup.start()
@@ -0,0 +1,84 @@
+"""Tarefas em segundo plano do dashboard (previsões e alertas por exercício).
+
+Um executor de threads por processo, compartilhado pelas sessões. Cada
+tarefa tem uma chave: pedir de novo a mesma chave devolve o mesmo Future (em
+andamento ou já pronto), então reruns e a pré-busca não repetem trabalho.
+A pré-busca adianta os próximos exercícios da lista; pedidos de pré-busca que
+ainda não começaram são cancelados quando a lista muda.
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads do executor (previsões são CPU; duas deixam o rerun respirar)
+WORKERS = int(os.environ.get('GYMRUN_BACKGROUND_WORKERS', 2))
+# Quantos exercícios à frente do selecionado são pré-calculados
+PREFETCH_AHEAD = 3
+# Resultados prontos guardados (os mais antigos saem primeiro)
+MAX_RESULTS = 256
+
+class BackgroundTasks:
+    """Executor com deduplicação por chave e pré-busca cancelável."""
+
+    def __init__(self, workers=WORKERS, max_results=MAX_RESULTS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gymrun-bg')
+        self._futures = OrderedDict()
+        self._prefetched = {}
+        self._lock = threading.Lock()
+        self.max_results = max_results
+
+    def submit(self, key, fn, *args, **kwargs):
+        """Future da tarefa `key`, criando-a se ainda não existir (ou se falhou/foi cancelada)."""
+        with self._lock:
+            fut = self._futures.get(key)
+            if fut is not None and not fut.cancelled() and not (fut.done() and fut.exception() is not None):
+                self._futures.move_to_end(key)
+                # Pedida de verdade: não é mais candidata a cancelamento
+                self._prefetched.pop(key, None)
+                return fut
+            fut = self._executor.submit(fn, *args, **kwargs)
+            self._futures[key] = fut
+            self._evict()
+            return fut
+
+    def prefetch(self, tasks):
+        """Adianta as tarefas [(key, fn, args), ...]; pré-buscas anteriores fora da lista, se não começaram, são canceladas."""
+        wanted = {key for key, _fn, _args in tasks}
+        with self._lock:
+            for key in list(self._prefetched):
+                if key not in wanted and self._prefetched.pop(key).cancel():
+                    self._futures.pop(key, None)
+        for key, fn, args in tasks:
+            with self._lock:
+                if key in self._futures and not self._futures[key].cancelled():
+                    continue
+                fut = self._executor.submit(fn, *args)
+                self._futures[key] = fut
+                self._prefetched[key] = fut
+                self._evict()
+
+    def _evict(self):
+        # Só descarta o que já terminou; tarefas em andamento ficam
+        excess = len(self._futures) - self.max_results
+        for key in list(self._futures):
+            if excess <= 0:
+                break
+            if self._futures[key].done():
+                del self._futures[key]
+                self._prefetched.pop(key, None)
+                excess -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+_TASKS = None
+_TASKS_LOCK = threading.Lock()
+
+def get_tasks():
+    """Executor compartilhado do processo (criado na primeira chamada)."""
+    global _TASKS
+    with _TASKS_LOCK:
+        if _TASKS is None:
+            _TASKS = BackgroundTasks()
+        return _TASKS
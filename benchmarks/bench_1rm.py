@@ -0,0 +1,51 @@
+"""Benchmark: 1RM por linha (df.apply + calculate_1rm) vs. estimate_1rm vetorizado.
+
+Uso:
+    python benchmarks/bench_1rm.py [fator_de_escala]
+
+Replica o gymrun_database.csv N vezes (padrão 100x) e compara os tempos.
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+from data import calculate_1rm, estimate_1rm
+
+
+def _best_of(fn, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main(scale=100):
+    base = pd.read_csv(os.path.join(ROOT, 'gymrun_database.csv'), sep=';', encoding='utf-8')
+    df = pd.concat([base] * scale, ignore_index=True)
+    for col in ['Weight', 'Reps']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    t_apply, ref = _best_of(lambda: df.apply(lambda row: calculate_1rm(row['Weight'], row['Reps']), axis=1), repeat=1)
+    t_vec, est = _best_of(lambda: estimate_1rm(df))
+    np.testing.assert_allclose(est.to_numpy(), ref.to_numpy(dtype=float))
+
+    print(f"linhas: {len(df):,}")
+    print(f"df.apply + calculate_1rm: {t_apply * 1000:10.1f} ms")
+    print(f"estimate_1rm (epley):     {t_vec * 1000:10.1f} ms  ({t_apply / t_vec:,.0f}x)")
+    for formula in ['brzycki', 'lombardi', 'blend']:
+        t, _ = _best_of(lambda: estimate_1rm(df, formula=formula))
+        label = f"estimate_1rm ({formula}):"
+        print(f"{label:<26}{t * 1000:10.1f} ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
@@ -0,0 +1,69 @@
+"""Benchmark: leitura do CSV GymRun (caminho antigo vs. read_gymrun_csv tipado).
+
+Uso:
+    python benchmarks/bench_parse.py [fator_de_escala]
+
+Replica o gymrun_database.csv N vezes (padrão 100x) em um arquivo temporário e
+mede tempo de parse, pico de memória (tracemalloc) e memória do DataFrame final.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+
+from data import read_gymrun_csv
+
+
+def legacy_parse(path):
+    """Caminho anterior: read_csv sem esquema + DateTime via strftime + coerção coluna a coluna."""
+    df = pd.read_csv(path, sep=';', encoding='utf-8')
+    df['Date'] = pd.to_datetime(df['Date'], format='%d.%m.%Y')
+    df['DateTime'] = pd.to_datetime(df['Date'].dt.strftime('%Y-%m-%d') + ' ' + df['Time'])
+    for col in ['Weight', 'Reps', 'Duration', 'Distance']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def _measure(fn, path):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    df = fn(path)
+    elapsed = time.perf_counter() - t0
+    _cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, df.memory_usage(deep=True).sum(), len(df)
+
+
+def main(scale=100):
+    with open(os.path.join(ROOT, 'gymrun_database.csv'), encoding='utf-8') as f:
+        header, *rows = f.read().splitlines()
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as tmp:
+        tmp.write(header + '\n')
+        for _ in range(scale):
+            tmp.write('\n'.join(rows) + '\n')
+        path = tmp.name
+    try:
+        results = {
+            'antigo': _measure(legacy_parse, path),
+            'tipado': _measure(read_gymrun_csv, path),
+        }
+    finally:
+        os.remove(path)
+
+    print(f"linhas: {results['antigo'][3]:,} ({scale}x)")
+    print(f"{'':8}{'tempo (ms)':>12}{'pico (MB)':>12}{'DataFrame (MB)':>16}")
+    for name, (elapsed, peak, size, _n) in results.items():
+        print(f"{name:8}{elapsed * 1000:12.1f}{peak / 2**20:12.1f}{size / 2**20:16.1f}")
+    (t0, p0, s0, _), (t1, p1, s1, _) = results['antigo'], results['tipado']
+    print(f"redução: tempo {1 - t1 / t0:.0%}, pico {1 - p1 / p0:.0%}, DataFrame {1 - s1 / s0:.0%}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
@@ -0,0 +1,130 @@
+"""Benchmark de partida a frio do dashboard: de `streamlit run` ao primeiro desenho.
+
+Uso:
+    python benchmarks/coldstart.py                  # 5 partidas, compara com baseline.json
+    python benchmarks/coldstart.py --runs 10 --save-baseline
+
+Cada partida sobe um `streamlit run app.py` novo (headless, porta livre),
+espera o /_stcore/health e abre uma sessão pelo websocket, como o navegador
+faz. Mede, a partir do início do processo:
+  server_ready  servidor respondendo ao health check
+  first_paint   primeiro elemento recebido (título da página)
+  first_render  fim do primeiro rerun (página inteira desenhada)
+Reporta a mediana das partidas; regressões seguem as regras de suite.py.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+# Antes do Streamlit: suite importa data, que usaria st.cache_data sem runtime
+from suite import BASELINE, ROOT, compare
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+METRICS = ('server_ready', 'first_paint', 'first_render')
+# Chave da partida a frio em baseline.json (ao lado das escalas de suite.py)
+BASELINE_KEY = 'coldstart'
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+async def _first_session(port, t0, timeout):
+    async with websockets.connect(f'ws://localhost:{port}/_stcore/stream', max_size=None) as ws:
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        msg.rerun_script.page_script_hash = ''
+        await ws.send(msg.SerializeToString())
+        first_paint = None
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await asyncio.wait_for(ws.recv(), timeout))
+            kind = fwd.WhichOneof('type')
+            if kind == 'delta' and first_paint is None:
+                first_paint = time.perf_counter() - t0
+            elif kind == 'script_finished':
+                return first_paint, time.perf_counter() - t0
+
+def start_once(app, timeout=60):
+    """Uma partida a frio; retorna {métrica: segundos}."""
+    port = _free_port()
+    cmd = [sys.executable, '-m', 'streamlit', 'run', app, '--server.headless', 'true',
+           '--server.port', str(port), '--server.enableXsrfProtection', 'false',
+           '--browser.gatherUsageStats', 'false']
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=os.path.dirname(app), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"streamlit encerrou com código {proc.returncode}")
+            if time.perf_counter() - t0 > timeout:
+                raise TimeoutError("servidor não respondeu ao health check")
+            try:
+                urllib.request.urlopen(f'http://localhost:{port}/_stcore/health', timeout=1).read()
+                break
+            except OSError:
+                time.sleep(0.02)
+        ready = time.perf_counter() - t0
+        first_paint, first_render = asyncio.run(_first_session(port, t0, timeout))
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return {'server_ready': ready, 'first_paint': first_paint, 'first_render': first_render}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partida a frio do dashboard (streamlit run -> primeiro desenho).")
+    parser.add_argument('--app', default=os.path.join(ROOT, 'app.py'))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Piora relativa aceita (padrão 25%%)")
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--json', help="Grava os resultados neste arquivo")
+    args = parser.parse_args(argv)
+
+    samples = [start_once(os.path.abspath(args.app)) for _ in range(args.runs)]
+    results = {BASELINE_KEY: {m: {'seconds': round(statistics.median(s[m] for s in samples), 3)} for m in METRICS}}
+    print(f"\nPartida a frio ({args.runs} execuções, mediana)")
+    for m in METRICS:
+        values = ', '.join(f"{s[m]:.2f}" for s in samples)
+        print(f"  {m:<14}{results[BASELINE_KEY][m]['seconds']:>8.3f} s   [{values}]")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline gravada em {args.baseline}")
+        return 0
+    if BASELINE_KEY not in baseline:
+        print("\nSem baseline para comparar (use --save-baseline).")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    if not regressions:
+        print(f"\nSem regressões em relação à baseline (tolerância {args.tolerance:.0%}).")
+        return 0
+    print("\nREGRESSÕES:")
+    for _scale, name, metric, ref, cur in regressions:
+        print(f"  {name}: {metric} {ref} -> {cur} ({cur / ref - 1:+.0%})")
+    return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
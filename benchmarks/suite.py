@@ -0,0 +1,263 @@
+"""Suíte de benchmarks do dashboard sobre exports sintéticos (ver synth.py).
+
+Uso:
+    python benchmarks/suite.py                       # 10k e 100k linhas, compara com baseline.json
+    python benchmarks/suite.py --rows 1e4 1e6 1e7    # outras escalas
+    python benchmarks/suite.py --save-baseline       # grava os resultados como nova baseline
+
+Para cada escala mede tempo e pico de memória (tracemalloc, numa segunda
+passada) das etapas do dashboard: load_data/_process_dataframe,
+merge_datasets, save_dataset, o fingerprint e o enriquecimento, os filtros
+(query.SetQuery), rollups, generate_alerts, forecast_1rm_series,
+create_comparison_chart e o gráfico diário de volume (reduzido e
+serializado). Comparando com a baseline, etapas mais lentas ou com mais
+memória do que a tolerância são marcadas como regressão (código de saída 1).
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import plotly.graph_objects as go
+
+import data
+import snapshot
+from charts import create_comparison_chart, line_trace
+from forecasting import forecast_1rm_series
+from metrics import alerts_report, generate_alerts
+from query import SetQuery
+from records import RecordIndex
+from rollups import RollupCube
+from sessions import session_table
+from storage import CsvStorage
+from training_load import training_load
+
+import synth
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# Diferenças abaixo disso são ruído e nunca contam como regressão
+MIN_SECONDS = 0.05
+MIN_PEAK_MB = 1.0
+
+def _load_data(ctx):
+    os.environ['GYMRUN_STORAGE'] = 'csv'
+    os.environ['GYMRUN_STORAGE_PATH'] = ctx['path']
+    ctx['df'] = data.load_data(f"bench-{ctx['path']}")
+
+def _read_gymrun_csv(ctx):
+    data.read_gymrun_csv(ctx['path'])
+
+def _merge_datasets(ctx):
+    df = ctx['df']
+    n = len(df)
+    # Export novo com 10% de sobreposição com a base
+    data.merge_datasets(df.iloc[:int(n * 0.9)], df.iloc[int(n * 0.8):])
+
+def _save_dataset(ctx):
+    data.save_dataset(ctx['df'], os.path.join(ctx['tmp'], 'saved.csv'))
+
+def _enrich(ctx):
+    # Mesmo enriquecimento do app (data.load_sets)
+    ctx['enriched'] = data.enrich_sets(ctx['df'])
+
+def _fingerprint(ctx):
+    data.dataset_fingerprint(ctx['df'])
+
+def _snapshot_write(ctx):
+    # Snapshot Arrow das séries enriquecidas (o que o upload grava após a mesclagem)
+    if not snapshot.available():
+        return
+    ctx['snapshot_store'] = CsvStorage(ctx['path'])
+    snapshot.write_snapshot(ctx['snapshot_store'], ctx['enriched'], 'bench')
+
+def _snapshot_open(ctx):
+    # Abertura por memory map + índice de consultas: o caminho de load_sets com snapshot
+    if 'snapshot_store' not in ctx:
+        _snapshot_write(ctx)
+    if 'snapshot_store' not in ctx:
+        return
+    frame, _version = snapshot.open_snapshot(ctx['snapshot_store'])
+    SetQuery(frame)
+
+def _sessions(ctx):
+    # Tabela de sessões (SessionId e RestSeconds já vêm do enriquecimento)
+    session_table(ctx['enriched'])
+
+def _filter(ctx):
+    # Índice de consultas + filtros da página Exercícios (período, rotina, grupo, exercício)
+    q = SetQuery(ctx['enriched'])
+    dates = q.frame['Date']
+    start, end = dates.quantile(0.25), dates.quantile(0.75)
+    routine = q.frame['Routine'].mode()[0]
+    latest = q.last_dates('Exercise', start, end, Routine=routine)
+    q.select(start, end, Routine=routine, Exercise=latest.index[0])
+
+def _rollups(ctx):
+    cube = RollupCube.from_sets(ctx['enriched'])
+    top = cube.daily.groupby('Exercise', observed=True)['Sets'].sum().sort_values(ascending=False)
+    ctx['cube'], ctx['top'] = cube, top.index.tolist()
+
+def _generate_alerts(ctx):
+    cube = ctx['cube']
+    for exercise in ctx['top']:
+        generate_alerts(cube.exercise_weekly(exercise))
+
+def _alerts_report(ctx):
+    alerts_report(ctx['cube'].weekly)
+
+def _forecast(ctx):
+    series = ctx['cube'].exercise_daily(ctx['top'][0])['Max1RM']
+    forecast_1rm_series(series, cache=None)
+
+def _records(ctx):
+    # Índice de recordes do zero e uma consulta por exercício do topo
+    records = RecordIndex.from_sets(ctx['df'])
+    for exercise in ctx['top']:
+        records.best(exercise, 'weight'), records.best(exercise, '1rm')
+
+def _training_load(ctx):
+    # ACWR e fitness-fadiga de todo o histórico, por grupo muscular
+    training_load(ctx['enriched'])
+
+def _comparison_chart(ctx):
+    create_comparison_chart(ctx['cube'].daily, ctx['top'][0], ctx['top'][1])
+
+def _volume_chart(ctx):
+    # Gráfico diário de volume da Visão Geral, reduzido e serializado como o Streamlit faz
+    daily = ctx['cube'].daily.groupby('Date')['Volume'].sum().reset_index()
+    daily['Trend'] = data.calculate_trend(daily, 'Volume')
+    fig = go.Figure()
+    fig.add_trace(line_trace(daily['Date'], daily['Volume'], mode='lines+markers'))
+    fig.add_trace(line_trace(daily['Date'], daily['Trend'], mode='lines'))
+    fig.to_json()
+
+CASES = [
+    ('load_data', _load_data),
+    ('read_gymrun_csv', _read_gymrun_csv),
+    ('merge_datasets', _merge_datasets),
+    ('save_dataset', _save_dataset),
+    ('fingerprint', _fingerprint),
+    ('enrich', _enrich),
+    ('snapshot_write', _snapshot_write),
+    ('snapshot_open', _snapshot_open),
+    ('sessions', _sessions),
+    ('filter', _filter),
+    ('rollups', _rollups),
+    ('generate_alerts', _generate_alerts),
+    ('alerts_report', _alerts_report),
+    ('forecast_1rm_series', _forecast),
+    ('records', _records),
+    ('training_load', _training_load),
+    ('comparison_chart', _comparison_chart),
+    ('volume_chart', _volume_chart),
+]
+
+def _traced_peak(fn, ctx):
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        fn(ctx)
+        _cur, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (peak - base) / 2**20
+
+def run_scale(rows, seed=0, cases=None, memory=True):
+    """Roda as etapas sobre um export sintético de `rows` linhas; retorna {etapa: {seconds, peak_mb}}.
+
+    O tempo é medido sem tracemalloc (que deixa operações com objetos Python
+    até ~10x mais lentas); com `memory`, cada etapa roda de novo rastreada
+    só para medir o pico de memória.
+    """
+    tmp = os.path.join(tempfile.gettempdir(), 'gymrun_bench')
+    os.makedirs(tmp, exist_ok=True)
+    path = os.path.join(tmp, f'synth_{rows}_{seed}.csv')
+    if not os.path.exists(path):
+        synth.generate(rows, path, seed)
+    ctx = {'path': path, 'tmp': tmp}
+    results = {}
+    for name, fn in CASES:
+        # load_data, enrich e rollups preparam o contexto das etapas seguintes
+        if cases and name not in cases and name not in ('load_data', 'enrich', 'rollups'):
+            continue
+        t0 = time.perf_counter()
+        fn(ctx)
+        seconds = time.perf_counter() - t0
+        results[name] = {'seconds': round(seconds, 4)}
+        if memory:
+            results[name]['peak_mb'] = round(_traced_peak(fn, ctx), 2)
+    return results
+
+def compare(results, baseline, tolerance):
+    """Lista de regressões (escala, etapa, métrica, baseline, atual) acima da tolerância relativa."""
+    found = []
+    for scale, cases in results.items():
+        for name, cur in cases.items():
+            ref = baseline.get(scale, {}).get(name)
+            if not ref:
+                continue
+            for metric, floor in (('seconds', MIN_SECONDS), ('peak_mb', MIN_PEAK_MB)):
+                if metric not in cur or metric not in ref:
+                    continue
+                if cur[metric] > ref[metric] * (1 + tolerance) and cur[metric] - ref[metric] > floor:
+                    found.append((scale, name, metric, ref[metric], cur[metric]))
+    return found
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do dashboard GymRun em dados sintéticos.")
+    parser.add_argument('--rows', nargs='+', type=float, default=[1e4, 1e5])
+    parser.add_argument('--cases', nargs='+', choices=[name for name, _ in CASES], default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Piora relativa aceita (padrão 25%%)")
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--no-memory', action='store_true', help="Só tempo (sem a segunda passada com tracemalloc)")
+    parser.add_argument('--json', help="Grava os resultados neste arquivo")
+    args = parser.parse_args(argv)
+
+    # Aquecimento descartado: imports preguiçosos (plotly, pyarrow...) não contam na primeira escala
+    run_scale(1_000, args.seed, args.cases, memory=False)
+    results = {}
+    for rows in map(int, args.rows):
+        results[str(rows)] = run_scale(rows, args.seed, args.cases, memory=not args.no_memory)
+        print(f"\n{rows:,} linhas")
+        print(f"  {'etapa':<22}{'tempo (s)':>12}{'pico (MB)':>12}")
+        for name, r in results[str(rows)].items():
+            peak = f"{r['peak_mb']:>12.1f}" if 'peak_mb' in r else f"{'-':>12}"
+            print(f"  {name:<22}{r['seconds']:>12.3f}{peak}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline gravada em {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("\nSem baseline para comparar (use --save-baseline).")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if not regressions:
+        print(f"\nSem regressões em relação à baseline (tolerância {args.tolerance:.0%}).")
+        return 0
+    print("\nREGRESSÕES:")
+    for scale, name, metric, ref, cur in regressions:
+        print(f"  {int(scale):,} linhas / {name}: {metric} {ref} -> {cur} ({cur / ref - 1:+.0%})")
+    return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
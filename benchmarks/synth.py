@@ -0,0 +1,127 @@
+"""Gerador de exportações GymRun sintéticas para benchmarks.
+
+Uso:
+    python benchmarks/synth.py LINHAS [saida.csv] [--seed N]
+
+Gera um CSV no formato do GymRun (separador ';', datas dd.mm.aaaa, as 18
+colunas do export) com nomes reais de exercícios e rotinas tirados de
+gymrun_database.csv. Cada sessão segue uma rotina, tem de 4 a 8 exercícios
+com 3 a 5 séries, e as cargas progridem ao longo do tempo a partir da carga
+típica de cada exercício na base real. Escreve em blocos, então 10M de linhas
+não precisam caber em memória.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage import GYMRUN_COLUMNS
+
+# Sessões geradas por bloco escrito no CSV
+BLOCK_SESSIONS = 20_000
+# Histórico máximo simulado; acima disso há várias sessões por dia (contas de treinador)
+MAX_DAYS = 3650
+
+def _catalog():
+    """Exercícios por rotina e carga típica de cada um, a partir da base real."""
+    real = pd.read_csv(os.path.join(ROOT, 'gymrun_database.csv'), sep=';', usecols=['Routine', 'Exercise', 'Weight'])
+    real = real.dropna(subset=['Routine', 'Exercise'])
+    weights = real.groupby('Exercise')['Weight'].median().fillna(10).clip(lower=2.5)
+    pools = {r: sorted(g['Exercise'].unique()) for r, g in real.groupby('Routine')}
+    return pools, weights
+
+def _sessions_block(rng, first, n, total, per_day, pools, weights, start):
+    routines = sorted(pools)
+    frames = []
+    session = np.arange(first, first + n)
+    routine_of = session % len(routines)
+    for r_idx, routine in enumerate(routines):
+        ids = session[routine_of == r_idx]
+        if not len(ids):
+            continue
+        pool = np.array(pools[routine], dtype=object)
+        k = np.minimum(rng.integers(4, 9, size=len(ids)), len(pool))
+        # Exercícios distintos por sessão: permutação aleatória de cada linha, primeiros k
+        order = np.argsort(rng.random((len(ids), len(pool))), axis=1)
+        take = np.arange(len(pool))[None, :] < k[:, None]
+        sess = np.repeat(ids, k)
+        exercise = pool[order[take]]
+        sets = rng.integers(3, 6, size=len(sess))
+        row_sess = np.repeat(sess, sets)
+        row_ex = np.repeat(exercise, sets)
+        starts = np.repeat(np.cumsum(sets) - sets, sets)
+        set_no = np.arange(len(row_sess)) - starts + 1
+        frames.append(pd.DataFrame({'session': row_sess, 'Exercise': row_ex, 'Set': set_no, 'Routine': routine}))
+    df = pd.concat(frames, ignore_index=True).sort_values(['session'], kind='stable').reset_index(drop=True)
+
+    m = len(df)
+    progress = 1 + 0.3 * df['session'].to_numpy() / max(total, 1)
+    base = weights.reindex(df['Exercise']).to_numpy()
+    weight = np.round(base * progress * rng.normal(1, 0.05, m) * 2) / 2
+    reps = rng.integers(6, 16, size=m)
+
+    day = df['session'].to_numpy() // per_day
+    slot = df['session'].to_numpy() % per_day
+    # Sessões do mesmo dia em horários diferentes; cada série ~2 min depois da anterior
+    within = df.groupby('session').cumcount().to_numpy()
+    spacing = max(1, min(150, 86_400 // max(per_day * 40, 1)))
+    seconds = 6 * 3600 * (per_day == 1) + slot * (86_400 // per_day) + within * spacing
+    seconds = np.minimum(seconds, 86_399)
+    # Formata só os dias e horários distintos
+    days, day_codes = np.unique(day, return_inverse=True)
+    secs, sec_codes = np.unique(seconds, return_inverse=True)
+    day_text = (start + pd.to_timedelta(days, unit='D')).strftime('%d.%m.%Y').to_numpy()
+    sec_text = np.array([f'{v // 3600:02d}:{v // 60 % 60:02d}:{v % 60:02d}' for v in secs.tolist()], dtype=object)
+
+    out = pd.DataFrame({c: '' for c in GYMRUN_COLUMNS}, index=df.index)
+    out['Date'] = day_text[day_codes]
+    out['Time'] = sec_text[sec_codes]
+    out['Routine'] = df['Routine']
+    out['Exercise'] = df['Exercise']
+    out['Set'] = df['Set']
+    out['Weight'] = weight
+    out['Reps'] = reps
+    out['Type'] = 1
+    out['Book'] = 1
+    out['Version1'] = 1
+    return out
+
+def generate(rows, path, seed=0):
+    """Escreve um export sintético com aproximadamente `rows` séries; retorna o total escrito."""
+    rng = np.random.default_rng(seed)
+    pools, weights = _catalog()
+    total = max(1, rows // 24)  # ~6 exercícios x 4 séries por sessão
+    per_day = max(1, -(-total // MAX_DAYS))
+    start = pd.Timestamp('2015-01-01')
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(';'.join(GYMRUN_COLUMNS) + '\n')
+        first = 0
+        while written < rows:
+            # ~24 séries por sessão; nunca gera muito além do que falta
+            n = min(BLOCK_SESSIONS, max(1, -(-(rows - written) // 20)))
+            block = _sessions_block(rng, first, n, total, per_day, pools, weights, start)
+            block = block.iloc[:rows - written]
+            f.write(block.to_csv(sep=';', index=False, header=False))
+            written += len(block)
+            first += n
+    return written
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um export GymRun sintético.")
+    parser.add_argument('rows', type=float, help="Número de séries (ex.: 1e6)")
+    parser.add_argument('path', nargs='?', help="Arquivo de saída (padrão: gymrun_synth_<linhas>.csv)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    rows = int(args.rows)
+    path = args.path or f'gymrun_synth_{rows}.csv'
+    n = generate(rows, path, args.seed)
+    print(f"{n:,} séries em {path} ({os.path.getsize(path) / 2**20:.1f} MB)")
+
+if __name__ == '__main__':
+    main()
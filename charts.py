@@ -1,9 +1,127 @@
+import os
+
+import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 
-def create_comparison_chart(df, exercise1, exercise2):
-    """Cria gráfico de comparação entre dois exercícios"""
+from perf import timed
+
+# Pontos por traço enviados ao navegador (~1 por pixel de um gráfico em tela cheia)
+MAX_POINTS = int(os.environ.get('GYMRUN_CHART_POINTS', 1200))
+# Acima disso as linhas são desenhadas com WebGL (Scattergl) em vez de SVG
+WEBGL_THRESHOLD = 1000
+
+def chart_points(width_fraction=1.0, full_resolution=False):
+    """Alvo de pontos para um gráfico que ocupa `width_fraction` da largura da página (0 = sem redução)."""
+    if full_resolution:
+        return 0
+    return max(100, int(MAX_POINTS * width_fraction))
+
+def zoom_range(event):
+    """(início, fim) da caixa selecionada num gráfico (estado de st.plotly_chart com on_select), ou None."""
+    try:
+        boxes = event['selection']['box']
+    except (KeyError, TypeError):
+        return None
+    xs = [pd.Timestamp(x) for box in boxes for x in box.get('x', [])]
+    if len(xs) < 2:
+        return None
+    return min(xs), max(xs)
+
+def in_zoom(frame, zoom, column='Date'):
+    """Linhas de `frame` dentro do trecho selecionado (todas, sem seleção)."""
+    if zoom is None:
+        return frame
+    return frame[frame[column].between(*zoom)]
+
+def _as_float(x):
+    values = np.asarray(x)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return values.astype(float)
+
+def lttb_indices(x, y, n_out):
+    """Índices escolhidos pelo Largest-Triangle-Three-Buckets (sempre mantém o primeiro e o último ponto).
+
+    Em cada balde fica o ponto que forma o maior triângulo com o ponto já
+    escolhido no balde anterior e a média do balde seguinte: picos e vales
+    sobrevivem, trechos retos viram poucos pontos.
+    """
+    x, y = _as_float(x), np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    # Média de cada balde de uma vez; o "seguinte" do último balde é o ponto final
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sums_x / counts, x[-1])
+    avg_y = np.append(sums_y / counts, y[-1])
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+def minmax_indices(y, n_out):
+    """Índices do mínimo e do máximo de cada balde (para barras: nenhum pico some)."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    bucket = np.arange(n) * (n_out // 2) // n
+    order = np.lexsort((y, bucket))
+    starts = np.flatnonzero(np.r_[True, bucket[order][1:] != bucket[order][:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+def downsample(x, y, max_points=None, method='lttb'):
+    """Reduz (x, y) a no máximo `max_points` pontos (None = MAX_POINTS, 0 = sem redução).
+
+    Pontos com y ausente são descartados antes da redução.
+    """
+    max_points = MAX_POINTS if max_points is None else max_points
+    x, y = np.asarray(x), np.asarray(y, dtype=float)
+    if not max_points or len(y) <= max_points:
+        return x, y
+    keep = ~np.isnan(y)
+    x, y = x[keep], y[keep]
+    idx = lttb_indices(x, y, max_points) if method == 'lttb' else minmax_indices(y, max_points)
+    return x[idx], y[idx]
+
+def line_trace(x, y, max_points=None, **kwargs):
+    """Traço de linha já reduzido; em WebGL quando ainda sobra muito ponto."""
+    n = len(y)
+    x, y = downsample(x, y, max_points)
+    trace = go.Scattergl if n > WEBGL_THRESHOLD and len(y) > WEBGL_THRESHOLD else go.Scatter
+    return trace(x=x, y=y, **kwargs)
+
+def bar_trace(x, y, max_points=None, **kwargs):
+    """Barras reduzidas por mínimo/máximo de cada balde."""
+    x, y = downsample(x, y, max_points, method='minmax')
+    return go.Bar(x=x, y=y, **kwargs)
+
+def figure_points(fig):
+    """Total de pontos de dados enviados ao navegador pela figura."""
+    total = 0
+    for trace in fig.data:
+        # Linhas/barras têm y; pizza, values; mapa de calor, z (2D)
+        for attr in ('y', 'values', 'z'):
+            values = getattr(trace, attr, None) if attr in trace else None
+            if values is not None:
+                total += int(np.size(values))
+                break
+    return total
+
+@timed('charts.create_comparison_chart')
+def create_comparison_chart(daily, exercise1, exercise2, max_points=None):
+    """Cria gráfico de comparação entre dois exercícios a partir do rollup diário"""
     fig = make_subplots(
         rows=2, cols=1,
         subplot_titles=(f'{exercise1} - Evolução do Peso', f'{exercise2} - Evolução do Peso'),
@@ -11,14 +129,15 @@ def create_comparison_chart(df, exercise1, exercise2):
     )
     
     for i, exercise in enumerate([exercise1, exercise2], 1):
-        exercise_data = df[df['Exercise'] == exercise].copy()
+        exercise_data = daily[daily['Exercise'] == exercise]
         if not exercise_data.empty:
-            daily_max = exercise_data.groupby('Date')['Weight'].max().reset_index()
+            daily_max = exercise_data.groupby('Date')['MaxWeight'].max().reset_index()
             
             fig.add_trace(
-                go.Scatter(
-                    x=daily_max['Date'],
-                    y=daily_max['Weight'],
+                line_trace(
+                    daily_max['Date'],
+                    daily_max['MaxWeight'],
+                    max_points,
                     mode='lines+markers',
                     name=exercise,
                     line=dict(width=2)
@@ -31,3 +150,28 @@ def create_comparison_chart(df, exercise1, exercise2):
     fig.update_yaxes(title_text="Peso Máximo (kg)", row=1, col=1)
     fig.update_yaxes(title_text="Peso Máximo (kg)", row=2, col=1)
     return fig
+
+@timed('charts.create_training_load_chart')
+def create_training_load_chart(load, group, start=None, end=None, max_points=None):
+    """ACWR (com a faixa 0,8–1,3) e fitness/fadiga/forma de um grupo (saída de training_load)"""
+    part = load[load['Group'] == group]
+    if start is not None:
+        part = part[part['Date'] >= pd.Timestamp(start)]
+    if end is not None:
+        part = part[part['Date'] <= pd.Timestamp(end)]
+    fig = make_subplots(
+        rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+        subplot_titles=('Razão aguda:crônica (ACWR)', 'Fitness-fadiga (Banister)')
+    )
+    fig.add_hrect(y0=0.8, y1=1.3, fillcolor='green', opacity=0.1, line_width=0, row=1, col=1)
+    fig.add_hline(y=1.5, line=dict(color='red', dash='dash'), row=1, col=1)
+    fig.add_trace(line_trace(part['Date'], part['ACWR'], max_points, mode='lines', name='ACWR'), row=1, col=1)
+    for name, color in (('Fitness', 'blue'), ('Fatigue', 'orange'), ('Form', 'green')):
+        label = {'Fitness': 'Fitness', 'Fatigue': 'Fadiga', 'Form': 'Forma'}[name]
+        fig.add_trace(line_trace(part['Date'], part[name], max_points, mode='lines', name=label, line=dict(color=color)),
+                      row=2, col=1)
+    fig.update_layout(height=550, showlegend=True)
+    fig.update_yaxes(title_text="ACWR", row=1, col=1)
+    fig.update_yaxes(title_text="Carga (kg)", row=2, col=1)
+    fig.update_xaxes(title_text="Data", row=2, col=1)
+    return fig
@@ -1,63 +1,475 @@
-import streamlit as st
 import pandas as pd
+import numpy as np
+import io
+import json
+import hashlib
+import logging
 import os
+import sys
+import uuid
+from typing import NamedTuple
+from pandas.api.types import union_categoricals
 
+from ingest import is_mime_message, open_export
+from perf import timed
+
+logger = logging.getLogger(__name__)
+
+# Frames em cache são compartilhados sem cópia (ver _frozen e query.SetQuery) e
+# contam com Copy-on-Write: padrão no pandas 3, ligado aqui no pandas 2
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# O Streamlit só é usado se já estiver carregado (app.py o importa antes deste
+# módulo). Fora dele (CLI de relatórios, benchmarks) nada de Streamlit é importado.
+_st = sys.modules.get('streamlit')
+
+def _cache_data(func):
+    """st.cache_data dentro do app; a própria função (sem cache) fora dele."""
+    return _st.cache_data(func) if _st is not None else func
+
+def _cache_resource(max_entries):
+    """st.cache_resource (objeto compartilhado, sem cópia) dentro do app; sem cache fora dele."""
+    def decorate(func):
+        return _st.cache_resource(max_entries=max_entries)(func) if _st is not None else func
+    return decorate
+
+def _show_error(message):
+    """Mostra o erro na tela do app ou, fora dele, registra no log."""
+    if _st is not None:
+        _st.error(message)
+    else:
+        logger.error(message)
+
+# Esquema de leitura do CSV GymRun: só as colunas usadas, já com tipo definido.
+# Para6–Para10, Book e Version1 não são usados pelo dashboard e ficam de fora.
+GYMRUN_DTYPES = {
+    'Date': str,
+    'Time': str,
+    'Routine': 'category',
+    'Exercise': 'category',
+    'Set': 'float64',
+    'Weight': 'float64',
+    'Reps': 'float64',
+    'Duration': 'float64',
+    'Distance': 'float64',
+    'Note': str,
+    'Type': 'float64',
+}
+NUMERIC_COLUMNS = ['Set', 'Weight', 'Reps', 'Duration', 'Distance', 'Type']
+CATEGORICAL_COLUMNS = ['Exercise', 'Routine']
+
+def _downcast_floats(df):
+    """Converte colunas float64 para float32 quando isso não altera nenhum valor."""
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns and df[col].dtype == np.float64:
+            values = df[col].to_numpy()
+            small = values.astype(np.float32)
+            if np.array_equal(small.astype(np.float64), values, equal_nan=True):
+                df[col] = small
+    return df
+
+def _time_of_day(times):
+    """Converte 'HH:MM:SS' em Timedelta parseando só os horários distintos (no máximo 86.400)."""
+    codes, uniques = pd.factorize(times)
+    parsed = pd.to_timedelta(pd.Index(uniques, dtype=object), errors='coerce').to_numpy()
+    parsed = np.append(parsed, np.timedelta64('NaT'))  # código -1 (ausente) -> NaT
+    return pd.Series(parsed[codes], index=times.index)
+
+def _convert_types(df):
+    """Conversão de tipos dos DataFrames lidos; levanta exceção se não der."""
+    if not pd.api.types.is_datetime64_any_dtype(df['Date']):
+        df['Date'] = pd.to_datetime(df['Date'], format='%d.%m.%Y')
+    # Data + hora direto, sem formatar a data de volta para texto
+    df['DateTime'] = df['Date'] + _time_of_day(df['Time'])
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns and not pd.api.types.is_float_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return _downcast_floats(df)
+
+@timed('data._process_dataframe')
 def _process_dataframe(df):
     """Auxiliar para aplicar a mesma conversão de tipos em DataFrames lidos."""
     try:
-        df['Date'] = pd.to_datetime(df['Date'], format='%d.%m.%Y')
-        df['DateTime'] = pd.to_datetime(df['Date'].dt.strftime('%Y-%m-%d') + ' ' + df['Time'])
-        numeric_columns = ['Weight', 'Reps', 'Duration', 'Distance']
-        for col in numeric_columns:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        return df
+        return _convert_types(df)
     except Exception as e:
-        st.error(f"Erro ao formatar ou processar dados: {str(e)}")
+        _show_error(f"Erro ao formatar ou processar dados: {str(e)}")
         return pd.DataFrame()
 
-@st.cache_data
-def load_data():
-    """Carrega os dados do arquivo CSV local.
-
-    Busca por (nesta ordem):
-    - gymrun_database.csv (novo padrão representativo)
-    - GymRun16out25.csv (novo padrão)
-    - GymRun_16out25.csv (legado)
-    - Exportação CSV.eml (legado)
-    """
-    candidates = [
-        "gymrun_database.csv",
-        "GymRun16out25.csv",
-        "GymRun_16out25.csv",
-        "Exportação CSV.eml",
-    ]
-    file_path = next((p for p in candidates if os.path.exists(p)), None)
-
-    if not file_path:
+# Arquivos locais aceitos como base inicial (nesta ordem)
+LOCAL_CANDIDATES = [
+    "gymrun_database.csv",
+    "GymRun16out25.csv",
+    "GymRun_16out25.csv",
+    "Exportação CSV.eml",
+]
+
+# Linhas por bloco na leitura em blocos (anexos de e-mail, importação em fluxo)
+READ_CHUNK_ROWS = 100_000
+
+def _concat_chunks(chunks):
+    """Concatena blocos já tipados unificando as categorias de cada coluna categórica."""
+    chunks = [c for c in chunks if not c.empty]
+    if not chunks:
         return pd.DataFrame()
-    
+    for col in CATEGORICAL_COLUMNS:
+        if col in chunks[0].columns:
+            categories = union_categoricals([c[col] for c in chunks]).categories
+            for c in chunks:
+                c[col] = c[col].cat.set_categories(categories)
+    return _downcast_floats(pd.concat(chunks, ignore_index=True))
+
+def iter_gymrun_csv(source, chunksize=READ_CHUNK_ROWS, usecols=None):
+    """Lê um CSV GymRun (caminho, arquivo ou .eml) em blocos tipados de `chunksize` linhas.
+
+    Lido em blocos não dá para reler com outro esquema, então os campos
+    numéricos chegam como texto e a coerção é feita bloco a bloco. Um bloco
+    que não converte levanta ValueError com as linhas do arquivo, em vez de
+    sumir da leitura. `usecols` restringe a leitura a algumas colunas (sem tipar).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as fp:
+            yield from iter_gymrun_csv(fp, chunksize, usecols)
+        return
+    stream = open_export(source) if isinstance(source.read(0), bytes) else source
+    columns = set(usecols or GYMRUN_DTYPES)
+    dtypes = {col: (str if col in NUMERIC_COLUMNS else dtype) for col, dtype in GYMRUN_DTYPES.items() if col in columns}
+    reader = pd.read_csv(stream, sep=';', encoding='utf-8', usecols=lambda c: c in columns,
+                         dtype=dtypes, chunksize=chunksize)
+    for chunk in reader:
+        if usecols:
+            yield chunk
+            continue
+        try:
+            yield _convert_types(chunk)
+        except Exception as e:
+            first = chunk.index[0] + 2  # linha do arquivo, contando o cabeçalho
+            raise ValueError(f"Erro nas linhas {first}–{first + len(chunk) - 1} do export: {e}") from e
+
+@timed('data.read_gymrun_csv')
+def read_gymrun_csv(source):
+    """Lê um CSV no formato GymRun (separador ';') e aplica a conversão de tipos.
+
+    Lê só as colunas de GYMRUN_DTYPES já tipadas; se algum campo numérico não
+    for convertível, relê sem tipos e deixa a coerção para _process_dataframe.
+    Exportações .eml (mensagem MIME com o CSV anexado) são decodificadas em
+    fluxo por ingest.open_export.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as fp:
+            return read_gymrun_csv(fp)
+    if isinstance(source.read(0), bytes) and is_mime_message(source):
+        try:
+            return _concat_chunks(iter_gymrun_csv(source))
+        except ValueError as e:
+            _show_error(f"Erro ao formatar ou processar dados: {str(e)}")
+            return pd.DataFrame()
+
+    kwargs = dict(sep=';', encoding='utf-8', usecols=lambda c: c in GYMRUN_DTYPES)
+    start = source.tell() if hasattr(source, 'tell') else None
+    try:
+        df = pd.read_csv(source, dtype=GYMRUN_DTYPES, **kwargs)
+    except ValueError:
+        if start is not None:
+            source.seek(start)
+        df = pd.read_csv(source, dtype=str, **kwargs)
+    return _process_dataframe(df)
+
+@timed('data.load_data')
+@_cache_data
+def load_data(version=None, athlete=None):
+    """Carrega a base consolidada do atleta a partir do armazenamento configurado.
+
+    `version` não é usado na leitura: serve apenas de chave para o cache, de
+    modo que uma escrita no armazenamento (que muda `store.version()`) gera
+    uma nova entrada sem precisar limpar o cache inteiro. Como `athlete` também
+    faz parte da chave, a escrita de um atleta não invalida o cache dos outros.
+    """
+    return _load_store_data(athlete)
+
+def _load_store_data(athlete=None):
+    from storage import get_store
+
     try:
-        # Lendo o arquivo CSV com separador ponto e vírgula (locale PT)
-        df = pd.read_csv(file_path, sep=';', encoding='utf-8')
+        df = get_store(athlete=athlete).load()
     except Exception as e:
-        st.error(f"Erro ao carregar arquivo local: {str(e)}")
+        _show_error(f"Erro ao carregar arquivo local: {str(e)}")
         return pd.DataFrame()
-    
+
+    if df.empty:
+        return df
     return _process_dataframe(df)
 
-@st.cache_data
+@timed('data.load_rollup_cube')
+@_cache_data
+def load_rollup_cube(version=None, athlete=None):
+    """Carrega os rollups diário/semanal do armazenamento (cache por atleta e versão, como load_data)."""
+    from storage import get_store
+    from rollups import load_rollups
+
+    return load_rollups(get_store(athlete=athlete))
+
+@timed('data.load_record_index')
+@_cache_data
+def load_record_index(version=None, athlete=None):
+    """Índice de recordes pessoais persistido (cache por atleta e versão, como load_rollup_cube)."""
+    from storage import get_store
+    from records import load_records
+
+    return load_records(get_store(athlete=athlete))
+
+@timed('data.load_training_load')
+@_cache_data
+def load_training_load(version=None, athlete=None, routine=None, groups=()):
+    """ACWR e fitness-fadiga por grupo muscular (e Total) em todo o histórico, a partir do rollup diário.
+
+    `groups` são as correções de grupo muscular (mappings.load_muscle_groups) e fazem parte da chave do cache.
+    """
+    from mappings import classify_exercises
+    from training_load import training_load
+
+    daily = load_rollup_cube(version, athlete).daily_slice(routine=routine)
+    if daily.empty:
+        return training_load(daily)
+    return training_load(daily.assign(MuscleGroup=classify_exercises(daily['Exercise'], groups)))
+
+@_cache_data
 def read_uploaded_file(uploaded_file):
     """Lê temporariamente um arquivo upado como DataFrame sem salvá-lo."""
     try:
         # Pular pro início do buffer caso tenha sido lido antes
         uploaded_file.seek(0)
-        df = pd.read_csv(uploaded_file, sep=';', encoding='utf-8')
-        return _process_dataframe(df)
+        return read_gymrun_csv(uploaded_file)
     except Exception as e:
-        st.error(f"Erro ao ler arquivo recebido: {str(e)}")
+        _show_error(f"Erro ao ler arquivo recebido: {str(e)}")
         return pd.DataFrame()
 
+# Colunas lógicas que definem o mesmo registro específico de treino
+MERGE_KEY = ['Date', 'Time', 'Exercise', 'Set', 'Weight', 'Reps']
+# Demais colunas comparadas para saber se um registro já conhecido mudou
+MERGE_VALUE_COLUMNS = ['Routine', 'Duration', 'Distance', 'Note']
+
+def _normalized_columns(df, columns):
+    """Colunas com tipos estáveis entre CSV e armazenamento (base para hashing)."""
+    out = pd.DataFrame(index=df.index)
+    for col in columns:
+        values = df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+        if col == 'Date':
+            out[col] = pd.to_datetime(values).astype('datetime64[ns]')
+        elif col in ('Time', 'Exercise', 'Routine', 'Note'):
+            out[col] = values.astype(object).where(values.notna(), '').astype(str).astype(object)
+        else:
+            out[col] = pd.to_numeric(values, errors='coerce').astype(float)
+    return out
+
+def set_key_hashes(df):
+    """Hash (uint64) da chave lógica de cada série (MERGE_KEY)."""
+    return pd.util.hash_pandas_object(_normalized_columns(df, MERGE_KEY), index=False).to_numpy()
+
+def set_row_hashes(df):
+    """Hash (uint64) das colunas não-chave, para detectar registros alterados."""
+    return pd.util.hash_pandas_object(_normalized_columns(df, MERGE_VALUE_COLUMNS), index=False).to_numpy()
+
+class MergeResult(NamedTuple):
+    """Resumo de uma mesclagem incremental."""
+    inserted: int
+    updated: int
+    skipped: int
+    rows: pd.DataFrame  # linhas inseridas ou atualizadas, já deduplicadas
+
+class SetKeyIndex:
+    """Índice persistente das séries conhecidas: hash da chave -> hash da linha.
+
+    Os hashes ficam ordenados, então descobrir quais das m linhas de um novo
+    export já existem custa O(m log n), sem concatenar nem reordenar o histórico.
+    `version` guarda a versão do armazenamento no momento em que o índice foi
+    salvo, para detectar um índice desatualizado.
+    """
+
+    def __init__(self, key_hashes=(), row_hashes=(), version=None):
+        keys = np.asarray(key_hashes, dtype=np.uint64)
+        rows = np.asarray(row_hashes, dtype=np.uint64)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.rows = rows[order]
+        self.version = version
+
+    @classmethod
+    def from_frame(cls, df, version=None):
+        if df.empty:
+            return cls(version=version)
+        return cls(set_key_hashes(df), set_row_hashes(df), version=version)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, key_hashes):
+        """Retorna (máscara de chaves conhecidas, hash de linha armazenado)."""
+        key_hashes = np.asarray(key_hashes, dtype=np.uint64)
+        if not len(self.keys):
+            return np.zeros(len(key_hashes), dtype=bool), np.zeros(len(key_hashes), dtype=np.uint64)
+        pos = np.searchsorted(self.keys, key_hashes)
+        pos_c = np.minimum(pos, len(self.keys) - 1)
+        found = self.keys[pos_c] == key_hashes
+        return found, np.where(found, self.rows[pos_c], 0).astype(np.uint64)
+
+    def update(self, key_hashes, row_hashes):
+        """Registra chaves novas e atualiza o hash de linha das já conhecidas."""
+        key_hashes = np.asarray(key_hashes, dtype=np.uint64)
+        row_hashes = np.asarray(row_hashes, dtype=np.uint64)
+        found, _ = self.lookup(key_hashes)
+        if found.any():
+            self.rows[np.searchsorted(self.keys, key_hashes[found])] = row_hashes[found]
+        if (~found).any():
+            k, r = key_hashes[~found], row_hashes[~found]
+            order = np.argsort(k, kind='stable')
+            k, r = k[order], r[order]
+            pos = np.searchsorted(self.keys, k)
+            self.keys = np.insert(self.keys, pos, k)
+            self.rows = np.insert(self.rows, pos, r)
+
+    def save(self, path):
+        tmp = temp_path(path) + '.npz'
+        np.savez(tmp, keys=self.keys, rows=self.rows, version=np.array(str(self.version)))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as z:
+            idx = cls(version=str(z['version']))
+            idx.keys, idx.rows = z['keys'], z['rows']
+        return idx
+
+def _classify_new_rows(new_df, index):
+    """Deduplica o export novo e separa linhas novas/alteradas/conhecidas via índice."""
+    subset = [c for c in MERGE_KEY if c in new_df.columns]
+    new_df = new_df.drop_duplicates(subset=subset, keep='last')
+    keys = set_key_hashes(new_df)
+    rows = set_row_hashes(new_df)
+    found, stored_rows = index.lookup(keys)
+    updated = found & (stored_rows != rows)
+    inserted = ~found
+    return new_df, keys, rows, inserted, updated
+
+def load_key_index(store):
+    """Abre o índice de chaves persistido do armazenamento, reconstruindo se estiver desatualizado."""
+    path = store.key_index_path
+    version = str(store.version())
+    if os.path.exists(path):
+        try:
+            index = SetKeyIndex.load(path)
+            if index.version == version:
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+    index = SetKeyIndex.from_frame(store.load(columns=MERGE_KEY + MERGE_VALUE_COLUMNS), version=version)
+    index.save(path)
+    return index
+
+def _store_new_rows(store, new_df, index):
+    """Grava as séries novas/alteradas de new_df e atualiza o índice (sem salvá-lo).
+
+    As alteradas são apagadas antes de reanexadas. Retorna um MergeResult
+    com as linhas gravadas em `rows`.
+    """
+    new_df, keys, rows, inserted, updated = _classify_new_rows(new_df, index)
+    take = inserted | updated
+    fresh = new_df[take]
+    if updated.any():
+        store.delete_keys(new_df[updated])
+    if take.any():
+        store.append(fresh)
+    index.update(keys[take], rows[take])
+    return MergeResult(int(inserted.sum()), int(updated.sum()), int((~take).sum()), fresh)
+
+def _save_key_index(store, index):
+    index.version = str(store.version())
+    index.save(store.key_index_path)
+
+# Orçamento de memória padrão da importação em blocos (MB); GYMRUN_IMPORT_MEMORY_MB sobrescreve
+IMPORT_MEMORY_MB = 256
+# Pico aproximado por linha de um bloco: texto lido, bloco tipado e hashes
+IMPORT_BYTES_PER_ROW = 2048
+
+class ImportProgress(NamedTuple):
+    """Andamento de uma importação em blocos (repassado ao callback de progresso)."""
+    rows: int
+    inserted: int
+    updated: int
+    skipped: int
+    fraction: float  # fração do arquivo já lida (0–1)
+
+def import_chunk_rows(max_memory_mb=None):
+    """Linhas por bloco que cabem no orçamento de memória (MB)."""
+    if max_memory_mb is None:
+        max_memory_mb = float(os.environ.get('GYMRUN_IMPORT_MEMORY_MB', IMPORT_MEMORY_MB))
+    return max(1_000, int(max_memory_mb * 2**20 // IMPORT_BYTES_PER_ROW))
+
+def _file_fraction(fp, size):
+    try:
+        return min(1.0, fp.tell() / size) if size else 1.0
+    except (OSError, ValueError):
+        return 0.0
+
+def export_exercises(source, max_memory_mb=None):
+    """Nomes de exercício de um export, lidos em blocos só pela coluna Exercise."""
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    names = set()
+    for chunk in iter_gymrun_csv(source, import_chunk_rows(max_memory_mb), usecols=['Exercise']):
+        names.update(chunk['Exercise'].dropna().unique())
+    return names
+
+@timed('data.import_export')
+def import_export(store, source, mappings=None, max_memory_mb=None, progress=None):
+    """Importa um export (caminho, arquivo ou .eml) no armazenamento, bloco a bloco.
+
+    Cada bloco é tipado, deduplicado contra o índice de chaves e gravado antes
+    de ler o próximo, então o pico de memória depende de `max_memory_mb` (ver
+    import_chunk_rows) e não do tamanho do arquivo. `mappings` renomeia
+    exercícios ({nome novo: nome existente}). `progress(ImportProgress)` é
+    chamado após cada bloco. A importação inteira roda com a trava da partição.
+
+    Retorna um MergeResult cujo `rows` traz só as datas (coluna Date) das
+    séries inseridas/alteradas, o bastante para rollups.update_rollups.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as fp:
+            return import_export(store, fp, mappings, max_memory_mb, progress)
+    with store.lock:
+        return _import_chunks(store, source, mappings, max_memory_mb, progress)
+
+def _import_chunks(store, source, mappings, max_memory_mb, progress):
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(0)
+
+    index = load_key_index(store)
+    rows = inserted = updated = skipped = 0
+    days = set()
+    try:
+        for chunk in iter_gymrun_csv(source, import_chunk_rows(max_memory_mb)):
+            if mappings:
+                chunk['Exercise'] = chunk['Exercise'].astype(object).replace(mappings).astype('category')
+            rows += len(chunk)
+            merged = _store_new_rows(store, chunk, index)
+            days.update(merged.rows['Date'].unique())
+            inserted, updated, skipped = inserted + merged.inserted, updated + merged.updated, skipped + merged.skipped
+            if progress is not None:
+                progress(ImportProgress(rows, inserted, updated, skipped, _file_fraction(source, size)))
+    except ValueError as e:
+        # Os blocos anteriores já estão na base (e no índice, salvo abaixo)
+        written = f" {inserted + updated} séries dos blocos anteriores já foram gravadas." if inserted + updated else ""
+        raise ValueError(f"Importação interrompida: {str(e).rstrip('.')}.{written}") from e
+    finally:
+        _save_key_index(store, index)
+    touched = pd.DataFrame({'Date': pd.to_datetime(sorted(days))})
+    return MergeResult(inserted, updated, skipped, touched)
+
+@timed('data.merge_datasets')
 def merge_datasets(old_df, new_df):
     """
     Combina dois DataFrames e remove as linhas exatas duplicadas,
@@ -70,19 +482,25 @@ def merge_datasets(old_df, new_df):
         
     combined = pd.concat([old_df, new_df], ignore_index=True)
     
-    # Colunas lógicas que definem o mesmo registro específico de treino
-    subset = ['Date', 'Time', 'Exercise', 'Set', 'Weight', 'Reps']
-    # Mantém os disponíveis neste conjunto de dados
-    valid_subset = [c for c in subset if c in combined.columns]
+    # Mantém as colunas-chave disponíveis neste conjunto de dados
+    valid_subset = [c for c in MERGE_KEY if c in combined.columns]
     
     combined = combined.drop_duplicates(subset=valid_subset, keep='last')
     combined = combined.sort_values(by=['Date', 'Time']).reset_index(drop=True)
     
     return combined
 
+def temp_path(path):
+    """Nome temporário único ao lado de `path` (para gravar e depois renomear)."""
+    head, tail = os.path.split(path)
+    return os.path.join(head, f'.{tail}.{os.getpid()}-{uuid.uuid4().hex[:8]}.tmp')
+
+@timed('data.save_dataset')
 def save_dataset(df, file_path="gymrun_database.csv"):
     """
     Salva o DataFrame formatado de volta ao formato CSV original que a tela aceita
+    (também usado para exportar a base do armazenamento). Em um caminho, grava
+    num temporário e renomeia, para que leitores nunca vejam o arquivo pela metade.
     """
     df_save = df.copy()
     if 'DateTime' in df_save.columns:
@@ -91,12 +509,26 @@ def save_dataset(df, file_path="gymrun_database.csv"):
     if pd.api.types.is_datetime64_any_dtype(df_save['Date']):
         df_save['Date'] = df_save['Date'].dt.strftime('%d.%m.%Y')
         
-    df_save.to_csv(file_path, sep=';', index=False, encoding='utf-8')
+    if not isinstance(file_path, (str, os.PathLike)):
+        df_save.to_csv(file_path, sep=';', index=False, encoding='utf-8')
+        return
+    tmp = temp_path(file_path)
+    df_save.to_csv(tmp, sep=';', index=False, encoding='utf-8')
+    os.replace(tmp, file_path)
+
+@_cache_data
+def export_csv_bytes(version=None, athlete=None):
+    """Gera o CSV GymRun da base armazenada para download (cache por atleta e versão)."""
+    from storage import get_store
 
+    buf = io.StringIO()
+    save_dataset(get_store(athlete=athlete).load(), buf)
+    return buf.getvalue().encode('utf-8')
+
+@timed('data.calculate_volume')
 def calculate_volume(df):
-    """Calcula o volume de treino (Weight x Reps)"""
-    df['Volume'] = df['Weight'] * df['Reps']
-    return df
+    """Calcula o volume de treino (Weight x Reps); devolve um novo frame, sem alterar `df`"""
+    return df.assign(Volume=df['Weight'] * df['Reps'])
 
 def calculate_1rm(weight, reps):
     """Calcula 1RM usando a fórmula de Epley"""
@@ -104,6 +536,201 @@ def calculate_1rm(weight, reps):
         return 0.0
     return weight * (1 + reps / 30.0)
 
+ONE_RM_FORMULAS = ('epley', 'brzycki', 'lombardi', 'blend')
+
+@timed('data.estimate_1rm')
+def estimate_1rm(df, formula='epley'):
+    """Calcula o 1RM estimado de todas as séries de uma vez (vetorizado).
+
+    Fórmulas: 'epley', 'brzycki', 'lombardi' ou 'blend' (média das três).
+    Assim como em calculate_1rm, séries com peso/repetições ausentes ou zerados
+    recebem 0.0. Brzycki não é definida para 37+ repetições; nesses casos o
+    'blend' usa apenas as fórmulas válidas.
+    """
+    if formula not in ONE_RM_FORMULAS:
+        raise ValueError(f"Fórmula de 1RM desconhecida: {formula!r}. Use uma de {ONE_RM_FORMULAS}.")
+    w = pd.to_numeric(df['Weight'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    r = pd.to_numeric(df['Reps'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    valid = ~np.isnan(w) & ~np.isnan(r) & (w != 0) & (r != 0)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        if formula == 'epley':
+            est = w * (1 + r / 30.0)
+        elif formula == 'brzycki':
+            est = np.where(r < 37, w * 36.0 / (37.0 - r), np.nan)
+        elif formula == 'lombardi':
+            est = w * np.power(r, 0.10)
+        else:
+            stacked = np.vstack([
+                w * (1 + r / 30.0),
+                np.where(r < 37, w * 36.0 / (37.0 - r), np.nan),
+                w * np.power(r, 0.10),
+            ])
+            n = (~np.isnan(stacked)).sum(axis=0)
+            est = np.where(n > 0, np.nansum(stacked, axis=0) / np.maximum(n, 1), np.nan)
+
+    est = np.where(valid & ~np.isnan(est), est, 0.0)
+    return pd.Series(est, index=df.index, name='Estimated_1RM')
+
 def calculate_trend(df, column, periods=5):
     """Calcula a tendência usando média móvel"""
     return df[column].rolling(window=periods, min_periods=1).mean()
+
+# Colunas derivadas acrescentadas por enrich_sets
+ENRICHED_COLUMNS = ['Volume', 'Estimated_1RM', 'MuscleGroup', 'Week', 'Month', 'SessionId', 'RestSeconds']
+
+def dataset_fingerprint(df):
+    """Impressão digital do conteúdo da base (todas as colunas, na ordem das linhas).
+
+    Colunas numéricas e de datas entram pelos bytes do array e as categóricas
+    pelos códigos + categorias; só texto livre passa por hashing de valores.
+    Time fica de fora quando DateTime (data + hora já convertida) existe.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((len(df), list(df.columns))).encode())
+    for col in df.columns:
+        if col == 'Time' and 'DateTime' in df.columns:
+            continue
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            h.update(repr(s.cat.categories.tolist()).encode())
+            h.update(np.ascontiguousarray(s.cat.codes.to_numpy()).tobytes())
+        elif isinstance(s.dtype, np.dtype) and s.dtype.kind in 'biufmM':
+            h.update(np.ascontiguousarray(s.to_numpy()).tobytes())
+        else:
+            h.update(pd.util.hash_pandas_object(s, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _readonly(values):
+    values = np.array(values, copy=True)
+    values.flags.writeable = False
+    return values
+
+def _frozen(df):
+    """O mesmo frame com arrays numéricos, de datas e códigos categóricos somente leitura.
+
+    Alterar valores no lugar (`df.loc[...] = ...`) gera erro; fatias e
+    operações derivadas funcionam normalmente (Copy-on-Write copia ao escrever).
+    """
+    columns = {}
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            columns[col] = pd.Categorical.from_codes(_readonly(s.cat.codes.to_numpy()), dtype=s.dtype)
+        elif isinstance(s.dtype, np.dtype):
+            columns[col] = _readonly(s.to_numpy())
+        else:
+            columns[col] = s.array
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+@timed('data.enrich_sets')
+def enrich_sets(df, groups=None):
+    """Séries com as colunas derivadas usadas pelo dashboard (ENRICHED_COLUMNS), em ordem de data.
+
+    Volume, 1RM estimado (Epley), grupo muscular (com as correções `groups`,
+    ver mappings.load_muscle_groups), semana (domingo que fecha a semana, como
+    resample('W')), mês (primeiro dia), SessionId e RestSeconds (sessões pelos
+    intervalos entre séries, ver sessions.sessionize). Não altera `df`; o
+    resultado é somente leitura (ver _frozen).
+    """
+    from mappings import classify_exercises
+    from sessions import sessionize
+
+    if df.empty:
+        return df
+    if not df['Date'].is_monotonic_increasing:
+        df = df.sort_values('Date', kind='stable', ignore_index=True)
+    df = calculate_volume(df)
+    day = df['Date'].to_numpy().astype('datetime64[D]')
+    # 1970-01-01 foi uma quinta-feira: dias desde então + 3 = dia da semana (seg = 0)
+    weekday = (day.astype(np.int64) + 3) % 7
+    session, rest = sessionize(df)
+    df = df.assign(
+        Estimated_1RM=estimate_1rm(df),
+        MuscleGroup=classify_exercises(df['Exercise'], groups),
+        Week=(day + (6 - weekday)).astype(df['Date'].dtype),
+        Month=day.astype('datetime64[M]').astype(df['Date'].dtype),
+        SessionId=session,
+        RestSeconds=rest,
+    )
+    return _frozen(df)
+
+@_cache_resource(max_entries=8)
+def _enriched_sets(fingerprint, groups, _df):
+    """Enriquecimento + índice de consultas, compartilhados por conteúdo (não por versão)."""
+    from query import SetQuery
+
+    return SetQuery(enrich_sets(_df, groups))
+
+@timed('data.load_sets')
+@_cache_resource(max_entries=8)
+def load_sets(version=None, athlete=None, groups=()):
+    """Séries enriquecidas do atleta, prontas para consulta (query.SetQuery).
+
+    Em cache por (versão, atleta, correções de grupo muscular) — `groups` vem
+    de mappings.load_muscle_groups, então editar o arquivo invalida o cache; quando a versão muda mas o
+    conteúdo não (mesmo fingerprint), o enriquecimento anterior é reaproveitado.
+    O frame é compartilhado entre sessões e reruns e é somente leitura: reruns
+    causados só por widgets não tocam as séries brutas. Com o snapshot Arrow
+    (snapshot.py) as séries vêm do arquivo mapeado em memória, sem parse nem
+    enriquecimento, e as páginas são divididas com os outros processos.
+    """
+    from query import SetQuery
+
+    frame = _snapshot_sets(athlete, version, groups)
+    if frame is not None:
+        return SetQuery(frame)
+    df = _load_store_data(athlete)
+    return _enriched_sets(dataset_fingerprint(df), groups, df)
+
+def snapshot_stamp(version, groups=()):
+    """Carimbo do snapshot: versão da base e, havendo, hash das correções de grupo muscular."""
+    if not groups:
+        return str(version)
+    digest = hashlib.sha1(json.dumps(list(groups), ensure_ascii=False).encode('utf-8')).hexdigest()[:12]
+    return f"{version}/{digest}"
+
+def _snapshot_sets(athlete=None, version=None, groups=()):
+    """Séries do snapshot da versão `version`, regravando-o se estiver desatualizado; None sem snapshot."""
+    import snapshot
+    from storage import get_store
+
+    if not snapshot.available():
+        return None
+    try:
+        store = get_store(athlete=athlete)
+        version = snapshot_stamp(store.version() if version is None else version, groups)
+        frame, stamp = snapshot.open_snapshot(store)
+        if frame is None or stamp != version:
+            refresh_snapshot(store)
+            frame, stamp = snapshot.open_snapshot(store)
+    except Exception as e:
+        logger.warning("Snapshot indisponível, carregando a base: %s", e)
+        return None
+    return frame if stamp == version else None
+
+@timed('data.refresh_snapshot')
+def refresh_snapshot(store):
+    """Regrava o snapshot Arrow das séries enriquecidas com a versão atual da base (após cada mesclagem)."""
+    import snapshot
+    from mappings import load_muscle_groups
+
+    if not snapshot.available():
+        return
+    # Sob a trava: a versão gravada é a das séries lidas
+    with store.lock:
+        version = store.version()
+        df = store.load()
+        if df.empty:
+            snapshot.remove_snapshot(store)
+            return
+        groups = load_muscle_groups(store)
+        snapshot.write_snapshot(store, enrich_sets(_process_dataframe(df), groups), snapshot_stamp(version, groups))
+
+@timed('data.load_sessions')
+@_cache_resource(max_entries=8)
+def load_sessions(version=None, athlete=None, groups=()):
+    """Tabela de sessões (sessions.session_table) das séries de load_sets, somente leitura."""
+    from sessions import session_table
+
+    return _frozen(session_table(load_sets(version, athlete, groups).frame))
@@ -1,8 +1,181 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+import time
+from functools import lru_cache
+from multiprocessing.connection import wait as wait_connections
+
 import pandas as pd
 import numpy as np
 
-def forecast_1rm_series(series: pd.Series, periods_weeks: int = 6):
-    """Recebe uma série temporal (index datetime, valores 1RM) e retorna DataFrame com previsões semanais."""
+from perf import timed
+
+# Incrementar quando a lógica de previsão mudar, para invalidar o cache em disco
+FORECAST_MODEL_VERSION = 2
+
+@lru_cache(maxsize=1)
+def _pmdarima():
+    """Importa o pmdarima uma única vez por processo (None se não instalado)."""
+    try:
+        import importlib
+        return importlib.import_module('pmdarima')
+    except Exception:
+        return None
+
+def preload_models():
+    """Carrega o pmdarima antes da primeira previsão (usado pelo aquecimento do app)."""
+    return _pmdarima() is not None
+
+class ForecastCache:
+    """Cache de previsões endereçado por conteúdo: LRU em memória + pasta em disco.
+
+    A chave é o hash da série semanal e dos parâmetros do modelo, então semanas
+    novas geram automaticamente outra chave. Com `tag` (ver forecast_tag: base,
+    filtros e exercício), gravar uma entrada nova remove as anteriores da mesma
+    tag. O disco é limitado
+    por `max_disk_bytes`, removendo primeiro as entradas usadas há mais tempo.
+    Pode ser usado por várias threads (previsões em segundo plano do app).
+    """
+
+    def __init__(self, path='.forecast_cache', max_items=128, max_disk_bytes=50 * 2**20):
+        self.path = path
+        self.max_items = max_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def make_key(weekly: pd.Series, **params) -> str:
+        h = hashlib.sha256()
+        h.update(np.ascontiguousarray(weekly.index.astype('datetime64[ns]').asi8).tobytes())
+        h.update(np.ascontiguousarray(weekly.to_numpy(dtype=float)).tobytes())
+        h.update(repr(sorted(params.items())).encode())
+        return h.hexdigest()[:32]
+
+    @staticmethod
+    def _tag_prefix(tag) -> str:
+        return hashlib.sha256(str(tag).encode()).hexdigest()[:12] if tag is not None else 'notag'
+
+    def _file(self, key, tag):
+        return os.path.join(self.path, f"{self._tag_prefix(tag)}-{key}.pkl")
+
+    def get(self, key, tag=None):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        if not self.path:
+            return None
+        f = self._file(key, tag)
+        try:
+            value = pd.read_pickle(f)
+            os.utime(f)
+        except Exception:
+            return None
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value, tag=None):
+        self._remember(key, value)
+        if not self.path:
+            return
+        with self._lock:
+            self._write(key, value, tag)
+
+    def _write(self, key, value, tag):
+        from data import temp_path
+
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            target = self._file(key, tag)
+            if tag is not None:
+                prefix = self._tag_prefix(tag) + '-'
+                for name in os.listdir(self.path):
+                    full = os.path.join(self.path, name)
+                    if name.startswith(prefix) and full != target:
+                        _remove(full)
+            # Nome único: outro processo (app, relatório) pode gravar a mesma chave ao mesmo tempo
+            tmp = temp_path(target)
+            pd.to_pickle(value, tmp)
+            os.replace(tmp, target)
+            self._evict_disk()
+        except OSError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.path and os.path.isdir(self.path):
+            for name in os.listdir(self.path):
+                os.remove(os.path.join(self.path, name))
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.path):
+            full = os.path.join(self.path, name)
+            if name.endswith('.pkl'):
+                try:
+                    st_ = os.stat(full)
+                except OSError:
+                    continue
+                entries.append((st_.st_mtime, st_.st_size, full))
+        total = sum(e[1] for e in entries)
+        for _mtime, size, full in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            _remove(full)
+            total -= size
+
+def _remove(path):
+    # Outro processo pode ter removido antes
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def forecast_tag(athlete, start, end, routine, exercise):
+    """Tag de cache de uma previsão: uma entrada por base, filtros e exercício."""
+    return (athlete, str(start), str(end), routine, exercise)
+
+def _scoped_tag(scope, exercise):
+    return exercise if scope is None else forecast_tag(*scope, exercise)
+
+_FORECAST_CACHE = ForecastCache(os.environ.get('GYMRUN_FORECAST_CACHE', '.forecast_cache'))
+
+@timed('forecasting.forecast_1rm_series')
+def forecast_1rm_series(series: pd.Series, periods_weeks: int = 6, tag=None, cache=_FORECAST_CACHE):
+    """Recebe uma série temporal (index datetime, valores 1RM) e retorna DataFrame com previsões semanais.
+
+    O resultado fica em cache (memória + disco) pela série semanal e pelos
+    parâmetros; `tag` identifica o exercício para descartar previsões antigas.
+    Passe `cache=None` para sempre recalcular.
+    """
+    sw = _weekly_series(series)
+    if sw is None:
+        return None
+    pm = _pmdarima()
+    key = None
+    if cache is not None:
+        key = _cache_key(sw, periods_weeks, pm)
+        hit = cache.get(key, tag)
+        if hit is not None:
+            return hit.copy()
+    out = _fit_forecast(sw, periods_weeks, pm)
+    if cache is not None and _cacheable(out, pm):
+        cache.put(key, out, tag)
+    return out.copy()
+
+def _weekly_series(series: pd.Series):
+    """Máximo semanal da série (None se houver menos de 5 pontos/semanas)."""
     s = series.dropna().sort_index()
     if s.empty or len(s) < 5:
         return None
@@ -10,27 +183,172 @@ def forecast_1rm_series(series: pd.Series, periods_weeks: int = 6):
     sw = s.resample('W').max().dropna()
     if len(sw) < 5:
         return None
+    return sw
+
+def _model_name(pm) -> str:
+    return 'arima' if pm is not None else 'linear'
+
+def _cache_key(sw: pd.Series, periods_weeks: int, pm) -> str:
+    return ForecastCache.make_key(sw, periods_weeks=periods_weeks, model=_model_name(pm),
+                                  version=FORECAST_MODEL_VERSION)
+
+def _cacheable(out: pd.DataFrame, pm) -> bool:
+    """Só o modelo pedido vai para o cache: o fallback linear (timeout, falha) é recalculado na próxima vez."""
+    return bool((out['Model'] == _model_name(pm)).all())
+
+def _fit_forecast(sw: pd.Series, periods_weeks: int, pm=None):
+    """Ajusta ARIMA (pmdarima) na série semanal, com fallback para regressão linear."""
     try:
-        import importlib
-        pm = importlib.import_module('pmdarima')
+        if pm is None:
+            raise ImportError('pmdarima indisponível')
         model = pm.auto_arima(sw, seasonal=False, error_action='ignore', suppress_warnings=True)
         fc, conf = model.predict(n_periods=periods_weeks, return_conf_int=True)
         future_idx = pd.date_range(sw.index[-1] + pd.Timedelta(weeks=1), periods=periods_weeks, freq='W')
         out = pd.DataFrame({'Date': future_idx, 'Forecast': fc, 'Lower': conf[:, 0], 'Upper': conf[:, 1]})
+        out['Model'] = 'arima'
         return out
     except Exception:
-        # Fallback: Regressão linear no tempo
-        x = np.arange(len(sw))
-        y = sw.values
-        coef = np.polyfit(x, y, deg=1)  # y = a*x + b
-        a, b = coef[0], coef[1]
-        x_future = np.arange(len(sw), len(sw) + periods_weeks)
-        fc = a * x_future + b
-        future_idx = pd.date_range(sw.index[-1] + pd.Timedelta(weeks=1), periods=periods_weeks, freq='W')
-        out = pd.DataFrame({'Date': future_idx, 'Forecast': fc})
-        out['Lower'] = out['Forecast'] - np.std(y)
-        out['Upper'] = out['Forecast'] + np.std(y)
-        return out
+        return _linear_forecast(sw, periods_weeks)
+
+def _linear_forecast(sw: pd.Series, periods_weeks: int):
+    """Fallback: Regressão linear no tempo"""
+    x = np.arange(len(sw))
+    y = sw.values
+    coef = np.polyfit(x, y, deg=1)  # y = a*x + b
+    a, b = coef[0], coef[1]
+    x_future = np.arange(len(sw), len(sw) + periods_weeks)
+    fc = a * x_future + b
+    future_idx = pd.date_range(sw.index[-1] + pd.Timedelta(weeks=1), periods=periods_weeks, freq='W')
+    out = pd.DataFrame({'Date': future_idx, 'Forecast': fc})
+    out['Lower'] = out['Forecast'] - np.std(y)
+    out['Upper'] = out['Forecast'] + np.std(y)
+    out['Model'] = 'linear'
+    return out
+
+def _forecast_task(sw: pd.Series, periods_weeks: int):
+    """Tarefa executada nos processos do pool (precisa ser função de módulo)."""
+    return _fit_forecast(sw, periods_weeks, _pmdarima())
+
+def _forecast_worker(conn, task, sw: pd.Series, periods_weeks: int):
+    """Processo de um ajuste: envia o resultado pelo pipe (nada, se falhar)."""
+    try:
+        conn.send(task(sw, periods_weeks))
+    except Exception:
+        pass
+    finally:
+        conn.close()
+
+def _fit_in_pool(series: dict, horizon: int, workers, timeout: float, task=_forecast_task) -> dict:
+    """Ajusta as séries em processos próprios, até `workers` ao mesmo tempo.
+
+    Cada ajuste roda num processo separado, contado a partir de quando ele
+    começa: o que passa de `timeout` segundos é encerrado na hora, liberando a
+    vaga para a próxima série, e cai para a regressão linear (assim como os
+    que falham).
+    """
+    ctx = multiprocessing.get_context()
+    n_workers = workers or os.cpu_count() or 1
+    queue = list(series.items())[::-1]
+    running = {}  # pipe de leitura -> (exercício, processo, início)
+    fitted = {}
+
+    def finish(conn, fallback):
+        ex, proc, _start = running.pop(conn)
+        if fallback:
+            proc.terminate()
+        else:
+            try:
+                fitted[ex] = conn.recv()
+            except (EOFError, OSError):
+                # O processo saiu sem resultado (falhou ou morreu)
+                fallback = True
+        conn.close()
+        proc.join()
+        if fallback:
+            fitted[ex] = _linear_forecast(series[ex], horizon)
+
+    try:
+        while queue or running:
+            while queue and len(running) < n_workers:
+                ex, sw = queue.pop()
+                conn, child = ctx.Pipe(duplex=False)
+                proc = ctx.Process(target=_forecast_worker, args=(child, task, sw, horizon), daemon=True)
+                proc.start()
+                child.close()
+                running[conn] = (ex, proc, time.monotonic())
+            expires = min(start for _ex, _proc, start in running.values()) + timeout
+            for conn in wait_connections(list(running), timeout=max(0.0, expires - time.monotonic())):
+                finish(conn, fallback=False)
+            now = time.monotonic()
+            for conn in [c for c, (_ex, _proc, start) in running.items() if now - start > timeout]:
+                # Timeout: encerra o processo e cai para a regressão linear
+                finish(conn, fallback=True)
+    finally:
+        for conn in list(running):
+            finish(conn, fallback=True)
+    return fitted
+
+@timed('forecasting.forecast_all')
+def forecast_all(df: pd.DataFrame, horizon: int = 6, workers: int = None, timeout: float = 20.0,
+                 value_col: str = 'Estimated_1RM', cache=_FORECAST_CACHE, scope=None):
+    """Previsão de 1RM para todos os exercícios de uma vez.
+
+    `df` tem as colunas Date, Exercise e `value_col` (séries brutas ou o rollup
+    diário com value_col='Max1RM'). Os ajustes ARIMA rodam em até `workers`
+    processos; um ajuste que passa de `timeout` segundos é encerrado e
+    substituído pela regressão linear. Sem pmdarima, ou
+    com workers <= 1, tudo roda no próprio processo. Resultados em cache não
+    vão para o pool. `scope` = (atleta, início, fim, rotina) entra na tag de
+    cache de cada exercício (ver forecast_tag).
+
+    Retorna um DataFrame longo: Exercise, Date, Forecast, Lower, Upper, Model,
+    Last (último máximo semanal observado).
+    """
+    columns = ['Exercise', 'Date', 'Forecast', 'Lower', 'Upper', 'Model', 'Last']
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+    daily = df.groupby(['Exercise', 'Date'], observed=True)[value_col].max()
+    pm = _pmdarima()
+
+    results, pending = {}, {}
+    for exercise, s in daily.groupby(level='Exercise', observed=True):
+        sw = _weekly_series(s.droplevel('Exercise'))
+        if sw is None:
+            continue
+        key = _cache_key(sw, horizon, pm) if cache is not None else None
+        hit = cache.get(key, _scoped_tag(scope, exercise)) if cache is not None else None
+        if hit is not None:
+            results[exercise] = (sw, hit)
+        else:
+            pending[exercise] = (sw, key)
+
+    if pending:
+        if pm is None or workers is not None and workers <= 1:
+            fitted = {ex: _fit_forecast(sw, horizon, pm) for ex, (sw, _k) in pending.items()}
+        else:
+            fitted = _fit_in_pool({ex: sw for ex, (sw, _k) in pending.items()}, horizon, workers, timeout)
+        for ex, out in fitted.items():
+            sw, key = pending[ex]
+            if cache is not None and _cacheable(out, pm):
+                cache.put(key, out, _scoped_tag(scope, ex))
+            results[ex] = (sw, out)
+
+    frames = [out.assign(Exercise=ex, Last=float(sw.iloc[-1])) for ex, (sw, out) in results.items()]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)[columns]
+
+@timed('forecasting.forecast_ranking')
+def forecast_ranking(forecasts: pd.DataFrame) -> pd.DataFrame:
+    """Ranking de progressão: ganho previsto de 1RM no horizonte, por exercício."""
+    if forecasts.empty:
+        return pd.DataFrame(columns=['Exercise', 'Last', 'Forecast', 'Gain', 'GainPct', 'Model'])
+    end = forecasts.sort_values('Date').groupby('Exercise', observed=True).tail(1)
+    out = end[['Exercise', 'Last', 'Forecast', 'Model']].copy()
+    out['Gain'] = out['Forecast'] - out['Last']
+    out['GainPct'] = np.where(out['Last'] > 0, out['Gain'] / out['Last'] * 100, np.nan)
+    out = out[['Exercise', 'Last', 'Forecast', 'Gain', 'GainPct', 'Model']]
+    return out.sort_values('GainPct', ascending=False, na_position='last').reset_index(drop=True)
 
 def detect_plateau(series: pd.Series, lookback_points: int = 8, slope_thresh: float = 0.01):
     """Detecção simples de platô (inclinação ~0 nas últimas semanas)"""
@@ -47,3 +365,32 @@ def detect_plateau(series: pd.Series, lookback_points: int = 8, slope_thresh: fl
     else:
         rel_slope = a
     return abs(rel_slope) < slope_thresh
+
+@timed('forecasting.plateau_scan')
+def plateau_scan(matrix: pd.DataFrame, lookback_points: int = 8, slope_thresh: float = 0.01):
+    """`detect_plateau` para todas as linhas de uma matriz (exercício × semana) de uma vez.
+
+    Usa as últimas `lookback_points` semanas com valor de cada linha e a
+    inclinação de mínimos quadrados em forma fechada (Σx, Σy, Σxy, Σx²), sem
+    loop por exercício. Retorna um DataFrame indexado como `matrix` com Points,
+    Slope, RelSlope e Plateau.
+    """
+    y = matrix.to_numpy(dtype='float64')
+    valid = ~np.isnan(y)
+    # Posição contada a partir do fim (1 = última semana com valor)
+    from_end = np.cumsum(valid[:, ::-1], axis=1)[:, ::-1]
+    count = valid.sum(axis=1)
+    n = np.minimum(count, lookback_points)
+    use = valid & (from_end <= lookback_points)
+    x = np.where(use, n[:, None] - from_end, 0.0)
+    y = np.where(use, y, 0.0)
+
+    sx, sy = x.sum(axis=1), y.sum(axis=1)
+    sxy, sxx = (x * y).sum(axis=1), (x * x).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        mean = sy / n
+        # Normalizar pelo nível médio para threshold relativo
+        rel = np.where(mean > 0, slope / mean, slope)
+    plateau = (count >= max(5, lookback_points)) & (np.abs(rel) < slope_thresh)
+    return pd.DataFrame({'Points': n, 'Slope': slope, 'RelSlope': rel, 'Plateau': plateau}, index=matrix.index)
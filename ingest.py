@@ -0,0 +1,194 @@
+"""Leitura em fluxo de exportações do GymRun recebidas por e-mail (.eml).
+
+O GymRun envia o CSV como anexo de uma mensagem MIME. Aqui a mensagem é
+percorrida linha a linha: só os cabeçalhos de cada parte passam pelo pacote
+`email`; o corpo do anexo CSV é decodificado (base64 / quoted-printable) em
+blocos e entregue a quem lê, sem montar a mensagem inteira em memória.
+Arquivos que já são um CSV puro (mesmo com extensão .eml) passam direto.
+"""
+import binascii
+import codecs
+import io
+import re
+from email import policy
+from email.parser import BytesParser
+
+# Tamanho dos blocos decodificados entregues ao leitor de CSV
+CHUNK_BYTES = 1 << 16
+
+_HEADER_LINE = re.compile(rb'^[!-9;-~]+:[ \t]')
+_CSV_TYPES = {'text/csv', 'text/comma-separated-values', 'application/csv', 'application/vnd.ms-excel'}
+
+class _Lines:
+    """Iterador de linhas com devolução (para reler um delimitador de parte)."""
+
+    def __init__(self, fp):
+        self._fp = fp
+        self._pushed = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._pushed:
+            return self._pushed.pop()
+        line = self._fp.readline()
+        if not line:
+            raise StopIteration
+        return line
+
+    def push(self, line):
+        self._pushed.append(line)
+
+class _ChunkStream(io.RawIOBase):
+    """Arquivo binário somente leitura sobre um gerador de blocos de bytes."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buf = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buf:
+            try:
+                self._buf = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+def _read_headers(lines):
+    raw = []
+    for line in lines:
+        if not line.strip(b'\r\n'):
+            break
+        raw.append(line)
+    return BytesParser(policy=policy.default).parsebytes(b''.join(raw), headersonly=True)
+
+def _boundary_of(line, boundaries):
+    """Delimitador (dentre `boundaries`) que `line` representa, ou None."""
+    if not line.startswith(b'--'):
+        return None
+    text = line.rstrip()
+    for b in reversed(boundaries):
+        if text == b'--' + b or text == b'--' + b + b'--':
+            return b
+    return None
+
+def _is_csv_part(headers):
+    filename = (headers.get_filename() or '').lower()
+    return headers.get_content_type() in _CSV_TYPES or filename.endswith('.csv')
+
+def _body_lines(lines, boundaries):
+    """Linhas do corpo da parte atual; o delimitador seguinte é devolvido ao iterador.
+
+    A quebra de linha antes do delimitador pertence a ele (RFC 2046), então
+    sai da última linha do corpo.
+    """
+    prev = None
+    for line in lines:
+        if _boundary_of(line, boundaries) is not None:
+            lines.push(line)
+            if prev is not None:
+                yield prev[:-2] if prev.endswith(b'\r\n') else prev[:-1] if prev.endswith(b'\n') else prev
+            return
+        if prev is not None:
+            yield prev
+        prev = line
+    if prev is not None:
+        yield prev
+
+def _decode(body, encoding):
+    """Decodifica o corpo em blocos de ~CHUNK_BYTES conforme o Content-Transfer-Encoding."""
+    pending, size, tail = [], 0, b''
+    for line in body:
+        if encoding == 'base64':
+            # Base64 só decodifica em grupos de 4 caracteres; o resto vai para o próximo bloco
+            data = tail + line.strip()
+            cut = len(data) - len(data) % 4
+            data, tail = binascii.a2b_base64(data[:cut]), data[cut:]
+        elif encoding == 'quoted-printable':
+            data = binascii.a2b_qp(line)
+        else:
+            data = line
+        pending.append(data)
+        size += len(data)
+        if size >= CHUNK_BYTES:
+            yield b''.join(pending)
+            pending, size = [], 0
+    if pending:
+        yield b''.join(pending)
+
+def _to_utf8(chunks, charset):
+    """Recodifica os blocos para UTF-8 (o leitor de CSV sempre lê UTF-8)."""
+    decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+    for chunk in chunks:
+        yield decoder.decode(chunk).encode('utf-8')
+    yield decoder.decode(b'', final=True).encode('utf-8')
+
+def _part_chunks(lines, headers, boundaries):
+    """Procura o anexo CSV a partir da parte atual e gera seus bytes decodificados.
+
+    Devolve (via StopIteration.value) se o anexo foi encontrado nesta parte.
+    """
+    if headers.get_content_maintype() == 'multipart':
+        boundary = headers.get_boundary()
+        if not boundary:
+            return False
+        inner = boundaries + [boundary.encode('ascii', 'replace')]
+        for _ in _body_lines(lines, inner):  # preâmbulo
+            pass
+        for line in lines:
+            if _boundary_of(line, inner) != inner[-1]:
+                # Delimitador de uma parte externa: esta parte multipart acabou
+                lines.push(line)
+                return False
+            if line.rstrip().endswith(b'--'):
+                # Delimitador de fechamento: descarta o epílogo
+                for _ in _body_lines(lines, boundaries):
+                    pass
+                return False
+            found = yield from _part_chunks(lines, _read_headers(lines), inner)
+            if found:
+                return True
+        return False
+    if not _is_csv_part(headers):
+        for _ in _body_lines(lines, boundaries):
+            pass
+        return False
+    encoding = (headers.get('Content-Transfer-Encoding') or '7bit').strip().lower()
+    chunks = _decode(_body_lines(lines, boundaries), encoding)
+    charset = headers.get_content_charset('utf-8')
+    if codecs.lookup(charset).name != 'utf-8':
+        chunks = _to_utf8(chunks, charset)
+    yield from chunks
+    return True
+
+def _message_chunks(fp):
+    lines = _Lines(fp)
+    headers = _read_headers(lines)
+    found = yield from _part_chunks(lines, headers, [])
+    if not found:
+        raise ValueError("Nenhum anexo CSV encontrado na mensagem.")
+
+def is_mime_message(fp):
+    """Indica se o arquivo começa com cabeçalhos de e-mail (e não com o cabeçalho do CSV)."""
+    start = fp.tell()
+    first = fp.readline()
+    fp.seek(start)
+    return bool(_HEADER_LINE.match(first))
+
+def open_export(fp):
+    """Abre uma exportação GymRun (CSV puro ou mensagem .eml) como fluxo binário do CSV.
+
+    `fp` é um arquivo binário posicionado no início. Se já for um CSV, o
+    próprio `fp` é devolvido; se for uma mensagem MIME, devolve um fluxo não
+    pesquisável (seek) que decodifica o anexo sob demanda.
+    """
+    if not is_mime_message(fp):
+        return fp
+    return io.BufferedReader(_ChunkStream(_message_chunks(fp)), buffer_size=CHUNK_BYTES)
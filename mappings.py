@@ -1,29 +1,168 @@
+import json
+import logging
 import os
 import unicodedata
 import re
-from typing import Optional, Union
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+import pandas as pd
+
+from perf import timed
+
+logger = logging.getLogger(__name__)
+
+# Tabela (palavras-chave, grupo) em ordem de prioridade: o primeiro grupo com
+# alguma palavra-chave contida no nome vence.
+MUSCLE_GROUP_KEYWORDS: List[Tuple[List[str], str]] = [
+    (['supino', 'bench', 'crucifixo', 'crossover', 'peck deck', 'fly'], 'Peito'),
+    (['remada', 'puxada', 'pulldown', 'barra fixa', 'serrote', 'pullover', 'row'], 'Costas'),
+    (['agachamento', 'squat', 'leg press', 'hack', 'afundo', 'lunge', 'extensora', 'flexora', 'adutora', 'abdutora'], 'Pernas'),
+    (['desenvolvimento', 'elevação lateral', 'elevação frontal', 'arnold', 'shoulder', 'militar'], 'Ombros'),
+    (['rosca', 'curl', 'bíceps', 'biceps'], 'Bíceps'),
+    (['tríceps', 'triceps', 'paralelas', 'mergulho', 'pulley', 'testa'], 'Tríceps'),
+    (['glúteo', 'gluteo', 'hip thrust', 'coice', 'abdução', 'elevação pélvica'], 'Glúteos'),
+    (['panturrilha', 'gemelar', 'calf'], 'Panturrilha'),
+    (['abdominal', 'abs', 'prancha', 'crunch', 'core'], 'Core'),
+    (['esteira', 'bike', 'spinning', 'corrida', 'remador', 'rower'], 'Cardio'),
+]
+
+EXERCISE_EMOJI_KEYWORDS: List[Tuple[List[str], str]] = [
+    (['supino'], '🏋️'),
+    (['agachamento', 'leg press', 'hack'], '🦵'),
+    (['terra'], '🏋️'),
+    (['remada', 'remador'], '🚣'),
+    (['barra fixa', 'pull-up', 'puxada', 'pulldown'], '🧗'),
+    (['rosca', 'bíceps', 'biceps', 'curl'], '💪'),
+    (['tríceps', 'triceps', 'testa', 'mergulho'], '🦾'),
+    (['panturrilha', 'calf'], '🦶'),
+    (['abdominal', 'abs', 'prancha', 'crunch', 'core'], '🧘'),
+    (['esteira', 'corrida'], '🏃'),
+    (['bike', 'spinning'], '🚴'),
+]
+
+class ExerciseClassifier:
+    """Classifica nomes de exercícios por palavras-chave com um único regex compilado.
+
+    As palavras-chave de todas as regras viram uma só alternação, ordenada pela
+    prioridade da regra. O regex é aplicado em lookahead para enxergar todas as
+    posições do nome; em cada posição a alternação devolve a regra de maior
+    prioridade que casa ali, então o menor índice encontrado é exatamente a
+    primeira regra que casaria testando uma a uma. Os resultados ficam em cache
+    por nome, e `overrides` (nome -> rótulo) têm precedência sobre as regras.
+    """
+
+    def __init__(self, rules: Iterable[Tuple[Iterable[str], str]], default: str = 'Outros',
+                 overrides: Optional[Mapping[str, str]] = None):
+        self.default = default
+        self.labels: List[str] = []
+        alternatives = []
+        self._rule_of: Dict[str, int] = {}
+        for idx, (keywords, label) in enumerate(rules):
+            self.labels.append(label)
+            for kw in keywords:
+                kw = kw.lower()
+                if kw not in self._rule_of:
+                    self._rule_of[kw] = idx
+                    alternatives.append(kw)
+        # Ordem estável por prioridade da regra; dentro da regra, mais longas antes
+        alternatives.sort(key=lambda k: (self._rule_of[k], -len(k)))
+        self._pattern = re.compile('(?=(' + '|'.join(re.escape(k) for k in alternatives) + '))')
+        self._overrides: Dict[str, str] = {}
+        self._cache: Dict[str, str] = {}
+        if overrides:
+            self.set_overrides(overrides)
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return name.strip().lower()
+
+    def set_overrides(self, overrides: Mapping[str, str]) -> None:
+        """Define a tabela de correções manuais (nome do exercício -> rótulo)."""
+        self._overrides = {self._key(k): v for k, v in overrides.items() if isinstance(k, str)}
+        self._cache.clear()
+
+    def classify(self, name) -> str:
+        """Classifica um único nome (com cache)"""
+        if not isinstance(name, str):
+            return self.default
+        hit = self._cache.get(name)
+        if hit is not None:
+            return hit
+        s = self._key(name)
+        label = self._overrides.get(s)
+        if label is None:
+            best = None
+            for m in self._pattern.finditer(s):
+                idx = self._rule_of[m.group(1)]
+                if best is None or idx < best:
+                    best = idx
+                    if idx == 0:
+                        break
+            label = self.labels[best] if best is not None else self.default
+        self._cache[name] = label
+        return label
+
+    def classify_series(self, names: pd.Series) -> pd.Series:
+        """Classifica uma coluna inteira rodando o regex só nos nomes únicos.
+
+        Retorna uma Series categórica alinhada ao índice de `names`.
+        """
+        codes, uniques = pd.factorize(names, sort=False)
+        labels = [self.classify(u) for u in uniques]
+        categories = list(dict.fromkeys(labels + [self.default]))
+        cat_codes = pd.Index(categories).get_indexer(labels)
+        mapped = cat_codes[codes] if len(labels) else codes
+        # Nomes ausentes (código -1) caem no rótulo padrão, como map_exercise_to_group
+        mapped = mapped.copy()
+        mapped[codes == -1] = categories.index(self.default)
+        return pd.Series(pd.Categorical.from_codes(mapped, categories=categories),
+                         index=names.index, name=names.name)
+
+_GROUP_CLASSIFIER = ExerciseClassifier(MUSCLE_GROUP_KEYWORDS, default='Outros')
+_EMOJI_CLASSIFIER = ExerciseClassifier(EXERCISE_EMOJI_KEYWORDS, default='')
+
+# Correções manuais de grupo muscular, editáveis pelo usuário ao lado da base
+MUSCLE_GROUPS_NAME = 'muscle_groups.json'
+
+def load_muscle_groups(store) -> Tuple[Tuple[str, str], ...]:
+    """Correções de grupo muscular da base (JSON nome do exercício -> grupo).
+
+    Retorna os pares ordenados, prontos para servir de chave de cache; sem o
+    arquivo, ou com o arquivo inválido, não há correções.
+    """
+    path = store.sidecar_path(MUSCLE_GROUPS_NAME)
+    try:
+        with open(path, encoding='utf-8') as f:
+            raw = json.load(f)
+    except FileNotFoundError:
+        return ()
+    except (OSError, ValueError) as e:
+        logger.warning("Correções de grupo muscular ignoradas (%s): %s", path, e)
+        return ()
+    if not isinstance(raw, dict):
+        logger.warning("Correções de grupo muscular ignoradas (%s): esperado um objeto JSON", path)
+        return ()
+    return tuple(sorted((k, v) for k, v in raw.items() if isinstance(k, str) and isinstance(v, str) and v.strip()))
+
+@lru_cache(maxsize=8)
+def _group_classifier(overrides: Tuple[Tuple[str, str], ...]) -> ExerciseClassifier:
+    if not overrides:
+        return _GROUP_CLASSIFIER
+    return ExerciseClassifier(MUSCLE_GROUP_KEYWORDS, default='Outros', overrides=dict(overrides))
+
+@timed('mappings.classify_exercises')
+def classify_exercises(names: pd.Series, overrides: Union[Mapping[str, str], Iterable[Tuple[str, str]], None] = None) -> pd.Series:
+    """Mapeia uma coluna de exercícios para grupos musculares (Categorical).
+
+    `overrides` (ex.: load_muscle_groups) têm precedência sobre as palavras-chave.
+    """
+    items = tuple(sorted(dict(overrides or ()).items()))
+    return _group_classifier(items).classify_series(names)
 
 def map_exercise_to_group(name: str) -> str:
     """Mapeia exercício para grupo muscular"""
-    if not isinstance(name, str):
-        return 'Outros'
-    s = name.strip().lower()
-    groups = [
-        (['supino', 'bench', 'crucifixo', 'crossover', 'peck deck', 'fly'], 'Peito'),
-        (['remada', 'puxada', 'pulldown', 'barra fixa', 'serrote', 'pullover', 'row'], 'Costas'),
-        (['agachamento', 'squat', 'leg press', 'hack', 'afundo', 'lunge', 'extensora', 'flexora', 'adutora', 'abdutora'], 'Pernas'),
-        (['desenvolvimento', 'elevação lateral', 'elevação frontal', 'arnold', 'shoulder', 'militar'], 'Ombros'),
-        (['rosca', 'curl', 'bíceps', 'biceps'], 'Bíceps'),
-        (['tríceps', 'triceps', 'paralelas', 'mergulho', 'pulley', 'testa'], 'Tríceps'),
-        (['glúteo', 'gluteo', 'hip thrust', 'coice', 'abdução', 'elevação pélvica'], 'Glúteos'),
-        (['panturrilha', 'gemelar', 'calf'], 'Panturrilha'),
-        (['abdominal', 'abs', 'prancha', 'crunch', 'core'], 'Core'),
-        (['esteira', 'bike', 'spinning', 'corrida', 'remador', 'rower'], 'Cardio'),
-    ]
-    for keywords, grp in groups:
-        if any(k in s for k in keywords):
-            return grp
-    return 'Outros'
+    return _GROUP_CLASSIFIER.classify(name)
 
 def get_group_icon_path(group: str) -> str:
     """Retorna o caminho do ícone para um grupo muscular"""
@@ -68,42 +207,29 @@ def get_group_emoji(group: Optional[str]) -> str:
 
 def get_exercise_emoji(exercise: Optional[str], group: Optional[str] = None) -> str:
     """Retorna emoji específico para um exercício"""
-    if isinstance(exercise, str):
-        s = exercise.lower()
-        # por palavras-chave do exercício
-        if any(k in s for k in ['supino']):
-            return '🏋️'
-        if any(k in s for k in ['agachamento', 'leg press', 'hack']):
-            return '🦵'
-        if any(k in s for k in ['terra']):
-            return '🏋️'
-        if any(k in s for k in ['remada', 'remador']):
-            return '🚣'
-        if any(k in s for k in ['barra fixa', 'pull-up', 'puxada', 'pulldown']):
-            return '🧗'
-        if any(k in s for k in ['rosca', 'bíceps', 'biceps', 'curl']):
-            return '💪'
-        if any(k in s for k in ['tríceps', 'triceps', 'testa', 'mergulho']):
-            return '🦾'
-        if any(k in s for k in ['panturrilha', 'calf']):
-            return '🦶'
-        if any(k in s for k in ['abdominal', 'abs', 'prancha', 'crunch', 'core']):
-            return '🧘'
-        if any(k in s for k in ['esteira', 'corrida']):
-            return '🏃'
-        if any(k in s for k in ['bike', 'spinning']):
-            return '🚴'
+    emoji = _EMOJI_CLASSIFIER.classify(exercise)
+    if emoji:
+        return emoji
     # fallback para o grupo
     return get_group_emoji(group or '')
 
+def strip_accents(text: str) -> str:
+    """Remove acentos e outros diacríticos (decomposição NFKD)"""
+    txt = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in txt if not unicodedata.combining(c))
+
 def get_exercise_icon_path(exercise: str, group: Optional[str] = None) -> str:
     """Retorna o caminho do ícone para um exercício"""
+    if not isinstance(exercise, str):
+        exercise = None
+    return _exercise_icon_path(exercise, group)
+
+@lru_cache(maxsize=4096)
+def _exercise_icon_path(exercise: Optional[str], group: Optional[str]) -> str:
     # tenta ícone específico do exercício e faz fallback para ícone do grupo
-    if isinstance(exercise, str) and exercise:
+    if exercise:
         # slugify leve: remover acentos, deixar letras/números e '-'
-        txt = unicodedata.normalize('NFKD', exercise)
-        txt = ''.join(c for c in txt if not unicodedata.combining(c))
-        slug = re.sub(r'[^a-zA-Z0-9]+', '-', txt).strip('-').lower()
+        slug = re.sub(r'[^a-zA-Z0-9]+', '-', strip_accents(exercise)).strip('-').lower()
         path = f"icons/exercicio/{slug}.svg"
         if os.path.exists(path):
             return path
@@ -1,28 +1,119 @@
+import numpy as np
+import pandas as pd
 
-def generate_alerts(exercise_df, filtered_df, exercise_name):
-    """Gera alertas para um exercício específico"""
+from perf import timed
+
+PLATEAU_ALERT = "Possível platô em 1RM. Considere deload, trocar variação ou ajustar volume/intensidade."
+VOLUME_DROP_ALERT = "Volume recente caiu >20% vs. semanas anteriores. Verifique recuperação/sono/estresse."
+LOAD_SPIKE_ALERT = "Pico de carga em {group}: ACWR {acwr:.2f} (acima de {limit:.1f}). Risco maior de lesão; distribua o volume na semana."
+LOAD_LOW_ALERT = "Carga total da última semana bem abaixo do habitual: ACWR {acwr:.2f} (abaixo de {limit:.1f})."
+FATIGUE_ALERT = "Fadiga acumulada acima do condicionamento (forma negativa no modelo fitness-fadiga). Considere alguns dias mais leves."
+
+@timed('metrics.generate_alerts')
+def generate_alerts(weekly):
+    """Gera alertas para um exercício a partir do seu rollup semanal.
+
+    `weekly` é indexado pela semana (rótulo de resample('W')) e tem as colunas
+    Max1RM e Volume (ver rollups.RollupCube.exercise_weekly).
+    """
     alerts = []
+    if weekly is None or weekly.empty:
+        return alerts
     
     # Import local da função detect_plateau
     from forecasting import detect_plateau
     
     # Platô em 1RM semanal
-    m1 = exercise_df.groupby('Date')['Estimated_1RM'].max().sort_index()
-    if not m1.empty:
-        plateau = detect_plateau(m1.resample('W').max().dropna())
-        if plateau:
-            alerts.append("Possível platô em 1RM. Considere deload, trocar variação ou ajustar volume/intensidade.")
+    plateau = detect_plateau(weekly['Max1RM'].dropna())
+    if plateau:
+        alerts.append(PLATEAU_ALERT)
     
-    # Queda de volume nas últimas semanas
-    volw = exercise_df.groupby('Date')['Volume'].sum().resample('W').sum()
+    # Queda de volume nas últimas semanas (semanas sem treino contam como volume zero)
+    volw = weekly['Volume'].asfreq('W', fill_value=0)
     if len(volw.dropna()) >= 4:
         recent = volw.iloc[-2:].mean()
         prev = volw.iloc[-4:-2].mean()
         if prev > 0 and recent < 0.8 * prev:
-            alerts.append("Volume recente caiu >20% vs. semanas anteriores. Verifique recuperação/sono/estresse.")
+            alerts.append(VOLUME_DROP_ALERT)
     
     return alerts
 
+def volume_drop_scan(volume: pd.DataFrame, drop: float = 0.2):
+    """Queda de volume para todas as linhas de uma matriz (exercício × semana).
+
+    Mesma regra de `generate_alerts`: semanas sem treino contam como zero
+    dentro do período de cada exercício; compara a média das 2 últimas semanas
+    do exercício com a das 2 anteriores (mínimo de 4 semanas).
+    """
+    v = volume.to_numpy(dtype='float64')
+    present = ~np.isnan(v)
+    v = np.where(present, v, 0.0)
+    cols = np.arange(v.shape[1])
+    first = np.where(present, cols, v.shape[1]).min(axis=1)
+    last = np.where(present, cols, -1).max(axis=1)
+    enough = last - first + 1 >= 4
+
+    def at(k):
+        # Volume k semanas antes da última semana de cada exercício
+        return np.take_along_axis(v, np.clip(last - k, 0, None)[:, None], axis=1)[:, 0]
+
+    recent = (at(0) + at(1)) / 2
+    prev = (at(2) + at(3)) / 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change = np.where(prev > 0, recent / prev - 1, np.nan)
+    flag = enough & (prev > 0) & (recent < (1 - drop) * prev)
+    return pd.DataFrame({'RecentVolume': recent, 'PrevVolume': prev, 'VolumeChange': change, 'VolumeDrop': flag},
+                        index=volume.index)
+
+@timed('metrics.alerts_report')
+def alerts_report(weekly):
+    """Relatório de platô e queda de volume para todos os exercícios.
+
+    `weekly` é o rollup semanal (colunas Week, Exercise, Max1RM, Volume; ver
+    rollups.RollupCube.weekly_slice). Monta as matrizes exercício × semana e
+    aplica `plateau_scan`/`volume_drop_scan` de uma vez, sem loop por exercício.
+    """
+    columns = ['Exercise', 'Weeks', 'Slope', 'RelSlope', 'Plateau', 'RecentVolume', 'PrevVolume',
+               'VolumeChange', 'VolumeDrop']
+    if weekly is None or weekly.empty:
+        return pd.DataFrame(columns=columns)
+
+    from forecasting import plateau_scan
+
+    grouped = weekly.groupby(['Exercise', 'Week'], observed=True).agg(Max1RM=('Max1RM', 'max'), Volume=('Volume', 'sum'))
+    weeks = pd.date_range(grouped.index.get_level_values('Week').min(),
+                          grouped.index.get_level_values('Week').max(), freq='W')
+    one_rm = grouped['Max1RM'].unstack('Week').reindex(columns=weeks)
+    volume = grouped['Volume'].unstack('Week').reindex(columns=weeks)
+
+    report = plateau_scan(one_rm).join(volume_drop_scan(volume))
+    report = report.rename(columns={'Points': 'Weeks'}).rename_axis('Exercise').reset_index()
+    return report[columns]
+
+@timed('metrics.load_alerts')
+def load_alerts(latest, high=1.5, low=0.8):
+    """Alertas de carga a partir do último dia de cada grupo (ver training_load.latest).
+
+    Pico de ACWR em qualquer grupo; carga baixa e forma negativa só no Total,
+    para não repetir o mesmo aviso por grupo.
+    """
+    from training_load import TOTAL
+
+    alerts = []
+    if latest is None or latest.empty:
+        return alerts
+    acwr = latest['ACWR'].dropna()
+    for group, value in acwr[acwr > high].sort_values(ascending=False).items():
+        alerts.append(LOAD_SPIKE_ALERT.format(group=group, acwr=value, limit=high))
+    if TOTAL in latest.index:
+        total = latest.loc[TOTAL]
+        if total['ACWR'] < low:
+            alerts.append(LOAD_LOW_ALERT.format(acwr=total['ACWR'], limit=low))
+        if total['Form'] < 0:
+            alerts.append(FATIGUE_ALERT)
+    return alerts
+
+@timed('metrics.calculate_basic_metrics')
 def calculate_basic_metrics(filtered_df):
     """Calcula métricas básicas do treino"""
     return {
@@ -32,9 +123,10 @@ def calculate_basic_metrics(filtered_df):
         'volume_medio': 0 if filtered_df.empty or filtered_df['Volume'].isna().all() else filtered_df['Volume'].mean()
     }
 
+@timed('metrics.calculate_exercise_stats')
 def calculate_exercise_stats(filtered_df):
     """Calcula estatísticas por exercício para os atalhos"""
-    return filtered_df.groupby(['Exercise', 'MuscleGroup']).agg(
+    return filtered_df.groupby(['Exercise', 'MuscleGroup'], observed=True).agg(
         Sessoes=('Date', 'nunique'),
         Volume=('Volume', 'sum'),
         OneRM=('Estimated_1RM', 'max')
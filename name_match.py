@@ -0,0 +1,113 @@
+"""Sugestões de nome para exercícios novos de um upload.
+
+Quando um export traz nomes que a base não conhece (renomeados no GymRun,
+com sufixos como "(sentado)", acentos diferentes...), o app sugere os nomes
+antigos mais parecidos. `NameIndex` guarda os trigramas de caracteres de cada
+nome normalizado (sem acentos, minúsculo, só letras e números) num índice
+invertido: a similaridade de Dice com todos os nomes sai de um `bincount`
+sobre as listas dos trigramas da consulta, sem comparar par a par.
+
+Mapeamentos confirmados ficam num JSON ao lado da base (por atleta) e são
+aplicados sozinhos nos próximos uploads.
+"""
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+import numpy as np
+
+from mappings import strip_accents
+from perf import timed
+
+NGRAM = 3
+TOP_K = 5
+# Sugestão pré-selecionada: Dice mínimo e vantagem sobre a segunda colocada
+CONFIDENT_SCORE = 0.75
+CONFIDENT_MARGIN = 0.1
+ALIASES_NAME = 'aliases.json'
+
+def normalize_name(name: str) -> str:
+    """Nome sem acentos, minúsculo, com letras e números separados por um espaço"""
+    return re.sub(r'[^a-z0-9]+', ' ', strip_accents(name).lower()).strip()
+
+def ngrams(name: str, n: int = NGRAM) -> set:
+    """Trigramas do nome normalizado (com bordas, para valorizar início e fim das palavras)"""
+    txt = f" {normalize_name(name)} "
+    return {txt[i:i + n] for i in range(max(1, len(txt) - n + 1))}
+
+class NameIndex:
+    """Índice invertido de n-gramas sobre os nomes de exercício existentes."""
+
+    def __init__(self, names: Iterable[str], n: int = NGRAM):
+        self.n = n
+        self.names: List[str] = sorted({x for x in names if isinstance(x, str)})
+        postings: Dict[str, List[int]] = {}
+        sizes = []
+        for i, name in enumerate(self.names):
+            grams = ngrams(name, n)
+            sizes.append(len(grams))
+            for g in grams:
+                postings.setdefault(g, []).append(i)
+        self._postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+        self._sizes = np.array(sizes, dtype=float)
+
+    def __len__(self):
+        return len(self.names)
+
+    def match(self, name: str, k: int = TOP_K) -> List[Tuple[str, float]]:
+        """Os k nomes mais parecidos com `name`, como (nome, Dice em 0..1), do mais para o menos parecido."""
+        grams = ngrams(name, self.n)
+        hits = [self._postings[g] for g in grams if g in self._postings]
+        if not hits:
+            return []
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.names))
+        score = 2 * shared / (len(grams) + self._sizes)
+        top = np.flatnonzero(shared)
+        if len(top) > k:
+            top = top[np.argpartition(-score[top], k - 1)[:k]]
+        top = top[np.lexsort((top, -score[top]))]
+        return [(self.names[i], float(score[i])) for i in top]
+
+def confident(candidates: List[Tuple[str, float]]) -> bool:
+    """A primeira sugestão é boa o bastante para vir pré-selecionada?"""
+    if not candidates or candidates[0][1] < CONFIDENT_SCORE:
+        return False
+    return len(candidates) == 1 or candidates[0][1] - candidates[1][1] >= CONFIDENT_MARGIN
+
+@timed('name_match.suggest')
+def suggest(new_names: Iterable[str], old_names: Iterable[str], k: int = TOP_K) -> Dict[str, List[Tuple[str, float]]]:
+    """Sugestões (top-k) de nome antigo para cada nome novo."""
+    index = NameIndex(old_names)
+    return {name: index.match(name, k) for name in new_names}
+
+def _aliases_path(store):
+    return store.sidecar_path(ALIASES_NAME)
+
+def load_aliases(store) -> Dict[str, str]:
+    """Mapeamentos confirmados da base (nome novo -> nome existente)."""
+    try:
+        with open(_aliases_path(store), encoding='utf-8') as f:
+            return dict(json.load(f))
+    except (OSError, ValueError):
+        return {}
+
+def save_aliases(store, mappings: Mapping[str, str]) -> None:
+    """Acrescenta mapeamentos confirmados aos já salvos (temporário + rename, sob a trava da base)."""
+    from data import temp_path
+
+    if not mappings:
+        return
+    path = _aliases_path(store)
+    with store.lock:
+        aliases = load_aliases(store)
+        aliases.update(mappings)
+        tmp = temp_path(path)
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(aliases, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+
+def resolve_aliases(new_names: Iterable[str], old_names: Iterable[str], aliases: Mapping[str, str]) -> Dict[str, str]:
+    """Nomes novos já mapeados antes, cujo destino ainda existe na base."""
+    old = set(old_names)
+    return {name: aliases[name] for name in new_names if aliases.get(name) in old}
@@ -0,0 +1,125 @@
+"""Instrumentação leve das etapas do dashboard.
+
+`stage(nome)` (gerenciador de contexto) e `@timed` (decorador) registram
+tempo de parede, linhas de entrada/saída e variação de memória (RSS) de cada
+etapa. Só há registro dentro de `recording()`, que o app abre a cada rerun;
+fora dele (CLI, benchmarks) o custo é uma checagem de variável.
+
+Os registros aparecem no painel de desempenho do app (?debug=1 ou
+GYMRUN_DEBUG=1) e, com GYMRUN_PERF_LOG, são anexados a um arquivo JSON-lines.
+"""
+import contextvars
+import functools
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+_run = contextvars.ContextVar('gymrun_perf_run', default=None)
+
+def _rss_bytes():
+    """Memória residente atual do processo (None se não houver como medir)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+def _rows(value):
+    """Número de linhas de um DataFrame/Series (ou do primeiro item de uma tupla)."""
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    return len(value) if hasattr(value, 'shape') and hasattr(value, '__len__') else None
+
+class Run:
+    """Registros de um rerun."""
+
+    def __init__(self, label):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.started = time.time()
+        self.records = []
+        self.depth = 0
+
+    def to_frame(self):
+        import pandas as pd
+        frame = pd.DataFrame(self.records, columns=['stage', 'depth', 'seconds', 'rows_in', 'rows_out', 'mem_delta_mb'])
+        return frame.astype({'rows_in': 'Int64', 'rows_out': 'Int64'})
+
+class _Stage:
+    """Handle de uma etapa em andamento; `rows_out` pode ser definido no corpo do `with`."""
+
+    __slots__ = ('rows_in', 'rows_out')
+
+    def __init__(self, rows_in):
+        self.rows_in = rows_in
+        self.rows_out = None
+
+@contextmanager
+def stage(name, rows_in=None):
+    """Mede uma etapa; `rows_in` aceita um número ou um DataFrame."""
+    run = _run.get()
+    handle = _Stage(rows_in if rows_in is None or isinstance(rows_in, int) else _rows(rows_in))
+    if run is None:
+        yield handle
+        return
+    record = {'stage': name, 'depth': run.depth}
+    run.records.append(record)
+    run.depth += 1
+    rss = _rss_bytes()
+    t0 = time.perf_counter()
+    try:
+        yield handle
+    finally:
+        record['seconds'] = round(time.perf_counter() - t0, 6)
+        after = _rss_bytes()
+        rows_out = handle.rows_out
+        record['rows_in'] = handle.rows_in
+        record['rows_out'] = rows_out if rows_out is None or isinstance(rows_out, int) else _rows(rows_out)
+        record['mem_delta_mb'] = None if rss is None or after is None else round((after - rss) / 2**20, 2)
+        run.depth -= 1
+
+def timed(name=None):
+    """Decorador: registra a função como etapa (linhas do 1º DataFrame recebido e do retorno)."""
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _run.get() is None:
+                return func(*args, **kwargs)
+            rows_in = next((n for n in map(_rows, args) if n is not None), None)
+            with stage(label, rows_in) as s:
+                out = func(*args, **kwargs)
+                s.rows_out = _rows(out)
+            return out
+        return wrapper
+    return decorate
+
+@contextmanager
+def recording(label='rerun', log_path=None):
+    """Abre um Run para as etapas executadas no bloco.
+
+    Com `log_path` (ou GYMRUN_PERF_LOG), ao terminar sem erro os registros são
+    anexados ao arquivo como JSON-lines, um por etapa.
+    """
+    run = Run(label)
+    token = _run.set(run)
+    try:
+        yield run
+    finally:
+        _run.reset(token)
+    log_path = log_path or os.environ.get('GYMRUN_PERF_LOG')
+    if log_path and run.records:
+        append_log(run, log_path)
+
+def append_log(run, path):
+    with open(path, 'a', encoding='utf-8') as f:
+        for rec in run.records:
+            f.write(json.dumps({'run': run.id, 'label': run.label, 'ts': run.started, **rec}, ensure_ascii=False) + '\n')
@@ -0,0 +1,107 @@
+"""Consultas sobre as séries enriquecidas sem varrer a base inteira.
+
+`SetQuery` ordena as séries por data uma única vez e guarda, para Exercise,
+Routine e MuscleGroup, as posições de cada valor (já em ordem de data).
+Intervalos de datas viram fatias por `searchsorted` e os filtros por valor
+partem da lista de posições do valor mais raro: O(log n + k) em vez de várias
+máscaras O(n) seguidas de cópia. Com Copy-on-Write (padrão no pandas 3,
+ligado por data.py no pandas 2) as fatias devolvidas são vistas, sem cópia
+dos dados.
+"""
+import numpy as np
+import pandas as pd
+
+from perf import timed
+
+INDEXED_COLUMNS = ('Exercise', 'Routine', 'MuscleGroup')
+
+class SetQuery:
+    """Índice de datas e de posições por valor sobre um DataFrame de séries (somente leitura)."""
+
+    def __init__(self, df, columns=INDEXED_COLUMNS):
+        if 'Date' not in df.columns:
+            # Base vazia (ou que falhou ao carregar): índice sem linhas
+            df = df.assign(Date=pd.Series(dtype='datetime64[ns]'))
+        if not df['Date'].is_monotonic_increasing:
+            df = df.sort_values('Date', kind='stable', ignore_index=True)
+        self.frame = df
+        self._dates = df['Date'].to_numpy()
+        self._codes = {}
+        self._lookup = {}
+        self._positions = {}
+        for col in columns:
+            if col not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[col])
+            # Ordenação estável por código: as posições de cada valor continuam em ordem de data
+            order = np.argsort(codes, kind='stable')
+            counts = np.bincount(codes + 1, minlength=len(uniques) + 1)
+            bounds = np.cumsum(counts)
+            self._codes[col] = codes
+            self._lookup[col] = {v: i for i, v in enumerate(uniques)}
+            self._positions[col] = [order[bounds[i]:bounds[i + 1]] for i in range(len(uniques))]
+
+    def __len__(self):
+        return len(self.frame)
+
+    def bounds(self, start=None, end=None):
+        """Posições [lo, hi) das séries entre start e end (datas inclusivas)."""
+        lo = 0 if start is None else int(np.searchsorted(self._dates, np.datetime64(pd.Timestamp(start)), side='left'))
+        hi = len(self._dates) if end is None else int(np.searchsorted(self._dates, np.datetime64(pd.Timestamp(end)), side='right'))
+        return lo, max(lo, hi)
+
+    def positions(self, start=None, end=None, **filters):
+        """Posições das séries no intervalo que atendem aos filtros (coluna=valor; None ignora).
+
+        Sem filtros devolve um `slice`; com filtros, um array ordenado.
+        """
+        lo, hi = self.bounds(start, end)
+        filters = {col: value for col, value in filters.items() if value is not None}
+        if not filters:
+            return slice(lo, hi)
+        codes = {}
+        for col, value in filters.items():
+            code = self._lookup[col].get(value)
+            if code is None:
+                return np.empty(0, dtype=np.intp)
+            codes[col] = code
+        # Parte da lista mais curta; as demais colunas são conferidas só nessas k posições
+        first = min(codes, key=lambda col: len(self._positions[col][codes[col]]))
+        pos = self._positions[first][codes[first]]
+        pos = pos[np.searchsorted(pos, lo):np.searchsorted(pos, hi)]
+        for col, code in codes.items():
+            if col != first:
+                pos = pos[self._codes[col][pos] == code]
+        return pos
+
+    @timed('query.select')
+    def select(self, start=None, end=None, **filters):
+        """Séries do intervalo que atendem aos filtros (vista sem cópia quando é uma fatia contínua)."""
+        return self.frame.iloc[self.positions(start, end, **filters)]
+
+    def values(self, col, start=None, end=None, **filters):
+        """Valores de `col` presentes na seleção, em ordem alfabética."""
+        return self.last_dates(col, start, end, **filters).index.tolist()
+
+    def last_dates(self, col, start=None, end=None, **filters):
+        """Data mais recente de cada valor de `col` na seleção (Series valor -> data, em ordem de valor)."""
+        pos = self.positions(start, end, **filters)
+        uniques = list(self._lookup[col])
+        if isinstance(pos, slice):
+            # Sem filtros: última posição de cada valor dentro do intervalo, por busca binária
+            found, last = [], []
+            for value, p in zip(uniques, self._positions[col]):
+                i = np.searchsorted(p, pos.stop) - 1
+                if i >= 0 and p[i] >= pos.start:
+                    found.append(value)
+                    last.append(p[i])
+        else:
+            codes = self._codes[col][pos]
+            keep = codes >= 0
+            codes, pos = codes[keep], pos[keep]
+            # Posições em ordem de data: a última ocorrência de cada código é a mais recente
+            code, idx = np.unique(codes[::-1], return_index=True)
+            found = [uniques[c] for c in code]
+            last = pos[::-1][idx]
+        out = pd.Series(self._dates[np.asarray(last, dtype=np.intp)], index=pd.Index(found, dtype=object, name=col), name='Date')
+        return out.sort_index()
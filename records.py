@@ -0,0 +1,194 @@
+"""Índice de recordes pessoais (PRs) por exercício.
+
+Três tipos de recorde, cada um com a data em que foi batido:
+- weight: maior peso por (exercício, nº de repetições)
+- 1rm: maior 1RM estimado do exercício
+- session_volume: maior volume do exercício num dia (soma das séries)
+
+Além deles, 'max_weight' guarda o maior peso do exercício em qualquer série
+(mesmo sem repetições), a métrica "Peso Máx." do cabeçalho; não aparece na
+linha do tempo de PRs.
+
+A linha do tempo guarda só os dias em que um recorde foi batido, com a marca
+anterior. É construída de uma vez: melhor marca de cada dia por grupo e um
+cummax agrupado (o dia é PR se supera o cummax dos dias anteriores). Depois
+de uma mesclagem, só os dias tocados são relidos e comparados com os
+recordes atuais; os recordes vigentes ficam num dict, consulta O(1).
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from data import estimate_1rm
+from perf import timed
+
+RECORD_KINDS = ('weight', '1rm', 'session_volume')
+# Tipos mantidos no índice: os PRs e o maior peso sem filtro de repetições
+INDEX_KINDS = RECORD_KINDS + ('max_weight',)
+# Incrementar quando o conteúdo do índice mudar, para reconstruir os persistidos
+RECORDS_FORMAT = 2
+RECORD_KEYS = ['Kind', 'Exercise', 'Reps']
+RECORD_COLUMNS = ['Date'] + RECORD_KEYS + ['Value', 'Previous']
+SOURCE_COLUMNS = ['Date', 'Exercise', 'Weight', 'Reps']
+
+class Record(NamedTuple):
+    value: float
+    date: pd.Timestamp
+
+def _empty_timeline():
+    return pd.DataFrame({
+        'Date': pd.Series(dtype='datetime64[ns]'), 'Kind': pd.Series(dtype=object),
+        'Exercise': pd.Series(dtype=object), 'Reps': pd.Series(dtype='int64'),
+        'Value': pd.Series(dtype=float), 'Previous': pd.Series(dtype=float),
+    })
+
+def daily_bests(sets):
+    """Melhor marca de cada (tipo, exercício, reps, dia); Reps = 0 nos tipos que não dependem delas."""
+    if sets.empty:
+        return _empty_timeline().drop(columns='Previous')
+    weight = pd.to_numeric(sets['Weight'], errors='coerce')
+    reps = pd.to_numeric(sets['Reps'], errors='coerce')
+    df = pd.DataFrame({
+        'Date': pd.to_datetime(sets['Date']).dt.normalize(),
+        'Exercise': sets['Exercise'].astype(object),
+        'Weight': weight,
+        'Reps': reps,
+        'Volume': weight * reps,
+        '1RM': estimate_1rm(sets),
+    })
+    # Mesma conta do max() sobre as séries brutas: qualquer peso preenchido
+    heaviest = df[df['Weight'].notna()].groupby(['Exercise', 'Date'], sort=False)['Weight'].max()
+    df = df[(df['Weight'] > 0) & (df['Reps'] > 0)]
+    parts = [
+        heaviest.reset_index().assign(Kind='max_weight', Reps=0),
+        df.groupby(['Exercise', 'Reps', 'Date'], sort=False)['Weight'].max().reset_index().assign(Kind='weight'),
+        df.groupby(['Exercise', 'Date'], sort=False)['1RM'].max().reset_index().assign(Kind='1rm', Reps=0),
+        df.groupby(['Exercise', 'Date'], sort=False)['Volume'].sum().reset_index().assign(Kind='session_volume', Reps=0),
+    ]
+    parts = [p.rename(columns={'Weight': 'Value', '1RM': 'Value', 'Volume': 'Value'}) for p in parts]
+    out = pd.concat(parts, ignore_index=True)
+    return out.astype({'Reps': 'int64', 'Value': float})[['Date'] + RECORD_KEYS + ['Value']]
+
+def _mark_records(bests):
+    """Dias que batem recorde: valor acima do cummax dos dias anteriores do mesmo grupo."""
+    bests = bests.sort_values(RECORD_KEYS + ['Date'], kind='stable', ignore_index=True)
+    running = bests.groupby(RECORD_KEYS, sort=False)['Value'].cummax()
+    previous = running.groupby([bests[k] for k in RECORD_KEYS], sort=False).shift()
+    is_record = previous.isna() | (bests['Value'] > previous)
+    return bests.assign(Previous=previous)[is_record][RECORD_COLUMNS]
+
+class RecordIndex:
+    """Linha do tempo de PRs e recordes vigentes por (tipo, exercício, reps)."""
+
+    def __init__(self, timeline):
+        self._set_timeline(timeline)
+
+    def _set_timeline(self, timeline):
+        self.timeline = timeline.sort_values('Date', kind='stable', ignore_index=True)
+        current = self.timeline.drop_duplicates(RECORD_KEYS, keep='last')
+        self._current = {
+            (k, e, r): Record(v, d)
+            for d, k, e, r, v in zip(current['Date'], current['Kind'], current['Exercise'], current['Reps'], current['Value'])
+        }
+        self._last_date = self.timeline.groupby('Exercise', sort=False)['Date'].max().to_dict()
+
+    @classmethod
+    @timed('records.build')
+    def from_sets(cls, sets):
+        return cls(_mark_records(daily_bests(sets)))
+
+    def __len__(self):
+        return len(self.timeline)
+
+    def record(self, exercise, kind='1rm', reps=None):
+        """Recorde vigente (valor, data) ou None. Em 'weight' sem `reps`, o maior peso de qualquer série."""
+        if kind == 'weight' and reps is None:
+            kind = 'max_weight'
+        return self._current.get((kind, exercise, 0 if reps is None else int(reps)))
+
+    def best(self, exercise, kind='1rm', reps=None):
+        """Valor do recorde vigente (NaN se não houver)."""
+        rec = self.record(exercise, kind, reps)
+        return np.nan if rec is None else rec.value
+
+    def rep_maxes(self, exercise):
+        """Maior peso por nº de repetições (Reps, Value, Date), em ordem de repetições."""
+        rows = [(reps, rec.value, rec.date) for (kind, ex, reps), rec in self._current.items()
+                if kind == 'weight' and ex == exercise]
+        return pd.DataFrame(sorted(rows), columns=['Reps', 'Value', 'Date'])
+
+    def history(self, exercise=None, start=None, end=None, kinds=RECORD_KINDS):
+        """PRs batidos no intervalo (datas inclusivas), do mais recente ao mais antigo."""
+        tl = self.timeline
+        dates = tl['Date'].to_numpy()
+        lo = 0 if start is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side='left')
+        hi = len(dates) if end is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), side='right')
+        out = tl.iloc[lo:hi]
+        if exercise is not None:
+            out = out[out['Exercise'] == exercise]
+        out = out[out['Kind'].isin(kinds)]
+        return out.iloc[::-1]
+
+    def update(self, sets):
+        """Incorpora as séries de dias posteriores ao último PR de cada exercício.
+
+        `sets` deve conter todas as séries armazenadas dos dias afetados. Cada
+        melhor marca diária é comparada com o recorde vigente do grupo (semeado
+        no mesmo cummax). Retorna False, sem alterar nada, se algum dia não é
+        posterior ao último PR do exercício: aí um PR já registrado pode ter
+        mudado e é preciso reconstruir.
+        """
+        bests = daily_bests(sets)
+        if bests.empty:
+            return True
+        last = bests['Exercise'].map(self._last_date).astype('datetime64[ns]')
+        if (bests['Date'] <= last).any():
+            return False
+        keys = set(zip(bests['Kind'], bests['Exercise'], bests['Reps']))
+        seeds = {key: self._current[key] for key in keys if key in self._current}
+        seed = pd.DataFrame([(rec.date, *key, rec.value) for key, rec in seeds.items()],
+                            columns=['Date'] + RECORD_KEYS + ['Value'])
+        marked = _mark_records(pd.concat([seed, bests], ignore_index=True))
+        # Os recordes vigentes entram só como ponto de partida do cummax
+        since = marked.join(seed.set_index(RECORD_KEYS)['Date'].rename('Since'), on=RECORD_KEYS)['Since']
+        fresh = marked[since.isna() | (marked['Date'] > since)]
+        if not fresh.empty:
+            self._set_timeline(pd.concat([self.timeline, fresh], ignore_index=True))
+        return True
+
+def _load_sets(store, start=None, end=None):
+    return store.load(columns=SOURCE_COLUMNS, start=start, end=end)
+
+@timed('records.load_records')
+def load_records(store):
+    """Abre o índice persistido; reconstrói a partir da base se estiver desatualizado."""
+    timeline, version = store.load_table('records')
+    if timeline is not None and version == _version(store.version()):
+        return RecordIndex(timeline)
+    records = RecordIndex.from_sets(_load_sets(store))
+    store.save_table('records', records.timeline, _version(store.version()))
+    return records
+
+def _version(store_version):
+    return f"{store_version}/{RECORDS_FORMAT}"
+
+@timed('records.update_records')
+def update_records(store, rows, base_version):
+    """Atualiza o índice persistido após uma mesclagem (mesmo contrato de rollups.update_rollups).
+
+    Só os dias em `rows` são relidos; se algum deles não é posterior ao último
+    PR do grupo (importação de treinos antigos), o índice é reconstruído.
+    """
+    with store.lock:
+        timeline, version = store.load_table('records')
+        if timeline is None or version != _version(base_version):
+            return load_records(store)
+        records = RecordIndex(timeline)
+        if rows is not None and not rows.empty:
+            days = pd.to_datetime(rows['Date']).unique()
+            sets = _load_sets(store, start=days.min(), end=days.max())
+            if not records.update(sets[sets['Date'].isin(days)]):
+                records = RecordIndex.from_sets(_load_sets(store))
+        store.save_table('records', records.timeline, _version(store.version()))
+        return records
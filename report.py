@@ -0,0 +1,175 @@
+"""Relatórios em lote, sem Streamlit.
+
+Gera, para cada base (atleta, arquivo exportado ou base padrão), as mesmas
+análises do dashboard: métricas básicas, estatísticas por exercício, alertas
+de platô/queda de volume, carga de treino atual (ACWR e fitness-fadiga por
+grupo muscular), sessões (duração, descanso e densidade) e previsões de 1RM
+de todos os exercícios. Saídas
+em JSON, HTML e Parquet, uma pasta por base.
+
+Uso:
+    python -m report --all-athletes --out reports --workers 8
+    python -m report --athlete "Ana" --input export.eml --format json html
+"""
+import argparse
+import html
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from data import enrich_sets, load_data, read_gymrun_csv
+from forecasting import ForecastCache, forecast_all, forecast_ranking
+from mappings import load_muscle_groups
+from metrics import alerts_report, calculate_basic_metrics, calculate_exercise_stats
+from rollups import RollupCube, load_rollups
+from sessions import session_table
+from storage import athlete_slug, get_store, list_athletes
+from training_load import latest, training_load
+
+logger = logging.getLogger('report')
+
+FORMATS = ('json', 'html', 'parquet')
+
+def _dataset_name(kind, source):
+    if kind == 'athlete':
+        return athlete_slug(source)
+    if kind == 'file':
+        return athlete_slug(os.path.splitext(os.path.basename(source))[0])
+    return 'default'
+
+def _load(kind, source, storage):
+    """Séries já tipadas e o cubo de rollups de uma base."""
+    if kind == 'file':
+        df = read_gymrun_csv(source)
+        return df, None
+    athlete = source if kind == 'athlete' else None
+    store = get_store(storage, athlete=athlete)
+    return load_data(store.version(), athlete), store
+
+def _records(frame):
+    return json.loads(frame.to_json(orient='records', date_format='iso', force_ascii=False))
+
+def _write_html(path, title, metrics, tables):
+    parts = [f"<h1>{html.escape(title)}</h1>", "<ul>"]
+    parts += [f"<li><b>{html.escape(k)}</b>: {html.escape(str(v))}</li>" for k, v in metrics.items()]
+    parts.append("</ul>")
+    for name, frame in tables.items():
+        parts.append(f"<h2>{html.escape(name)}</h2>")
+        parts.append(frame.to_html(index=False, float_format=lambda x: f"{x:.2f}", na_rep='', border=0))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("<!doctype html><meta charset='utf-8'><title>" + html.escape(title) + "</title>\n")
+        f.write("\n".join(parts))
+
+def build_report(kind, source, out_dir, formats=FORMATS, horizon=6, storage=None):
+    """Gera o relatório de uma base e retorna um resumo (usado como tarefa do pool)."""
+    name = _dataset_name(kind, source)
+    started = time.perf_counter()
+    df, store = _load(kind, source, storage)
+    target = os.path.join(out_dir, name)
+    os.makedirs(target, exist_ok=True)
+    if df.empty:
+        return {'dataset': name, 'rows': 0, 'files': [], 'seconds': time.perf_counter() - started}
+
+    df = enrich_sets(df, load_muscle_groups(store) if store is not None else ())
+
+    cube = load_rollups(store) if store is not None else RollupCube.from_sets(df)
+    metrics = calculate_basic_metrics(df)
+    metrics = {k: (v.item() if hasattr(v, 'item') else v) for k, v in metrics.items()}
+    stats = calculate_exercise_stats(df).sort_values('Volume', ascending=False)
+    alerts = alerts_report(cube.weekly)
+    # Séries enriquecidas já têm Volume e MuscleGroup: a carga sai direto delas
+    load = latest(training_load(df)).reset_index()
+    sessions = session_table(df)
+    # Um processo por base: as previsões rodam em série dentro dele, com cache próprio da base
+    cache = ForecastCache(os.path.join(target, '.forecast_cache'))
+    forecasts = forecast_all(df, horizon=horizon, workers=1, cache=cache)
+    ranking = forecast_ranking(forecasts)
+
+    tables = {
+        'exercise_stats': stats,
+        'alerts': alerts,
+        'training_load': load,
+        'sessions': sessions,
+        'forecast_ranking': ranking,
+        'forecasts': forecasts,
+    }
+    files = []
+    if 'json' in formats:
+        path = os.path.join(target, 'report.json')
+        payload = {'dataset': name, 'generated_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+                   'metrics': metrics, **{k: _records(v) for k, v in tables.items()}}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        files.append(path)
+    if 'html' in formats:
+        path = os.path.join(target, 'report.html')
+        _write_html(path, f"Relatório GymRun — {name}", metrics, {
+            'Exercícios': stats,
+            'Alertas': alerts[alerts['Plateau'] | alerts['VolumeDrop']],
+            'Carga de treino atual': load,
+            'Ranking de progressão prevista': ranking,
+        })
+        files.append(path)
+    if 'parquet' in formats:
+        try:
+            for key, frame in tables.items():
+                path = os.path.join(target, f'{key}.parquet')
+                frame.to_parquet(path, index=False)
+                files.append(path)
+        except ImportError as e:
+            logger.warning("Parquet ignorado para %s: %s", name, e)
+    return {'dataset': name, 'rows': int(len(df)), 'files': files, 'seconds': time.perf_counter() - started}
+
+def _datasets(args):
+    specs = [('athlete', a) for a in args.athlete]
+    if args.all_athletes:
+        specs += [('athlete', a) for a in list_athletes() if ('athlete', a) not in specs]
+    specs += [('file', p) for p in args.input]
+    return specs or [('default', None)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m report', description=__doc__.splitlines()[0])
+    parser.add_argument('--athlete', action='append', default=[], help="Atleta (pode repetir)")
+    parser.add_argument('--all-athletes', action='store_true', help="Todos os atletas com partição criada")
+    parser.add_argument('--input', action='append', default=[], help="Arquivo exportado (.csv/.eml; pode repetir)")
+    parser.add_argument('--out', default='reports', help="Pasta de saída (padrão: reports)")
+    parser.add_argument('--format', nargs='+', choices=FORMATS, default=list(FORMATS))
+    parser.add_argument('--horizon', type=int, default=6, help="Semanas de previsão de 1RM")
+    parser.add_argument('--storage', choices=['csv', 'sqlite', 'parquet'], default=None,
+                        help="Backend de armazenamento (padrão: GYMRUN_STORAGE)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Processos em paralelo")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    specs = _datasets(args)
+    failed = 0
+    task_args = dict(out_dir=args.out, formats=args.format, horizon=args.horizon, storage=args.storage)
+    if args.workers <= 1 or len(specs) == 1:
+        results = []
+        for kind, source in specs:
+            try:
+                results.append(build_report(kind, source, **task_args))
+            except Exception:
+                logger.exception("Falha no relatório de %s", source or 'default')
+                failed += 1
+    else:
+        results = []
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {pool.submit(build_report, kind, source, **task_args): source for kind, source in specs}
+            for fut in as_completed(futures):
+                try:
+                    results.append(fut.result())
+                except Exception:
+                    logger.exception("Falha no relatório de %s", futures[fut] or 'default')
+                    failed += 1
+    for r in sorted(results, key=lambda r: r['dataset']):
+        logger.info("%s: %d séries, %d arquivos em %.1fs", r['dataset'], r['rows'], len(r['files']), r['seconds'])
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
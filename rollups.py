@@ -0,0 +1,202 @@
+"""Rollups pré-calculados da base de treinos.
+
+Duas tabelas materializadas, mantidas a cada mesclagem:
+- diária: (Exercise, Routine, Date)
+- semanal: (Exercise, Routine, Week), semana ISO (seg–dom) rotulada pelo
+  domingo, o mesmo rótulo de `resample('W')`
+
+Ambas com Volume (soma), MaxWeight, Max1RM, Sets (nº de séries) e Reps (soma).
+Gráficos, métricas e alertas leem daqui em vez de reagrupar as séries brutas.
+"""
+import numpy as np
+import pandas as pd
+
+from data import estimate_1rm
+from perf import timed
+
+ROLLUP_KEYS = ['Exercise', 'Routine']
+ROLLUP_COLUMNS = ['Volume', 'MaxWeight', 'Max1RM', 'Sets', 'Reps']
+SOURCE_COLUMNS = ['Date', 'Exercise', 'Routine', 'Weight', 'Reps']
+
+_AGG = {'Volume': 'sum', 'MaxWeight': 'max', 'Max1RM': 'max', 'Sets': 'sum', 'Reps': 'sum'}
+
+def _week_label(dates):
+    """Domingo que fecha a semana ISO de cada data (rótulo de resample('W'))."""
+    dates = pd.to_datetime(dates)
+    return (dates + pd.to_timedelta(6 - dates.dt.dayofweek, unit='D')).dt.normalize()
+
+def build_daily_rollup(df):
+    """Agrega séries brutas por (Exercise, Routine, Date)."""
+    if df.empty:
+        return pd.DataFrame(columns=['Date'] + ROLLUP_KEYS + ROLLUP_COLUMNS)
+    sets = pd.DataFrame({
+        'Date': df['Date'],
+        'Exercise': df['Exercise'],
+        'Routine': df['Routine'].astype(object).where(df['Routine'].notna(), '') if 'Routine' in df.columns else '',
+        'Volume': df['Volume'] if 'Volume' in df.columns else df['Weight'] * df['Reps'],
+        'MaxWeight': df['Weight'],
+        'Max1RM': df['Estimated_1RM'] if 'Estimated_1RM' in df.columns else estimate_1rm(df),
+        'Sets': 1,
+        'Reps': df['Reps'],
+    })
+    sets['Exercise'] = sets['Exercise'].astype('category')
+    sets['Routine'] = sets['Routine'].astype('category')
+    daily = sets.groupby(['Date'] + ROLLUP_KEYS, observed=True, sort=True).agg(_AGG).reset_index()
+    return daily.astype({'Sets': 'int64'})
+
+def weekly_from_daily(daily):
+    """Agrega o rollup diário por semana ISO."""
+    if daily.empty:
+        return pd.DataFrame(columns=['Week'] + ROLLUP_KEYS + ROLLUP_COLUMNS)
+    wk = daily.assign(Week=_week_label(daily['Date']))
+    return wk.groupby(['Week'] + ROLLUP_KEYS, observed=True, sort=True).agg(_AGG).reset_index()
+
+class RollupCube:
+    """Rollups diário e semanal com fatias por data, rotina e exercício."""
+
+    def __init__(self, daily, weekly=None):
+        self.daily = daily.sort_values('Date', kind='stable').reset_index(drop=True)
+        self.weekly = weekly_from_daily(self.daily) if weekly is None else weekly.sort_values('Week', kind='stable').reset_index(drop=True)
+
+    @classmethod
+    def from_sets(cls, df):
+        return cls(build_daily_rollup(df))
+
+    @property
+    def empty(self):
+        return self.daily.empty
+
+    @staticmethod
+    def _slice(table, col, start, end, routine, exercise):
+        if table.empty:
+            return table
+        dates = table[col].to_numpy()
+        lo = 0 if start is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side='left')
+        hi = len(dates) if end is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), side='right')
+        out = table.iloc[lo:hi]
+        if routine is not None:
+            out = out[out['Routine'] == routine]
+        if exercise is not None:
+            out = out[out['Exercise'] == exercise]
+        return out
+
+    def daily_slice(self, start=None, end=None, routine=None, exercise=None):
+        """Linhas do rollup diário no intervalo [start, end] (datas inclusivas)."""
+        return self._slice(self.daily, 'Date', start, end, routine, exercise)
+
+    def weekly_slice(self, start=None, end=None, routine=None, exercise=None):
+        """Semanas de [start, end] (datas inclusivas), contando só os dias do intervalo.
+
+        As semanas inteiras vêm prontas do rollup semanal; as das pontas,
+        cortadas pelo intervalo, são refeitas a partir dos dias de dentro.
+        """
+        start = None if start is None else pd.Timestamp(start).normalize()
+        end = None if end is None else pd.Timestamp(end).normalize()
+        first = None if start is None else _week_label(pd.Series([start]))[0]
+        last = None if end is None else _week_label(pd.Series([end]))[0]
+        week = pd.Timedelta(days=7)
+        inner_lo, inner_hi, edges = first, last, []
+        cut_start = start is not None and start.dayofweek != 0
+        if cut_start:
+            edges.append(self.daily_slice(start, first if end is None else min(first, end), routine, exercise))
+            inner_lo = first + week
+        if end is not None and end.dayofweek != 6:
+            inner_hi = last - week
+            # Início e fim na mesma semana: a ponta inicial já cobriu os dias
+            if not (cut_start and first == last):
+                monday = last - pd.Timedelta(days=6)
+                edges.append(self.daily_slice(monday if start is None else max(monday, start), end, routine, exercise))
+        if inner_lo is not None and inner_hi is not None and inner_lo > inner_hi:
+            inner = self.weekly.iloc[:0]
+        else:
+            inner = self._slice(self.weekly, 'Week', inner_lo, inner_hi, routine, exercise)
+        edges = [e for e in edges if not e.empty]
+        if not edges:
+            return inner
+        parts = [weekly_from_daily(pd.concat(edges, ignore_index=True))]
+        if not inner.empty:
+            parts.append(inner)
+        out = pd.concat(parts, ignore_index=True)
+        for col in ROLLUP_KEYS:
+            if not isinstance(out[col].dtype, pd.CategoricalDtype):
+                out[col] = out[col].astype('category')
+        return out.sort_values('Week', kind='stable', ignore_index=True)
+
+    def exercise_daily(self, exercise, start=None, end=None, routine=None):
+        """Série diária de um exercício (rotinas somadas), indexada por Date."""
+        part = self.daily_slice(start, end, routine, exercise)
+        return part.groupby('Date').agg(_AGG)
+
+    def exercise_weekly(self, exercise, start=None, end=None, routine=None):
+        """Série semanal de um exercício (rotinas somadas), indexada por Week."""
+        part = self.weekly_slice(start, end, routine, exercise)
+        return part.groupby('Week').agg(_AGG)
+
+    def update(self, sets):
+        """Recalcula os dias (e semanas) cobertos por `sets` a partir dessas séries.
+
+        `sets` deve conter todas as séries armazenadas dos dias afetados.
+        """
+        if sets.empty:
+            return self
+        days = pd.to_datetime(sets['Date']).unique()
+        fresh = build_daily_rollup(sets)
+        keep = self.daily[~self.daily['Date'].isin(days)]
+        daily = pd.concat([keep, fresh], ignore_index=True)
+        for col in ROLLUP_KEYS:
+            daily[col] = daily[col].astype(object).astype('category')
+        self.daily = daily.sort_values('Date', kind='stable').reset_index(drop=True)
+
+        weeks = _week_label(pd.Series(days)).unique()
+        touched = self.daily[_week_label(self.daily['Date']).isin(weeks)]
+        keep_w = self.weekly[~self.weekly['Week'].isin(weeks)]
+        weekly = pd.concat([keep_w, weekly_from_daily(touched)], ignore_index=True)
+        for col in ROLLUP_KEYS:
+            weekly[col] = weekly[col].astype(object).astype('category')
+        self.weekly = weekly.sort_values('Week', kind='stable').reset_index(drop=True)
+        return self
+
+def _load_sets(store, start=None, end=None):
+    df = store.load(columns=SOURCE_COLUMNS, start=start, end=end)
+    for col in ['Weight', 'Reps']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+@timed('rollups.load_rollups')
+def load_rollups(store):
+    """Abre os rollups persistidos; reconstrói a partir da base se estiverem desatualizados."""
+    version = str(store.version())
+    daily, daily_version = store.load_table('rollup_daily')
+    weekly, weekly_version = store.load_table('rollup_weekly')
+    if daily is not None and weekly is not None and daily_version == weekly_version == version:
+        return RollupCube(daily, weekly)
+    cube = RollupCube.from_sets(_load_sets(store))
+    save_rollups(store, cube)
+    return cube
+
+def save_rollups(store, cube):
+    version = store.version()
+    store.save_table('rollup_daily', cube.daily, version)
+    store.save_table('rollup_weekly', cube.weekly, version)
+
+@timed('rollups.update_rollups')
+def update_rollups(store, rows, base_version):
+    """Atualiza os rollups persistidos após uma mesclagem.
+
+    Só os dias presentes em `rows` (linhas inseridas/alteradas) são relidos da
+    base e reagregados; o restante do histórico não é tocado. `base_version` é
+    a versão da base antes da mesclagem: se os rollups salvos não correspondem
+    a ela, são reconstruídos do zero.
+    """
+    with store.lock:
+        daily, daily_version = store.load_table('rollup_daily')
+        weekly, weekly_version = store.load_table('rollup_weekly')
+        if daily is None or weekly is None or not daily_version == weekly_version == str(base_version):
+            return load_rollups(store)
+        cube = RollupCube(daily, weekly)
+        if rows is not None and not rows.empty:
+            days = pd.to_datetime(rows['Date']).unique()
+            sets = _load_sets(store, start=days.min(), end=days.max())
+            cube.update(sets[sets['Date'].isin(days)])
+        save_rollups(store, cube)
+        return cube
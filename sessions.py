@@ -0,0 +1,82 @@
+"""Sessões de treino reconstruídas pelos horários das séries.
+
+Uma sessão é uma sequência de séries sem pausa maior que SESSION_GAP_MINUTES
+entre uma e a próxima (em ordem de DateTime): dois treinos no mesmo dia viram
+duas sessões e um treino que passa da meia-noite continua sendo um só. Tudo
+sai de ordenações e de um `diff`, sem loop por série:
+
+- SessionId: número da sessão, em ordem cronológica
+- RestSeconds: intervalo desde a série anterior do mesmo exercício na mesma
+  sessão (o GymRun registra o fim de cada série, então inclui a execução);
+  vazio na primeira série
+- session_table: início, fim, duração, volume, densidade (kg/min) e descanso
+  mediano de cada sessão
+
+Séries sem horário contam como o início do dia.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from perf import timed
+
+# Pausa (em minutos) a partir da qual a próxima série abre outra sessão
+SESSION_GAP_MINUTES = float(os.environ.get('GYMRUN_SESSION_GAP_MIN', 90))
+
+SESSION_COLUMNS = ['SessionId', 'Date', 'Start', 'End', 'Routine', 'Sets', 'Exercises',
+                   'Volume', 'DurationMin', 'Density', 'RestMedian']
+
+def _timestamps(df):
+    """Horário de cada série em ns (int64); sem DateTime (ou sem horário), a data."""
+    day = df['Date'].to_numpy().astype('datetime64[ns]')
+    if 'DateTime' not in df.columns:
+        return day.view('int64')
+    t = df['DateTime'].to_numpy().astype('datetime64[ns]')
+    return np.where(np.isnat(t), day, t).view('int64')
+
+@timed('sessions.sessionize')
+def sessionize(df, gap_minutes=SESSION_GAP_MINUTES):
+    """(SessionId, RestSeconds) de cada série, alinhados às linhas de `df`."""
+    n = len(df)
+    t = _timestamps(df)
+    order = np.argsort(t, kind='stable')
+    ts = t[order]
+    new = np.ones(n, dtype=bool)
+    new[1:] = np.diff(ts) > int(gap_minutes * 60e9)
+    session = np.empty(n, dtype=np.int32)
+    session[order] = np.cumsum(new) - 1
+
+    # Em ordem de horário, uma ordenação estável por (sessão, exercício) deixa as
+    # séries de cada exercício da sessão seguidas: o descanso é o diff dentro do grupo
+    codes, uniques = pd.factorize(df['Exercise'])
+    group = session[order].astype(np.int64) * (len(uniques) + 1) + (codes[order] + 1)
+    idx = np.argsort(group, kind='stable')
+    by_group, grouped = order[idx], group[idx]
+    rest = np.full(n, np.nan)
+    same = grouped[1:] == grouped[:-1]
+    gaps = np.diff(t[by_group]) / 1e9
+    rest[by_group[1:]] = np.where(same, gaps, np.nan)
+    return session, rest
+
+@timed('sessions.session_table')
+def session_table(df):
+    """Uma linha por sessão (SESSION_COLUMNS) a partir das séries enriquecidas (com SessionId e RestSeconds)."""
+    if df.empty or 'SessionId' not in df.columns:
+        return pd.DataFrame(columns=SESSION_COLUMNS)
+    when = pd.Series(_timestamps(df).view('datetime64[ns]'), index=df.index)
+    parts = pd.DataFrame({
+        'SessionId': df['SessionId'], 'When': when, 'Routine': df['Routine'].astype(object),
+        'Exercise': df['Exercise'], 'Volume': df['Volume'], 'RestSeconds': df['RestSeconds'],
+    })
+    table = parts.groupby('SessionId', sort=True).agg(
+        Start=('When', 'min'), End=('When', 'max'), Routine=('Routine', 'first'),
+        Sets=('When', 'size'), Exercises=('Exercise', 'nunique'),
+        Volume=('Volume', 'sum'), RestMedian=('RestSeconds', 'median'),
+    ).reset_index()
+    # Do fim da primeira série ao fim da última; sessão de uma série só não tem duração
+    duration = (table['End'] - table['Start']).dt.total_seconds() / 60
+    table['DurationMin'] = duration
+    table['Density'] = table['Volume'] / duration.where(duration > 0)
+    table['Date'] = table['Start'].dt.normalize()
+    return table[SESSION_COLUMNS]
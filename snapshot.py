@@ -0,0 +1,124 @@
+"""Snapshot Arrow das séries enriquecidas, aberto por memory map.
+
+Depois de cada mesclagem as séries enriquecidas são gravadas num arquivo
+Arrow IPC (Feather v2) ao lado da base, com a versão da base nos metadados.
+Os processos do Streamlit abrem o arquivo com `mmap`: colunas numéricas, de
+datas e códigos categóricos viram arrays numpy somente leitura apontando
+direto para as páginas do arquivo, e o texto fica em arrays Arrow. Várias
+réplicas no mesmo host dividem as mesmas páginas (cache de páginas do
+sistema), em vez de cada uma guardar sua cópia parseada e enriquecida.
+
+Para isso os floats são gravados com NaN (sem bitmap de nulos) e o arquivo
+tem um único lote. Requer `pyarrow`; sem ele, ou com GYMRUN_SNAPSHOT=0, o
+app segue carregando e enriquecendo a base como antes.
+"""
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from perf import timed
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_NAME = 'snapshot.arrow'
+ENABLED = os.environ.get('GYMRUN_SNAPSHOT', '1') != '0'
+# Chave da versão da base nos metadados do esquema
+VERSION_KEY = b'gymrun_version'
+
+def available():
+    """Snapshot ligado e pyarrow instalado."""
+    if not ENABLED:
+        return False
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def snapshot_path(store):
+    return store.sidecar_path(SNAPSHOT_NAME)
+
+def _to_arrow(df):
+    import pyarrow as pa
+
+    arrays, fields = [], []
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            codes = s.cat.codes.to_numpy()
+            arr = pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0),
+                                                 pa.array(s.cat.categories.to_numpy(dtype=object)),
+                                                 ordered=s.cat.ordered)
+        elif isinstance(s.dtype, np.dtype) and s.dtype.kind in 'biufmM':
+            # Sem `from_pandas`: NaN continua NaN e a coluna volta sem cópia
+            arr = pa.array(s.to_numpy())
+        else:
+            arr = pa.array(s, from_pandas=True)
+        arrays.append(arr)
+        fields.append(pa.field(col, arr.type))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+def _column(chunked):
+    """Coluna do snapshot como array do pandas, sem cópia sempre que possível."""
+    import pyarrow as pa
+
+    arr = chunked.combine_chunks() if chunked.num_chunks != 1 else chunked.chunk(0)
+    if pa.types.is_dictionary(arr.type):
+        indices = arr.indices
+        if indices.null_count:
+            codes = indices.fill_null(-1).to_numpy()
+        else:
+            codes = indices.to_numpy(zero_copy_only=True)
+        dtype = pd.CategoricalDtype(pd.Index(arr.dictionary.to_pylist()), ordered=arr.type.ordered)
+        return pd.Categorical.from_codes(codes, dtype=dtype)
+    t = arr.type
+    if arr.null_count == 0 and (pa.types.is_integer(t) or pa.types.is_floating(t)
+                                or pa.types.is_timestamp(t) or pa.types.is_duration(t)):
+        return arr.to_numpy(zero_copy_only=True)
+    return pd.array(arr.to_pandas())
+
+@timed('snapshot.write')
+def write_snapshot(store, sets, version):
+    """Grava as séries enriquecidas com a versão da base (temporário + rename)."""
+    import pyarrow as pa
+
+    from data import temp_path
+
+    table = _to_arrow(sets)
+    table = table.replace_schema_metadata({VERSION_KEY: str(version).encode()})
+    path = snapshot_path(store)
+    tmp = temp_path(path)
+    with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=max(len(table), 1))
+    try:
+        os.replace(tmp, path)
+    except OSError as e:
+        # Windows não troca um arquivo mapeado por outro processo: fica o anterior (desatualizado)
+        logger.warning("Snapshot não substituído (%s): %s", path, e)
+        os.remove(tmp)
+
+def remove_snapshot(store):
+    try:
+        os.remove(snapshot_path(store))
+    except OSError:
+        pass
+
+@timed('snapshot.open')
+def open_snapshot(store):
+    """(DataFrame, versão) do snapshot mapeado em memória, ou (None, None) se não houver."""
+    import pyarrow as pa
+
+    path = snapshot_path(store)
+    if not os.path.exists(path):
+        return None, None
+    try:
+        # Os buffers mantêm o mapeamento vivo enquanto o DataFrame existir
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    except (OSError, pa.ArrowInvalid) as e:
+        logger.warning("Snapshot ilegível (%s): %s", path, e)
+        return None, None
+    version = (table.schema.metadata or {}).get(VERSION_KEY)
+    frame = pd.DataFrame({name: _column(table.column(name)) for name in table.column_names}, copy=False)
+    return frame, None if version is None else version.decode()
@@ -0,0 +1,568 @@
+"""Camada de armazenamento da base de treinos.
+
+Três backends com a mesma interface:
+- CsvStorage: o arquivo `gymrun_database.csv` de sempre (compatibilidade).
+- SqliteStorage: tabela única indexada por (Date, Exercise, Routine).
+- ParquetStorage: arquivos Parquet particionados por mês (requer pyarrow).
+
+Todos aceitam inserções só de novas linhas (`append`) e leituras restritas a
+colunas e intervalos de datas (`load`). O CSV continua disponível como formato
+de importação/exportação (`import_csv` / `export_csv`).
+
+Cada atleta tem a sua partição (pasta própria em GYMRUN_DATA_DIR). Escritas
+numa partição passam por uma trava de arquivo (`store.lock`) e arquivos são
+gravados em um temporário e renomeados, então sessões simultâneas não se
+atropelam e leitores nunca veem um arquivo pela metade.
+"""
+import functools
+import os
+import re
+import shutil
+from contextlib import contextmanager
+import sqlite3
+import threading
+import time
+import unicodedata
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+import pandas as pd
+
+
+from data import LOCAL_CANDIDATES, MERGE_KEY, read_gymrun_csv, save_dataset, set_key_hashes, temp_path
+
+# Colunas do CSV exportado pelo GymRun, na ordem original
+GYMRUN_COLUMNS = [
+    'Date', 'Time', 'Routine', 'Exercise', 'Set', 'Weight', 'Reps', 'Duration', 'Distance',
+    'Para6', 'Para7', 'Para8', 'Para9', 'Para10', 'Note', 'Type', 'Book', 'Version1',
+]
+TEXT_COLUMNS = ['Time', 'Routine', 'Exercise', 'Note']
+INDEX_COLUMNS = ['Date', 'Exercise', 'Routine']
+
+DEFAULT_PATHS = {
+    'csv': 'gymrun_database.csv',
+    'sqlite': 'gymrun_database.sqlite',
+    'parquet': 'gymrun_parquet',
+}
+
+# Pasta com uma partição por atleta; sem atleta, usa os caminhos padrão acima
+DATA_DIR = os.environ.get('GYMRUN_DATA_DIR', 'athletes')
+
+def _lock_file(fp):
+    if fcntl is not None:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+        return
+    fp.seek(0)
+    while True:
+        try:
+            msvcrt.locking(fp.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+def _unlock_file(fp):
+    if fcntl is not None:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+    else:
+        fp.seek(0)
+        msvcrt.locking(fp.fileno(), msvcrt.LK_UNLCK, 1)
+
+class FileLock:
+    """Trava exclusiva entre processos (flock) e entre threads, reentrante na mesma thread.
+
+    Uma mesclagem inteira (índice, séries e rollups) pode rodar dentro de
+    `with store.lock:`, e cada escrita do backend também trava por conta própria.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fp = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                fp = open(self.path, 'a+b')
+                _lock_file(fp)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fp = fp
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            _unlock_file(self._fp)
+            self._fp.close()
+            self._fp = None
+        self._thread_lock.release()
+
+def _locked(method):
+    """Executa um método de escrita do backend com a trava da partição."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def athlete_slug(name):
+    """Nome de pasta para um atleta: sem acentos, minúsculo, só [a-z0-9-]."""
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    slug = re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+    if not slug:
+        raise ValueError(f"Nome de atleta inválido: {name!r}")
+    return slug
+
+def list_athletes():
+    """Atletas com partição criada em DATA_DIR."""
+    if not os.path.isdir(DATA_DIR):
+        return []
+    return sorted(d for d in os.listdir(DATA_DIR) if os.path.isdir(os.path.join(DATA_DIR, d)))
+
+def _normalize(df):
+    """Alinha um DataFrame ao esquema armazenado (colunas GymRun, sem DateTime)."""
+    out = df.reindex(columns=GYMRUN_COLUMNS)
+    if not pd.api.types.is_datetime64_any_dtype(out['Date']):
+        out['Date'] = pd.to_datetime(out['Date'], format='%d.%m.%Y')
+    out['Date'] = out['Date'].astype('datetime64[ns]')
+    for col in GYMRUN_COLUMNS[1:]:
+        if col in TEXT_COLUMNS:
+            out[col] = out[col].astype(object).where(out[col].notna(), None)
+        else:
+            out[col] = pd.to_numeric(out[col], errors='coerce').astype(float)
+    return out
+
+def _select(df, columns=None, start=None, end=None):
+    """Aplica filtro de colunas/datas em memória (backends sem pushdown)."""
+    if start is not None:
+        df = df[df['Date'] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df['Date'] <= pd.Timestamp(end)]
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df.reset_index(drop=True)
+
+class StorageBackend:
+    """Interface comum dos backends de armazenamento."""
+
+    kind = 'base'
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = None
+
+    @property
+    def lock(self):
+        """Trava exclusiva da partição (ver FileLock)."""
+        if self._lock is None:
+            self._lock = FileLock(self.sidecar_path('lock'))
+        return self._lock
+
+    def load(self, columns=None, start=None, end=None):
+        """Lê as séries (opcionalmente só algumas colunas e um intervalo de datas)."""
+        raise NotImplementedError
+
+    def append(self, df):
+        """Insere novas linhas sem reescrever o histórico; retorna quantas entraram."""
+        raise NotImplementedError
+
+    def write(self, df):
+        """Substitui todo o conteúdo armazenado (reset/importação inicial)."""
+        raise NotImplementedError
+
+    def delete_keys(self, df):
+        """Remove as séries armazenadas com a mesma chave lógica (MERGE_KEY) das linhas de df."""
+        raise NotImplementedError
+
+    def sidecar_path(self, name):
+        """Caminho de um arquivo auxiliar (índices, tabelas derivadas) ao lado da base."""
+        return f"{self.path}.{name}"
+
+    @property
+    def key_index_path(self):
+        """Arquivo do índice persistente de chaves (ver data.SetKeyIndex)."""
+        return self.sidecar_path('keys.npz')
+
+    def save_table(self, name, df, version=None):
+        """Persiste uma tabela derivada (ex.: rollups) junto com a versão da base."""
+        path = self.sidecar_path(f'{name}.pkl')
+        tmp = temp_path(path)
+        pd.to_pickle({'version': None if version is None else str(version), 'data': df}, tmp)
+        os.replace(tmp, path)
+
+    def load_table(self, name):
+        """Lê uma tabela derivada; retorna (DataFrame, versão) ou (None, None)."""
+        path = self.sidecar_path(f'{name}.pkl')
+        if not os.path.exists(path):
+            return None, None
+        try:
+            payload = pd.read_pickle(path)
+        except Exception:
+            return None, None
+        return payload['data'], payload['version']
+
+    def version(self):
+        """Marca que muda a cada escrita; usada como chave de cache."""
+        raise NotImplementedError
+
+    def is_empty(self):
+        return self.load(columns=['Date']).empty
+
+    def import_csv(self, source):
+        """Importa um CSV GymRun substituindo o conteúdo atual."""
+        df = read_gymrun_csv(source)
+        self.write(df)
+        return len(df)
+
+    def export_csv(self, file_path):
+        """Exporta a base no formato CSV original do GymRun."""
+        save_dataset(self.load(), file_path)
+
+class CsvStorage(StorageBackend):
+    """Backend legado: um único CSV separado por ';'."""
+
+    kind = 'csv'
+
+    def load(self, columns=None, start=None, end=None):
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=GYMRUN_COLUMNS)
+        usecols = None
+        if columns is not None:
+            wanted = set(columns) | {'Date'}
+            usecols = lambda c: c in wanted
+        df = pd.read_csv(self.path, sep=';', encoding='utf-8', usecols=usecols)
+        if not df.empty:
+            df['Date'] = pd.to_datetime(df['Date'], format='%d.%m.%Y')
+        return _select(df, columns, start, end)
+
+    @_locked
+    def append(self, df):
+        if df.empty:
+            return 0
+        if not os.path.exists(self.path):
+            self.write(df)
+            return len(df)
+        out = _normalize(df)
+        header = pd.read_csv(self.path, sep=';', encoding='utf-8', nrows=0).columns
+        out = out.reindex(columns=header)
+        out['Date'] = pd.to_datetime(out['Date']).dt.strftime('%d.%m.%Y')
+        # Monta o trecho inteiro antes e grava numa única escrita no fim do arquivo
+        chunk = out.to_csv(sep=';', index=False, header=False)
+        with open(self.path, 'a', encoding='utf-8', newline='') as f:
+            f.write(chunk)
+        return len(out)
+
+    @_locked
+    def write(self, df):
+        save_dataset(df, self.path)
+
+    @_locked
+    def delete_keys(self, df):
+        # O CSV não tem acesso por chave: reescreve o arquivo (backend legado)
+        current = self.load()
+        keep = ~np.isin(set_key_hashes(current), set_key_hashes(df))
+        self.write(current[keep])
+
+    def version(self):
+        try:
+            st_ = os.stat(self.path)
+        except FileNotFoundError:
+            return 'missing'
+        return f"{st_.st_mtime_ns}-{st_.st_size}"
+
+class SqliteStorage(StorageBackend):
+    """Backend SQLite: tabela `sets` com índices por data, exercício e rotina."""
+
+    kind = 'sqlite'
+
+    _TYPES = {'Date': 'TEXT', 'Set': 'INTEGER', 'Type': 'INTEGER', 'Book': 'INTEGER', 'Version1': 'INTEGER'}
+
+    def __init__(self, path):
+        super().__init__(path)
+        with self._connect() as con:
+            cols = ', '.join(f'"{c}" {self._TYPES.get(c, "TEXT" if c in TEXT_COLUMNS else "REAL")}' for c in GYMRUN_COLUMNS)
+            con.execute(f'CREATE TABLE IF NOT EXISTS sets ({cols})')
+            con.execute('CREATE INDEX IF NOT EXISTS idx_sets_date_exercise_routine ON sets ("Date", "Exercise", "Routine")')
+            con.execute('CREATE INDEX IF NOT EXISTS idx_sets_exercise_date ON sets ("Exercise", "Date")')
+            con.execute('CREATE INDEX IF NOT EXISTS idx_sets_routine_date ON sets ("Routine", "Date")')
+
+    @contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def load(self, columns=None, start=None, end=None):
+        cols = list(GYMRUN_COLUMNS) if columns is None else [c for c in columns if c in GYMRUN_COLUMNS]
+        if 'Date' not in cols:
+            cols = ['Date'] + cols
+        where, params = [], []
+        if start is not None:
+            where.append('"Date" >= ?')
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+        if end is not None:
+            where.append('"Date" <= ?')
+            params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+        sql = 'SELECT ' + ', '.join(f'"{c}"' for c in cols) + ' FROM sets'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY "Date", "Time", rowid'
+        with self._connect() as con:
+            df = pd.read_sql_query(sql, con, params=params)
+        df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d')
+        if columns is not None:
+            df = df[[c for c in columns if c in df.columns]]
+        return df
+
+    def _insert(self, con, df):
+        out = _normalize(df)
+        out['Date'] = out['Date'].dt.strftime('%Y-%m-%d')
+        out = out.astype(object).where(out.notna(), None)
+        placeholders = ', '.join('?' for _ in GYMRUN_COLUMNS)
+        con.executemany(
+            'INSERT INTO sets (' + ', '.join(f'"{c}"' for c in GYMRUN_COLUMNS) + f') VALUES ({placeholders})',
+            out.itertuples(index=False, name=None),
+        )
+        self._bump_version(con)
+        return len(out)
+
+    def _bump_version(self, con):
+        v = con.execute('PRAGMA user_version').fetchone()[0]
+        con.execute(f'PRAGMA user_version = {int(v) + 1}')
+
+    @_locked
+    def append(self, df):
+        if df.empty:
+            return 0
+        with self._connect() as con:
+            return self._insert(con, df)
+
+    @_locked
+    def write(self, df):
+        with self._connect() as con:
+            con.execute('DELETE FROM sets')
+            if df.empty:
+                self._bump_version(con)
+            else:
+                self._insert(con, df)
+
+    @_locked
+    def delete_keys(self, df):
+        if df.empty:
+            return
+        keys = df.reindex(columns=MERGE_KEY).copy()
+        keys['Date'] = pd.to_datetime(keys['Date']).dt.strftime('%Y-%m-%d')
+        keys = keys.astype(object).where(keys.notna(), None)
+        # IS compara NULL com NULL, como a deduplicação do pandas
+        cond = ' AND '.join(f'"{c}" IS ?' for c in MERGE_KEY)
+        with self._connect() as con:
+            con.executemany(f'DELETE FROM sets WHERE {cond}', keys.itertuples(index=False, name=None))
+            self._bump_version(con)
+
+    def version(self):
+        with self._connect() as con:
+            return con.execute('PRAGMA user_version').fetchone()[0]
+
+    def is_empty(self):
+        with self._connect() as con:
+            return con.execute('SELECT 1 FROM sets LIMIT 1').fetchone() is None
+
+class ParquetStorage(StorageBackend):
+    """Backend Parquet particionado por mês (`month=AAAA-MM/part-*.parquet`).
+
+    Cada `append` grava um novo arquivo por mês afetado, ordenado por
+    (Date, Exercise, Routine) para que as estatísticas dos row groups sirvam
+    de índice. Leituras usam pushdown de colunas e filtros de data.
+    """
+
+    kind = 'parquet'
+
+    def __init__(self, path):
+        super().__init__(path)
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError("O backend Parquet requer o pacote 'pyarrow' (pip install pyarrow).") from e
+        os.makedirs(self.path, exist_ok=True)
+
+    def _schema(self):
+        import pyarrow as pa
+        fields = []
+        for c in GYMRUN_COLUMNS:
+            if c == 'Date':
+                fields.append(pa.field(c, pa.timestamp('ns')))
+            elif c in TEXT_COLUMNS:
+                fields.append(pa.field(c, pa.string()))
+            else:
+                fields.append(pa.field(c, pa.float64()))
+        return pa.schema(fields)
+
+    def _part_files(self):
+        for root, _dirs, files in os.walk(self.path):
+            for f in files:
+                if f.endswith('.parquet'):
+                    yield os.path.join(root, f)
+
+    def load(self, columns=None, start=None, end=None):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        cols = list(GYMRUN_COLUMNS) if columns is None else [c for c in columns if c in GYMRUN_COLUMNS]
+        if next(self._part_files(), None) is None:
+            return pd.DataFrame(columns=cols)
+        dataset = ds.dataset(self.path, format='parquet', schema=self._schema().append(pa.field('month', pa.string())),
+                             partitioning='hive')
+        flt = None
+        if start is not None:
+            ts = pd.Timestamp(start)
+            cond = (ds.field('month') >= ts.strftime('%Y-%m')) & (ds.field('Date') >= pa.scalar(ts.to_pydatetime(), type=pa.timestamp('ns')))
+            flt = cond
+        if end is not None:
+            ts = pd.Timestamp(end)
+            cond = (ds.field('month') <= ts.strftime('%Y-%m')) & (ds.field('Date') <= pa.scalar(ts.to_pydatetime(), type=pa.timestamp('ns')))
+            flt = cond if flt is None else flt & cond
+        df = dataset.to_table(columns=cols, filter=flt).to_pandas()
+        sort_cols = [c for c in ['Date', 'Time'] if c in df.columns]
+        if sort_cols:
+            df = df.sort_values(sort_cols, kind='stable').reset_index(drop=True)
+        return df
+
+    def _write_part(self, part_dir, table):
+        """Grava um arquivo de partição com nome temporário (ignorado na leitura) e renomeia."""
+        import pyarrow.parquet as pq
+
+        final = os.path.join(part_dir, f'part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet')
+        tmp = temp_path(final)
+        pq.write_table(table, tmp)
+        os.replace(tmp, final)
+
+    @_locked
+    def append(self, df):
+        import pyarrow as pa
+
+        if df.empty:
+            return 0
+        out = _normalize(df).sort_values(INDEX_COLUMNS, kind='stable')
+        months = out['Date'].dt.strftime('%Y-%m')
+        schema = self._schema()
+        for month, part in out.groupby(months, sort=True):
+            part_dir = os.path.join(self.path, f'month={month}')
+            os.makedirs(part_dir, exist_ok=True)
+            self._write_part(part_dir, pa.Table.from_pandas(part, schema=schema, preserve_index=False))
+        self._bump_version()
+        return len(out)
+
+    @_locked
+    def write(self, df):
+        for entry in os.listdir(self.path):
+            full = os.path.join(self.path, entry)
+            if os.path.isdir(full) and entry.startswith('month='):
+                shutil.rmtree(full)
+        if df.empty:
+            self._bump_version()
+        else:
+            self.append(df)
+
+    @_locked
+    def delete_keys(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if df.empty:
+            return
+        doomed = set_key_hashes(df)
+        schema = self._schema()
+        # Reescreve apenas as partições (meses) que contêm as chaves removidas
+        for month in sorted(set(pd.to_datetime(df['Date']).dt.strftime('%Y-%m'))):
+            part_dir = os.path.join(self.path, f'month={month}')
+            if not os.path.isdir(part_dir):
+                continue
+            files = [os.path.join(part_dir, f) for f in os.listdir(part_dir) if f.endswith('.parquet')]
+            part = pd.concat([pq.read_table(f, schema=schema).to_pandas() for f in files], ignore_index=True)
+            part = part[~np.isin(set_key_hashes(part), doomed)]
+            if not part.empty:
+                self._write_part(part_dir, pa.Table.from_pandas(_normalize(part), schema=schema, preserve_index=False))
+            for f in files:
+                os.remove(f)
+        self._bump_version()
+
+    def sidecar_path(self, name):
+        return os.path.join(self.path, f'_{name}')
+
+    def _version_file(self):
+        return os.path.join(self.path, '_version')
+
+    def _bump_version(self):
+        v = self.version() + 1
+        tmp = temp_path(self._version_file())
+        with open(tmp, 'w') as f:
+            f.write(str(v))
+        os.replace(tmp, self._version_file())
+
+    def version(self):
+        try:
+            with open(self._version_file()) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def is_empty(self):
+        return next(self._part_files(), None) is None
+
+BACKENDS = {
+    'csv': CsvStorage,
+    'sqlite': SqliteStorage,
+    'parquet': ParquetStorage,
+}
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+def get_store(kind=None, path=None, athlete=None):
+    """Retorna o backend configurado (variáveis GYMRUN_STORAGE / GYMRUN_STORAGE_PATH).
+
+    Padrão: SQLite. Com `athlete`, a base fica na partição do atleta
+    (`GYMRUN_DATA_DIR/<atleta>/`); sem ele, nos caminhos de sempre. Ao criar a
+    base padrão (arquivo/pasta inexistente), importa a base CSV local
+    existente (mesmos candidatos de sempre) para não perder o histórico.
+    """
+    kind = (kind or os.environ.get('GYMRUN_STORAGE', 'sqlite')).lower()
+    if kind not in BACKENDS:
+        raise ValueError(f"Backend de armazenamento desconhecido: {kind!r}. Use um de {sorted(BACKENDS)}.")
+    if athlete:
+        if path is None:
+            folder = os.path.join(DATA_DIR, athlete_slug(athlete))
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, DEFAULT_PATHS[kind])
+    else:
+        if path is None:
+            path = os.environ.get('GYMRUN_STORAGE_PATH')
+        if path is None and kind == 'csv':
+            path = next((p for p in LOCAL_CANDIDATES if os.path.exists(p)), DEFAULT_PATHS['csv'])
+    path = path or DEFAULT_PATHS[kind]
+
+    key = (kind, os.path.abspath(path))
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            fresh = not os.path.exists(path)
+            store = BACKENDS[kind](path)
+            if kind != 'csv' and fresh and not athlete:
+                legacy = next((p for p in LOCAL_CANDIDATES if os.path.exists(p)), None)
+                if legacy:
+                    store.import_csv(legacy)
+            _STORES[key] = store
+    return store
@@ -0,0 +1,34 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def export_lines():
+    """Linhas do export de exemplo (cabeçalho primeiro)."""
+    with open(os.path.join(ROOT, 'gymrun_database.csv'), encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def write_export(path, lines):
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def staged_exports(tmp_path):
+    """Exports de uploads sucessivos: o começo do histórico, o export inteiro e o inteiro com uma série alterada.
+
+    O corte do primeiro cai no meio de um dia (e de uma semana). A alteração
+    (outra rotina numa série do meio do histórico) mantém a chave da série,
+    então a mesclagem a atualiza em vez de inserir.
+    """
+    header, *rows = export_lines()
+    edited = list(rows)
+    mid = len(rows) // 2
+    fields = edited[mid].split(';')
+    fields[2] = 'Z'
+    edited[mid] = ';'.join(fields)
+    return [write_export(tmp_path / 'early.csv', [header] + rows[:len(rows) * 2 // 3]),
+            write_export(tmp_path / 'full.csv', [header] + rows),
+            write_export(tmp_path / 'edited.csv', [header] + edited)]
@@ -0,0 +1,67 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import ROOT
+
+AppTest = pytest.importorskip('streamlit.testing.v1').AppTest
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(ROOT, 'gymrun_database.csv'), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('GYMRUN_WARMUP', '0')
+    return _run()
+
+
+def _run(athlete=None):
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=120).run()
+    if athlete:
+        at.sidebar.text_input(key='athlete').input(athlete).run()
+    return at
+
+
+def _upload(at, name, text):
+    at.sidebar.file_uploader[0].upload(name, text.encode('utf-8'), 'text/csv').run()
+    return at
+
+
+def test_invalid_athlete_name_shows_error(app):
+    app.sidebar.text_input(key='athlete').input('!!!').run()
+    assert not app.exception
+    assert any('Nome de atleta inválido' in e.value for e in app.error)
+
+
+RENAMED = 'Desenvolvimento de Ombros na Máquina (sentado)'
+
+
+def _renamed_export(bad_row=None):
+    lines = open(os.path.join(ROOT, 'gymrun_database.csv'), encoding='utf-8').read().splitlines()
+    lines = [line.replace(RENAMED, 'Desenvolvimento de Ombros na Maquina - sentado') for line in lines]
+    if bad_row is not None:
+        lines[bad_row] = '31.02.2025' + lines[bad_row][len('dd.mm.yyyy'):]
+    return '\n'.join(lines) + '\n'
+
+
+def _confirm_mapping(at):
+    mapping = at.selectbox(key='map_Desenvolvimento de Ombros na Maquina - sentado')
+    mapping.set_value(RENAMED)
+    next(b for b in at.button if 'Confirmar' in b.label).click().run()
+    return at
+
+
+def test_aliases_saved_only_after_successful_import(app, tmp_path):
+    base = open(os.path.join(ROOT, 'gymrun_database.csv'), encoding='utf-8').read()
+    _upload(_run('ana'), 'base.csv', base)
+    aliases = tmp_path / 'athletes' / 'ana'
+    assert aliases.is_dir()
+
+    at = _confirm_mapping(_upload(_run('ana'), 'ruim.csv', _renamed_export(bad_row=1500)))
+    assert any('Importação interrompida' in e.value for e in at.sidebar.error)
+    assert not list(aliases.glob('*aliases.json'))
+
+    at = _confirm_mapping(_upload(_run('ana'), 'bom.csv', _renamed_export()))
+    assert not at.exception
+    assert list(aliases.glob('*aliases.json'))
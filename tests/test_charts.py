@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+import charts
+
+
+def _event(x0, x1):
+    return {'selection': {'points': [], 'point_indices': [], 'lasso': [],
+                          'box': [{'xref': 'x', 'yref': 'y', 'x': [x1, x0], 'y': [0, 1]}]}}
+
+
+def test_zoom_range_from_box_selection():
+    assert charts.zoom_range(_event('2025-01-10 00:00', '2025-02-01 12:00')) == (
+        pd.Timestamp('2025-01-10'), pd.Timestamp('2025-02-01 12:00'))
+    assert charts.zoom_range(None) is None
+    assert charts.zoom_range({'selection': {'box': []}}) is None
+
+
+def test_zoomed_slice_is_redrawn_at_full_resolution():
+    days = pd.DataFrame({'Date': pd.date_range('2015-01-01', periods=3650, freq='D'),
+                         'Volume': np.random.default_rng(0).random(3650)})
+    target = charts.chart_points(1.0)
+    assert len(charts.line_trace(days['Date'], days['Volume'], target).y) == target
+
+    zoom = charts.zoom_range(_event('2020-01-01', '2020-12-31'))
+    part = charts.in_zoom(days, zoom)
+    trace = charts.line_trace(part['Date'], part['Volume'], target)
+    assert len(trace.y) == len(part) == 366
+    assert charts.in_zoom(days, None) is days
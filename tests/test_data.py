@@ -0,0 +1,158 @@
+import os
+
+import pandas as pd
+import pytest
+
+import data
+from conftest import ROOT
+
+
+class _FakeStreamlit:
+    def __init__(self):
+        self.errors = []
+
+    def error(self, message):
+        self.errors.append(message)
+
+
+def _bad_dates():
+    return pd.DataFrame({
+        'Date': ['31.02.2025'], 'Time': ['10:00:00'], 'Routine': ['A'],
+        'Exercise': ['Supino'], 'Set': ['1'], 'Weight': ['20'], 'Reps': ['10'],
+    })
+
+
+def test_process_dataframe_error_shown_in_app(monkeypatch):
+    fake = _FakeStreamlit()
+    monkeypatch.setattr(data, '_st', fake)
+    out = data._process_dataframe(_bad_dates())
+    assert out.empty
+    assert len(fake.errors) == 1
+    assert 'Erro ao formatar ou processar dados' in fake.errors[0]
+
+
+def test_process_dataframe_error_logged_outside_app(monkeypatch, caplog):
+    monkeypatch.setattr(data, '_st', None)
+    out = data._process_dataframe(_bad_dates())
+    assert out.empty
+    assert 'Erro ao formatar ou processar dados' in caplog.text
+
+
+def _export_with_bad_date(tmp_path, row):
+    lines = open(os.path.join(ROOT, 'gymrun_database.csv'), encoding='utf-8').read().splitlines()
+    fields = lines[row].split(';')
+    fields[0] = '31.02.2025'
+    lines[row] = ';'.join(fields)
+    path = tmp_path / 'export.csv'
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path), len(lines) - 1
+
+
+def test_import_export_stops_on_failed_chunk(tmp_path):
+    from storage import CsvStorage
+
+    path, total = _export_with_bad_date(tmp_path, 1500)
+    store = CsvStorage(str(tmp_path / 'base.csv'))
+    with pytest.raises(ValueError, match='Importação interrompida') as err:
+        data.import_export(store, path, max_memory_mb=0)
+    assert 'linhas 1002–2001' in str(err.value)
+    # Os blocos gravados antes do erro continuam consistentes com o índice
+    stored = len(store.load())
+    assert 0 < stored < total
+    assert len(data.load_key_index(store)) == stored
+
+
+def test_import_export_without_errors(tmp_path):
+    from storage import CsvStorage
+
+    store = CsvStorage(str(tmp_path / 'base.csv'))
+    result = data.import_export(store, os.path.join(ROOT, 'gymrun_database.csv'), max_memory_mb=0)
+    assert result.inserted == len(store.load()) > 0
+
+
+def test_muscle_group_overrides_file(tmp_path):
+    import json
+
+    import snapshot
+    from mappings import MUSCLE_GROUPS_NAME, load_muscle_groups
+    from storage import CsvStorage
+
+    store = CsvStorage(str(tmp_path / 'base.csv'))
+    data.import_export(store, os.path.join(ROOT, 'gymrun_database.csv'), max_memory_mb=0)
+    df = data._process_dataframe(store.load())
+    exercise = df['Exercise'].iloc[0]
+    before = data.enrich_sets(df)
+    assert (before.loc[before['Exercise'] == exercise, 'MuscleGroup'] != 'Cardio').all()
+
+    path = store.sidecar_path(MUSCLE_GROUPS_NAME)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({exercise.upper() + ' ': 'Cardio', 'Outro': 1}, f)
+    groups = load_muscle_groups(store)
+    assert groups == ((exercise.upper() + ' ', 'Cardio'),)
+    after = data.enrich_sets(df, groups)
+    assert (after.loc[after['Exercise'] == exercise, 'MuscleGroup'] == 'Cardio').all()
+    others = after['Exercise'] != exercise
+    assert after.loc[others, 'MuscleGroup'].astype(str).equals(before.loc[others, 'MuscleGroup'].astype(str))
+
+    # O snapshot carimba as correções: editar o arquivo o desatualiza
+    if snapshot.available():
+        data.refresh_snapshot(store)
+        frame, stamp = snapshot.open_snapshot(store)
+        assert stamp == data.snapshot_stamp(store.version(), groups) != str(store.version())
+        assert (frame.loc[frame['Exercise'] == exercise, 'MuscleGroup'] == 'Cardio').all()
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{inválido')
+    assert load_muscle_groups(store) == ()
+
+
+def test_set_key_index_lookup_and_update(tmp_path):
+    df = data.read_gymrun_csv(os.path.join(ROOT, 'gymrun_database.csv'))
+    old, new = df.iloc[:1000], df.iloc[1000:]
+    index = data.SetKeyIndex.from_frame(old, version='1')
+    found, rows = index.lookup(data.set_key_hashes(df))
+    assert found.tolist() == [True] * len(old) + [False] * len(new)
+    assert (rows[:len(old)] == data.set_row_hashes(old)).all()
+
+    index.update(data.set_key_hashes(new), data.set_row_hashes(new))
+    path = str(tmp_path / 'keys.npz')
+    index.save(path)
+    index = data.SetKeyIndex.load(path)
+    assert index.version == '1'
+    assert len(index) == len(df)
+    found, rows = index.lookup(data.set_key_hashes(df))
+    assert found.all() and (rows == data.set_row_hashes(df)).all()
+
+
+@pytest.mark.parametrize('kind', ['csv', 'sqlite', 'parquet'])
+def test_import_export_skips_known_sets_and_updates_changed(tmp_path, monkeypatch, kind):
+    from storage import get_store
+
+    if kind == 'parquet':
+        pytest.importorskip('pyarrow')
+    # Fora da raiz do repositório: a base nova não herda o CSV local
+    monkeypatch.chdir(tmp_path)
+    store = get_store(kind, path=str(tmp_path / f'base.{kind}'))
+    source = os.path.join(ROOT, 'gymrun_database.csv')
+    first = data.import_export(store, source, max_memory_mb=0)
+    total = len(store.load())
+    assert first.inserted == total > 0
+
+    again = data.import_export(store, source, max_memory_mb=0)
+    assert (again.inserted, again.updated, again.skipped) == (0, 0, total)
+    assert again.rows.empty
+    assert len(store.load()) == total
+
+    # Mesma chave (data, hora, exercício, série, carga, reps) com outra rotina: atualiza
+    lines = open(source, encoding='utf-8').read().splitlines()
+    fields = lines[1].split(';')
+    fields[2] = 'Z'
+    lines[1] = ';'.join(fields)
+    path = tmp_path / 'export.csv'
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    changed = data.import_export(store, str(path), max_memory_mb=0)
+    assert (changed.inserted, changed.updated, changed.skipped) == (0, 1, total - 1)
+    stored = store.load()
+    assert len(stored) == total
+    assert (stored['Routine'].astype(str) == 'Z').sum() == 1
+    assert len(data.load_key_index(store)) == total
@@ -0,0 +1,141 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import forecasting
+
+
+def _weekly(n=10):
+    idx = pd.date_range('2025-01-05', periods=n, freq='W')
+    return pd.Series(np.linspace(50, 60, n), index=idx)
+
+
+def _slow_or_fast(sw, periods_weeks):
+    # Série marcada como lenta trava o ajuste bem além do timeout
+    if sw.name == 'slow':
+        time.sleep(60)
+    return forecasting._linear_forecast(sw, periods_weeks).assign(Model='fit')
+
+
+def _fail(sw, periods_weeks):
+    raise RuntimeError('falhou')
+
+
+def test_fit_in_pool_kills_slow_fits():
+    series = {f'fast{i}': _weekly().rename('fast') for i in range(8)}
+    series.update({f'slow{i}': _weekly().rename('slow') for i in range(2)})
+    t0 = time.monotonic()
+    fitted = forecasting._fit_in_pool(series, 6, workers=2, timeout=0.5, task=_slow_or_fast)
+    elapsed = time.monotonic() - t0
+
+    assert set(fitted) == set(series)
+    # Os ajustes lentos viram regressão linear e não seguram os processos
+    assert all(fitted[f'slow{i}']['Model'].eq('linear').all() for i in range(2))
+    assert all(fitted[f'fast{i}']['Model'].eq('fit').all() for i in range(8))
+    assert elapsed < 10
+
+
+def test_fit_in_pool_failed_fit_falls_back_to_linear():
+    fitted = forecasting._fit_in_pool({'x': _weekly()}, 6, workers=1, timeout=5, task=_fail)
+    assert fitted['x']['Model'].eq('linear').all()
+    assert len(fitted['x']) == 6
+
+
+class _FailingArima:
+    """pmdarima falso: todo ajuste falha, forçando o fallback linear."""
+
+    @staticmethod
+    def auto_arima(*args, **kwargs):
+        raise RuntimeError('sem convergência')
+
+
+def test_linear_fallback_is_not_cached(monkeypatch, tmp_path):
+    monkeypatch.setattr(forecasting, '_pmdarima', lambda: _FailingArima)
+    cache = forecasting.ForecastCache(str(tmp_path))
+    sw = _weekly()
+
+    out = forecasting.forecast_1rm_series(sw, tag='Supino', cache=cache)
+    assert out['Model'].eq('linear').all()
+    df = pd.DataFrame({'Date': sw.index, 'Exercise': 'Supino', 'Estimated_1RM': sw.to_numpy()})
+    forecasting.forecast_all(df, workers=1, cache=cache)
+
+    key = forecasting._cache_key(sw, 6, _FailingArima)
+    assert cache.get(key, 'Supino') is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_cache_new_weeks_replace_entry_of_same_tag(tmp_path):
+    cache = forecasting.ForecastCache(str(tmp_path))
+    tag = forecasting.forecast_tag('ana', '2025-01-01', '2025-12-31', None, 'Supino')
+    old = forecasting.forecast_1rm_series(_weekly(10), tag=tag, cache=cache)
+    new = forecasting.forecast_1rm_series(_weekly(11), tag=tag, cache=cache)
+    assert not old.equals(new)
+    assert len(list(tmp_path.glob('*.pkl'))) == 1
+
+    # Reaberto do disco (sem a memória): a série nova acerta, a antiga não existe mais
+    reopened = forecasting.ForecastCache(str(tmp_path))
+    assert reopened.get(forecasting._cache_key(_weekly(11), 6, forecasting._pmdarima()), tag).equals(new)
+    assert reopened.get(forecasting._cache_key(_weekly(10), 6, forecasting._pmdarima()), tag) is None
+
+
+def test_cache_tags_of_other_athletes_and_filters_are_kept(tmp_path):
+    cache = forecasting.ForecastCache(str(tmp_path))
+    tags = [
+        forecasting.forecast_tag('ana', '2025-01-01', '2025-12-31', None, 'Supino'),
+        forecasting.forecast_tag('bia', '2025-01-01', '2025-12-31', None, 'Supino'),
+        forecasting.forecast_tag('ana', '2025-03-01', '2025-12-31', 'A', 'Supino'),
+    ]
+    for n, tag in enumerate(tags):
+        forecasting.forecast_1rm_series(_weekly(10 + n), tag=tag, cache=cache)
+    assert len(list(tmp_path.glob('*.pkl'))) == 3
+    assert not [p for p in tmp_path.iterdir() if p.suffix != '.pkl']
+
+
+def test_forecast_all_scope_shares_entries_with_single_forecast(tmp_path):
+    cache = forecasting.ForecastCache(str(tmp_path))
+    sw = _weekly()
+    df = pd.DataFrame({'Date': sw.index, 'Exercise': 'Supino', 'Max1RM': sw.to_numpy()})
+    forecasting.forecast_all(df, workers=1, value_col='Max1RM', cache=cache, scope=('ana', 'a', 'b', None))
+    forecasting.forecast_1rm_series(sw, tag=forecasting.forecast_tag('ana', 'a', 'b', None, 'Supino'), cache=cache)
+    assert len(list(tmp_path.glob('*.pkl'))) == 1
+
+
+def test_cache_hits_until_the_weekly_series_changes(monkeypatch, tmp_path):
+    fits = []
+    fit = forecasting._fit_forecast
+    monkeypatch.setattr(forecasting, '_fit_forecast', lambda *args: fits.append(1) or fit(*args))
+    cache = forecasting.ForecastCache(str(tmp_path))
+    tag = forecasting.forecast_tag('ana', None, None, None, 'Supino')
+    sw = _weekly()
+
+    first = forecasting.forecast_1rm_series(sw, tag=tag, cache=cache)
+    assert forecasting.forecast_1rm_series(sw, tag=tag, cache=cache).equals(first)
+    assert forecasting.forecast_1rm_series(sw, tag=tag, cache=forecasting.ForecastCache(str(tmp_path))).equals(first)
+    assert len(fits) == 1
+
+    # Série editada numa semana já vista, outro horizonte ou outra versão do modelo: nova chave
+    edited = sw.copy()
+    edited.iloc[3] += 5
+    forecasting.forecast_1rm_series(edited, tag=tag, cache=cache)
+    forecasting.forecast_1rm_series(edited, periods_weeks=8, tag=tag, cache=cache)
+    monkeypatch.setattr(forecasting, 'FORECAST_MODEL_VERSION', forecasting.FORECAST_MODEL_VERSION + 1)
+    forecasting.forecast_1rm_series(edited, periods_weeks=8, tag=tag, cache=cache)
+    assert len(fits) == 4
+    assert len(list(tmp_path.glob('*.pkl'))) == 1
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = forecasting.ForecastCache(str(tmp_path))
+    files = []
+    for n in range(3):
+        forecasting.forecast_1rm_series(_weekly(10 + n), tag=n, cache=cache)
+        files.append(next(p for p in tmp_path.glob('*.pkl') if p not in files))
+        os.utime(files[-1], (1000 * (n + 1), 1000 * (n + 1)))
+    # Cabem três entradas: a usada há mais tempo sai ao gravar a quarta
+    cache.max_disk_bytes = 3 * max(p.stat().st_size for p in files)
+    forecasting.forecast_1rm_series(_weekly(20), tag=3, cache=cache)
+    left = set(tmp_path.glob('*.pkl'))
+    assert files[0] not in left and set(files[1:]) <= left
+    assert len(left) == 3
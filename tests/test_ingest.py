@@ -0,0 +1,104 @@
+import io
+import os
+from email.message import EmailMessage
+
+import pandas as pd
+import pytest
+
+import data
+import ingest
+from conftest import ROOT
+
+SAMPLES = ['Exportação CSV.eml', 'GymRun Exportação CSV Modelo.eml']
+
+CSV = (
+    "Date;Time;Routine;Exercise;Set;Weight;Reps\n"
+    "23.04.2025;09:15:18;C;Extensão de Pernas;1;23;10\n"
+    "23.04.2025;09:17:32;C;Elevação Pélvica;2;40;12\n"
+)
+
+
+def _message(body=CSV, cte='base64', charset='utf-8', filename='export.csv'):
+    msg = EmailMessage()
+    msg['Subject'] = 'GymRun export'
+    msg.set_content('Segue o backup.')
+    msg.add_attachment(body.encode(charset), maintype='text', subtype='csv',
+                       filename=filename, cte=cte, params={'charset': charset})
+    return msg
+
+
+def _decoded(raw):
+    return ingest.open_export(io.BytesIO(raw)).read()
+
+
+@pytest.mark.parametrize('cte', ['base64', 'quoted-printable'])
+def test_attachment_transfer_encodings(cte):
+    raw = _message(cte=cte).as_bytes()
+    assert f'Content-Transfer-Encoding: {cte}'.encode() in raw
+    assert _decoded(raw) == CSV.encode('utf-8')
+
+
+def test_base64_attachment_larger_than_a_chunk(monkeypatch):
+    monkeypatch.setattr(ingest, 'CHUNK_BYTES', 64)
+    body = CSV + CSV.split('\n', 1)[1] * 50
+    assert _decoded(_message(body).as_bytes()) == body.encode('utf-8')
+
+
+def test_nested_multipart():
+    inner = _message()
+    inner.add_attachment(b'%PDF-1.4', maintype='application', subtype='pdf', filename='treino.pdf')
+    outer = EmailMessage()
+    outer['Subject'] = 'Fwd: GymRun export'
+    outer.set_content('Encaminhado.')
+    outer.make_mixed()
+    outer.attach(inner)
+    outer.add_attachment(b'depois do anexo', maintype='text', subtype='plain', filename='nota.txt')
+    raw = outer.as_bytes()
+    assert raw.count(b'boundary=') == 2
+    assert _decoded(raw) == CSV.encode('utf-8')
+
+
+def test_latin1_attachment_is_recoded_to_utf8():
+    raw = _message(cte='base64', charset='latin-1').as_bytes()
+    assert 'Extensão'.encode('latin-1') not in raw
+    assert _decoded(raw) == CSV.encode('utf-8')
+    df = data.read_gymrun_csv(io.BytesIO(raw))
+    assert list(df['Exercise'].astype(str)) == ['Extensão de Pernas', 'Elevação Pélvica']
+
+
+def test_message_without_csv_part():
+    msg = EmailMessage()
+    msg['Subject'] = 'Sem anexo'
+    msg.set_content('Esqueci o anexo.')
+    msg.add_attachment(b'%PDF-1.4', maintype='application', subtype='pdf', filename='treino.pdf')
+    with pytest.raises(ValueError, match='Nenhum anexo CSV'):
+        _decoded(msg.as_bytes())
+    with pytest.raises(ValueError, match='Nenhum anexo CSV'):
+        list(data.iter_gymrun_csv(io.BytesIO(msg.as_bytes())))
+
+
+def _full_read(raw):
+    """Referência: mensagem inteira pelo pacote email e CSV inteiro pelo pandas."""
+    if ingest.is_mime_message(io.BytesIO(raw)):
+        from email import message_from_bytes, policy
+        part = next(p for p in message_from_bytes(raw, policy=policy.default).walk()
+                    if p.get_content_type() == 'text/csv')
+        raw = part.get_content().encode('utf-8')
+    df = pd.read_csv(io.BytesIO(raw), sep=';', encoding='utf-8',
+                     usecols=lambda c: c in data.GYMRUN_DTYPES, dtype=str)
+    return data._process_dataframe(df)
+
+
+@pytest.mark.parametrize('name', SAMPLES)
+@pytest.mark.parametrize('wrap', [False, True])
+def test_samples_match_full_read(name, wrap):
+    raw = open(os.path.join(ROOT, name), 'rb').read()
+    if wrap:
+        raw = _message(raw.decode('utf-8'), filename=name.replace('.eml', '.csv')).as_bytes()
+    expected = _full_read(raw)
+    assert not expected.empty
+
+    streamed = data.read_gymrun_csv(io.BytesIO(raw))
+    chunked = data._concat_chunks(data.iter_gymrun_csv(io.BytesIO(raw), chunksize=100))
+    for got in (streamed, chunked):
+        pd.testing.assert_frame_equal(got.reset_index(drop=True), expected, check_categorical=False)
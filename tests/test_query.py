@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data
+from conftest import ROOT
+from query import SetQuery
+
+
+@pytest.fixture(scope='module')
+def sets():
+    df = data.enrich_sets(data.read_gymrun_csv(f'{ROOT}/gymrun_database.csv'))
+    # Fora de ordem e com rotinas vazias, como uma base mesclada de vários exports
+    shuffled = df.sample(frac=1, random_state=0, ignore_index=True)
+    shuffled['Routine'] = shuffled['Routine'].mask(shuffled.index % 7 == 0)
+    return shuffled
+
+
+def _cases(df, n=200, seed=1):
+    rng = np.random.default_rng(seed)
+    dates = df['Date'].sort_values().unique()
+    for _ in range(n):
+        start, end = (pd.Timestamp(d) if rng.random() < 0.8 else None for d in rng.choice(dates, 2))
+        # Valores de uma mesma série, para os filtros combinados não ficarem quase sempre vazios
+        row = df.iloc[rng.integers(len(df))]
+        filters = {col: (row[col] if rng.random() < 0.5 else None) for col in ('Exercise', 'Routine', 'MuscleGroup')}
+        if rng.random() < 0.05:
+            filters['Exercise'] = 'Inexistente'
+        yield start, end, {col: None if pd.isna(value) else value for col, value in filters.items()}
+
+
+def _mask(df, start, end, filters):
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df['Date'] >= start
+    if end is not None:
+        mask &= df['Date'] <= end
+    for col, value in filters.items():
+        if value is not None:
+            mask &= df[col] == value
+    return mask
+
+
+def test_select_matches_boolean_masks(sets):
+    query = SetQuery(sets)
+    expected = sets.sort_values('Date', kind='stable', ignore_index=True)
+    assert query.frame.equals(expected)
+    for start, end, filters in _cases(expected):
+        got = query.select(start, end, **filters)
+        assert got.equals(expected[_mask(expected, start, end, filters)]), (start, end, filters)
+
+
+@pytest.mark.parametrize('col', ['Exercise', 'Routine', 'MuscleGroup'])
+def test_values_and_last_dates_match_boolean_masks(sets, col):
+    query = SetQuery(sets)
+    for start, end, filters in _cases(sets, n=100):
+        part = sets[_mask(sets, start, end, filters)]
+        last = part.dropna(subset=[col]).groupby(part[col].astype(object), sort=True)['Date'].max()
+        got = query.last_dates(col, start, end, **filters)
+        assert got.index.tolist() == last.index.tolist() == query.values(col, start, end, **filters)
+        assert (got.to_numpy() == last.to_numpy()).all()
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from conftest import export_lines, staged_exports, write_export
+from records import RECORD_KINDS, RecordIndex
+from storage import SqliteStorage
+
+
+def _sets(rows):
+    return pd.DataFrame(rows, columns=['Date', 'Exercise', 'Weight', 'Reps']).assign(
+        Date=lambda d: pd.to_datetime(d['Date']))
+
+
+def test_header_max_weight_counts_sets_without_reps():
+    sets = _sets([
+        ('2025-01-06', 'Supino', 60.0, 8.0),
+        ('2025-01-08', 'Supino', 70.0, np.nan),  # carga registrada sem repetições
+        ('2025-01-08', 'Prancha', np.nan, np.nan),
+    ])
+    records = RecordIndex.from_sets(sets)
+    assert records.best('Supino', 'weight') == sets.loc[sets['Exercise'] == 'Supino', 'Weight'].max() == 70.0
+    assert records.record('Supino', 'weight').date == pd.Timestamp('2025-01-08')
+    assert records.best('Supino', 'weight', reps=8) == 60.0
+    # O maior peso sem repetições não entra na linha do tempo de PRs
+    assert set(records.history()['Kind']) <= set(RECORD_KINDS)
+    assert np.isnan(records.best('Prancha', 'weight'))
+
+
+def _timeline(records):
+    out = records.timeline.astype({'Exercise': str})
+    return out.sort_values(['Kind', 'Exercise', 'Reps', 'Date'], ignore_index=True)
+
+
+def test_update_records_matches_full_rebuild(tmp_path, monkeypatch):
+    import data
+    import records
+
+    header, *rows = export_lines()
+    # Primeiro upload termina num dia inteiro: o upload seguinte só traz dias posteriores
+    cut = len(rows) * 2 // 3
+    while rows[cut].split(';')[0] == rows[cut - 1].split(';')[0]:
+        cut += 1
+    early = write_export(tmp_path / 'early_days.csv', [header] + rows[:cut])
+    _, full, edited = staged_exports(tmp_path)
+
+    store = SqliteStorage(str(tmp_path / 'base.db'))
+    rebuilds = []
+    from_sets = RecordIndex.from_sets.__func__
+    monkeypatch.setattr(RecordIndex, 'from_sets', classmethod(lambda cls, sets: rebuilds.append(1) or from_sets(cls, sets)))
+    for path in (early, full, edited):
+        base = store.version()
+        result = data.import_export(store, path, max_memory_mb=0)
+        rebuilds.clear()
+        index = records.update_records(store, result.rows, base)
+        if path == full:
+            assert not rebuilds
+        expected = from_sets(RecordIndex, records._load_sets(store))
+        pd.testing.assert_frame_equal(_timeline(index), _timeline(expected), check_dtype=False)
+        assert _timeline(records.load_records(store)).equals(_timeline(index))
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data
+from conftest import ROOT, staged_exports
+from rollups import ROLLUP_KEYS, RollupCube
+
+
+@pytest.fixture(scope='module')
+def sets():
+    return data.enrich_sets(data.read_gymrun_csv(f'{ROOT}/gymrun_database.csv'))
+
+
+def _weekly_from_sets(sets, start, end):
+    part = sets[sets['Date'].between(start, end)]
+    return part.set_index('Date').resample('W').agg({'Volume': 'sum', 'Weight': 'max'})
+
+
+@pytest.mark.parametrize('start, end', [
+    ('2025-04-23', '2025-06-11'),  # qua–qua: as duas pontas cortam a semana
+    ('2025-04-21', '2025-06-15'),  # seg–dom: só semanas inteiras
+    ('2025-05-06', '2025-05-08'),  # dentro de uma semana só
+    ('2025-05-05', '2025-05-07'),  # começa numa segunda, mesma semana
+])
+def test_weekly_slice_counts_only_days_in_range(sets, start, end):
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    cube = RollupCube.from_sets(sets)
+    weekly = cube.weekly_slice(start, end).groupby('Week').agg({'Volume': 'sum', 'MaxWeight': 'max'})
+    expected = _weekly_from_sets(sets, start, end)
+    expected = expected[expected['Weight'].notna()]
+    assert list(weekly.index) == list(expected.index)
+    np.testing.assert_allclose(weekly['Volume'], expected['Volume'])
+    np.testing.assert_allclose(weekly['MaxWeight'], expected['Weight'])
+
+
+def _sorted(table, key):
+    table = table.astype({col: str for col in ROLLUP_KEYS})
+    return table.sort_values([key] + ROLLUP_KEYS, ignore_index=True)
+
+
+def test_update_rollups_matches_full_rebuild(tmp_path, monkeypatch):
+    import rollups
+    from storage import SqliteStorage
+
+    store = SqliteStorage(str(tmp_path / 'base.db'))
+    for i, path in enumerate(staged_exports(tmp_path)):
+        base = store.version()
+        result = data.import_export(store, path, max_memory_mb=0)
+        assert result.inserted + result.updated > 0
+        if i:
+            # Depois do primeiro upload os rollups salvos estão em dia: só o caminho incremental
+            monkeypatch.setattr(rollups, 'load_rollups', None)
+        cube = rollups.update_rollups(store, result.rows, base)
+        full = RollupCube.from_sets(rollups._load_sets(store))
+        pd.testing.assert_frame_equal(_sorted(cube.daily, 'Date'), _sorted(full.daily, 'Date'), check_dtype=False)
+        pd.testing.assert_frame_equal(_sorted(cube.weekly, 'Week'), _sorted(full.weekly, 'Week'), check_dtype=False)
@@ -0,0 +1,120 @@
+"""Carga de treino ao longo de todo o histórico: ACWR e modelo fitness-fadiga.
+
+A carga de cada dia é o volume (kg) do dia, numa matriz dia × grupo muscular
+com calendário contínuo (dias sem treino valem zero) e uma coluna `Total`.
+Sobre ela:
+
+- ACWR (razão aguda:crônica) com médias exponenciais de 7 e 28 dias
+  (λ = 2 / (N + 1)); fica indefinido nos primeiros 28 dias de cada grupo.
+- Banister: fitness e fadiga são somas da carga com decaimento exponencial
+  (τ = 42 e 7 dias) e a forma é fitness − 2 × fadiga.
+
+As recursões são filtros lineares de primeira ordem (como `lfilter`)
+aplicados à matriz inteira de uma vez: anos de histórico e vários grupos (ou
+atletas) saem em milissegundos.
+"""
+import numpy as np
+import pandas as pd
+
+from perf import timed
+
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+FITNESS_TAU = 42
+FATIGUE_TAU = 7
+FITNESS_GAIN = 1.0
+FATIGUE_GAIN = 2.0
+TOTAL = 'Total'
+
+LOAD_COLUMNS = ['Load', 'Acute', 'Chronic', 'ACWR', 'Fitness', 'Fatigue', 'Form']
+
+# Maior expoente usado dentro de um bloco do filtro (c^-L <= e^27 ~ 5e11)
+_MAX_EXP = 27.0
+
+def first_order_filter(x, b, c):
+    """y[t] = b·x[t] + c·y[t-1], com y[-1] = 0, ao longo do eixo 0 (= lfilter([b], [1, -c], x)).
+
+    Sem loop por dia: num bloco de L dias iniciado em s,
+    y[s+j] = c^(j+1)·y[s-1] + b·c^j·cumsum(x[s+i]·c^-i). L é o maior bloco
+    em que c^-L não perde precisão; só o último y de cada bloco passa adiante.
+    """
+    x = np.asarray(x, dtype=float)
+    flat = x.ndim == 1
+    if flat:
+        x = x[:, None]
+    y = np.empty_like(x)
+    block = max(1, int(_MAX_EXP / -np.log(c)))
+    state = np.zeros(x.shape[1])
+    for s in range(0, len(x), block):
+        xs = x[s:s + block]
+        j = np.arange(len(xs), dtype=float)[:, None]
+        y[s:s + block] = c ** j * (b * np.cumsum(xs * c ** -j, axis=0) + c * state)
+        state = y[s + len(xs) - 1]
+    return y[:, 0] if flat else y
+
+def ewma(x, span):
+    """Média exponencial com λ = 2 / (span + 1), partindo de zero."""
+    alpha = 2.0 / (span + 1)
+    return first_order_filter(x, alpha, 1 - alpha)
+
+def impulse_response(x, tau):
+    """Soma da carga com decaimento e^(-1/τ) por dia (fitness/fadiga de Banister)."""
+    return first_order_filter(x, 1.0, np.exp(-1.0 / tau))
+
+def daily_load_matrix(daily, by='MuscleGroup', value='Volume', total=True):
+    """Matriz dia × grupo da carga diária, com todos os dias do primeiro ao último treino.
+
+    `daily` tem uma linha por (dia, ...) com as colunas Date, `value` e `by`
+    (ex.: rollup diário com MuscleGroup). `by=None` gera só a coluna Total.
+    Com várias colunas em `by` (ex.: ['Athlete', 'MuscleGroup']) os grupos são
+    tuplas e não há coluna Total.
+    """
+    if daily.empty:
+        return pd.DataFrame(dtype=float)
+    dates = pd.to_datetime(daily['Date']).dt.normalize()
+    values = daily[value].astype(float)
+    if by is None:
+        matrix = values.groupby(dates).sum().to_frame(TOTAL)
+    else:
+        keys = [by] if isinstance(by, str) else list(by)
+        grouped = values.groupby([dates] + [daily[k] for k in keys], observed=True).sum()
+        matrix = grouped.unstack(list(range(1, len(keys) + 1)), fill_value=0.0)
+        matrix.columns = pd.Index(list(matrix.columns), dtype=object, tupleize_cols=False)
+        if total and len(keys) == 1:
+            matrix[TOTAL] = matrix.sum(axis=1)
+    days = pd.date_range(matrix.index.min(), matrix.index.max(), freq='D', name='Date')
+    return matrix.reindex(days, fill_value=0.0)
+
+@timed('training_load.training_load')
+def training_load(daily, by='MuscleGroup', value='Volume'):
+    """ACWR e fitness-fadiga de cada grupo, dia a dia (formato longo: Date, Group + LOAD_COLUMNS)."""
+    matrix = daily_load_matrix(daily, by, value)
+    if matrix.empty:
+        return pd.DataFrame(columns=['Date', 'Group'] + LOAD_COLUMNS)
+    load = matrix.to_numpy()
+    acute = ewma(load, ACUTE_DAYS)
+    chronic = ewma(load, CHRONIC_DAYS)
+    # ACWR só depois de CHRONIC_DAYS dias desde o primeiro treino do grupo
+    started = np.cumsum(load > 0, axis=0) > 0
+    age = np.cumsum(started, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        acwr = np.where((age > CHRONIC_DAYS) & (chronic > 0), acute / chronic, np.nan)
+    fitness = impulse_response(load, FITNESS_TAU)
+    fatigue = impulse_response(load, FATIGUE_TAU)
+    form = FITNESS_GAIN * fitness - FATIGUE_GAIN * fatigue
+
+    n_days, n_groups = load.shape
+    out = pd.DataFrame({
+        'Date': np.repeat(matrix.index.to_numpy(), n_groups),
+        'Group': np.tile(np.asarray(matrix.columns, dtype=object), n_days),
+    })
+    for name, arr in zip(LOAD_COLUMNS, (load, acute, chronic, acwr, fitness, fatigue, form)):
+        out[name] = arr.reshape(-1)
+    # Antes do primeiro treino do grupo não há o que mostrar
+    return out[started.reshape(-1)].reset_index(drop=True)
+
+def latest(load):
+    """Último dia de cada grupo (entrada para os alertas de carga)."""
+    if load.empty:
+        return load
+    return load.groupby('Group', sort=False).tail(1).set_index('Group')
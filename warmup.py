@@ -0,0 +1,75 @@
+"""Aquecimento do processo do dashboard em segundo plano.
+
+Depois do primeiro rerun já desenhado, uma thread (uma vez por processo)
+carrega o que o próximo clique vai precisar: Plotly (import e a primeira
+figura, que monta os validadores), pmdarima, e as séries enriquecidas + rollups
+da base padrão e dos atletas existentes, nos mesmos caches do app
+(`load_sets`/`load_rollup_cube`). Desligado com GYMRUN_WARMUP=0.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Atletas aquecidos além da base padrão (o cache de load_sets guarda 8 entradas)
+WARMUP_ATHLETES = 4
+
+_lock = threading.Lock()
+_thread = None
+
+def enabled():
+    return os.environ.get('GYMRUN_WARMUP', '1') != '0'
+
+def _warm_charts():
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    go.Figure(go.Scatter(x=[0, 1], y=[0, 1])).to_json()
+    px.bar(x=[1], y=['a'], orientation='h').to_json()
+
+def _warm_models():
+    from forecasting import preload_models
+
+    preload_models()
+
+def _warm_data(athletes):
+    from data import load_rollup_cube, load_sets
+    from mappings import load_muscle_groups
+    from storage import get_store
+
+    for athlete in athletes:
+        store = get_store(athlete=athlete)
+        version = store.version()
+        load_sets(version, athlete, load_muscle_groups(store))
+        load_rollup_cube(version, athlete)
+
+def _run(athletes):
+    for name, step in (('charts', _warm_charts), ('models', _warm_models), ('data', lambda: _warm_data(athletes))):
+        t0 = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception("Falha no aquecimento (%s)", name)
+        else:
+            logger.info("Aquecimento %s: %.2fs", name, time.perf_counter() - t0)
+
+def start(athletes=None):
+    """Dispara o aquecimento na primeira chamada do processo; as seguintes não fazem nada.
+
+    `athletes` são as partições a carregar (None = base padrão + até
+    WARMUP_ATHLETES atletas existentes). Devolve a thread (ou None se desligado).
+    """
+    global _thread
+    if not enabled():
+        return None
+    with _lock:
+        if _thread is None:
+            if athletes is None:
+                from storage import list_athletes
+
+                athletes = [None] + list_athletes()[:WARMUP_ATHLETES]
+            _thread = threading.Thread(target=_run, args=(list(athletes),), name='gymrun-warmup', daemon=True)
+            _thread.start()
+    return _thread